@@ -3,20 +3,26 @@ import os
 import json
 import logging
 from pathlib import Path
-from flask import Flask, send_from_directory
+from flask import Flask
 from flask_cors import CORS
 from .routes import register_routes
+from .utils.request_metrics import install_request_metrics
 
 # schema directory
 SCHEMA_DIR = Path(__file__).parent / 'schemas'
 
-with open(SCHEMA_DIR / 'api_schemas.json', encoding='utf-8') as f:
-    api_schemas = json.load(f)
-
-# Configure logging
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+# Configure logging, LOG_LEVEL=DEBUG brings back the verbose per-request logs
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(), format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# A missing schema file must not make `import app` (scripts, tests, benchmarks) fail
+try:
+    with open(SCHEMA_DIR / 'api_schemas.json', encoding='utf-8') as f:
+        api_schemas = json.load(f)
+except FileNotFoundError:
+    logger.warning("%s not found, API schemas are not loaded", SCHEMA_DIR / 'api_schemas.json')
+    api_schemas = {}
+
 # Get the absolute path to the project root
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -34,6 +40,9 @@ def create_app():
         CORS(flask_app)
         logger.debug("CORS initialized")
 
+        # Latency, in-flight and response size metrics for /metrics, sampled request logs
+        install_request_metrics(flask_app)
+
         # Configure upload folder
         flask_app.config["UPLOAD_FOLDER"] = os.path.join(project_root, "uploads")
         logger.debug("Upload folder set to: %s", flask_app.config["UPLOAD_FOLDER"])
@@ -50,14 +59,6 @@ def create_app():
         except ImportError as e:
             logger.error("Failed to register routes: %s", e, exc_info=True)
 
-        @flask_app.route("/", defaults={"path": ""})
-        @flask_app.route("/<path:path>")
-        def serve_frontend(path):
-            logger.debug("Serving frontend for path: %s", path)
-            if path != "" and os.path.exists(os.path.join(flask_app.static_folder, path)):
-                return send_from_directory(flask_app.static_folder, path)
-            return send_from_directory(flask_app.static_folder, "index.html")
-
         logger.info("Finished create_app()")
         return flask_app
     except (OSError, ImportError) as e:
@@ -0,0 +1,4 @@
+# pylint: disable=missing-module-docstring, missing-final-newline
+from .fundamentals import metadata, fundamentals_tables
+
+__all__ = ["metadata", "fundamentals_tables"]
@@ -0,0 +1,58 @@
+# pylint: disable = missing-module-docstring, missing-final-newline, trailing-whitespace, line-too-long
+import os
+import re
+import json
+from pathlib import Path
+from sqlalchemy import MetaData, Table, Column, String, Float, Boolean, Index
+
+# JSON Schemas written by schemas/schema_generator.py, one per FMP endpoint
+SCHEMA_DIR = Path(os.getenv("FMP_SCHEMA_DIR", str(Path(__file__).resolve().parents[2] / "schemas")))
+
+# Key columns, in index order, whichever of them an endpoint returns
+KEY_COLUMNS = ("symbol", "period", "date")
+
+# Integers arrive as floats from the bulk CSVs and can exceed 32 bits, store every number as a double
+TYPE_MAP = {
+    "string": String,
+    "integer": lambda: Float(precision=53),
+    "number": lambda: Float(precision=53),
+    "boolean": Boolean,
+}
+
+metadata = MetaData()
+
+def table_name(schema_name):
+    # "Key Metrics TTM" -> "key_metrics_ttm"
+    return re.sub(r"[^a-z0-9]+", "_", schema_name.lower()).strip("_")
+
+def table_from_schema(name, schema):
+    """Build a table from a generated JSON Schema, keyed and indexed on (symbol, period, date)."""
+    properties = dict(schema.get("items", schema)["properties"])
+    # Single-symbol endpoints (TTM metrics, scores) omit the symbol, the bulk files always carry it
+    properties.setdefault("symbol", {"type": "string"})
+
+    keys = [column for column in KEY_COLUMNS if column in properties]
+    columns = [Column(column, String, primary_key=True) for column in keys]
+    for column, spec in properties.items():
+        if column in keys:
+            continue
+        column_type = TYPE_MAP.get(spec.get("type"), String)
+        columns.append(Column(column, column_type()))
+    columns.append(Column("fetched_at", Float(precision=53)))
+
+    table = Table(name, metadata, *columns)
+    # The primary key covers (symbol, period, date) lookups, this one serves latest-by-date reads across periods
+    if "date" in keys and len(keys) == 3:
+        Index(f"ix_{name}_symbol_date", table.c.symbol, table.c.date)
+    return table
+
+def load_tables(schema_dir=SCHEMA_DIR):
+    tables = {}
+    for path in sorted(Path(schema_dir).glob("*.json")):
+        with open(path, encoding="utf-8") as f:
+            schema = json.load(f)
+        name = table_name(path.stem)
+        tables[name] = table_from_schema(name, schema)
+    return tables
+
+fundamentals_tables = load_tables()
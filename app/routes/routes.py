@@ -1,9 +1,25 @@
 # pylint: disable=missing-module-docstring, missing-function-docstring, missing-class-docstring, missing-final-newline, trailing-whitespace, line-too-long
-import os
+import json
 import pandas as pd
-from flask import jsonify, send_from_directory, current_app, request, Response
+from flask import jsonify, current_app, request, Response
 from werkzeug.utils import secure_filename
-from ..utils.clean_file_data import clean_and_save_file
+from ..utils.clean_file_data import process_upload, stream_and_save_file, rescreen_upload, store_upload, run_rule_sets, query_upload_result, value_upload_result, project_upload_result
+from ..utils.batch import process_batch
+from ..utils.rule_engine import parse_rule_set
+from ..utils.valuation import ValuationParams, parse_steps
+from ..utils.projection import parse_percentiles, PROJECTION_YEARS, PROJECTION_PATHS
+from ..utils.serialization import DateTimeEncoder, ORIENTATIONS, STREAM_FORMATS
+from ..utils.jobs import get_job_queue, QueueFullError, RETRY_AFTER
+from ..utils.result_store import get_result_store
+from ..utils.snapshot_store import get_snapshot_store
+from ..utils.instrumentation import metrics as registry, run_profiled, attach_profile, PROFILING_ENABLED
+from ..utils.static_assets import StaticManifest
+
+def call_profiled(func, *args, **kwargs):
+    # "?profile=1" runs the call under cProfile and returns its profile alongside the result
+    if PROFILING_ENABLED and request.args.get("profile", "0").lower() in ("1", "true", "yes"):
+        return run_profiled(func, *args, **kwargs)
+    return func(*args, **kwargs), None
 
 def register_routes(app):
     @app.route("/api/data")
@@ -30,30 +46,238 @@ def register_routes(app):
                     ),
                     400,
                 )
+            # Compact records by default, "?orient=columns" and "?pretty=1" are opt-in
+            orient = request.args.get("orient", "records")
+            if orient not in ORIENTATIONS:
+                return jsonify({"error": f"Unsupported orientation '{orient}', expected one of {', '.join(ORIENTATIONS)}."}), 400
+            pretty = request.args.get("pretty", "0").lower() in ("1", "true", "yes")
+            # "?stream=ndjson" or "?stream=json" sends the result in batches instead of one string
+            stream = request.args.get("stream")
+            if stream and stream not in STREAM_FORMATS:
+                return jsonify({"error": f"Unsupported stream format '{stream}', expected one of {', '.join(STREAM_FORMATS)}."}), 400
+            # "?async=1" only stores the upload and queues the screening, poll /api/jobs/<job_id> for the result
+            run_async = request.args.get("async", "0").lower() in ("1", "true", "yes")
             try:
-                json_output = clean_and_save_file(file, current_app.config["UPLOAD_FOLDER"])
-                # Return the raw JSON string
-                return Response(json_output, mimetype='application/json')
+                if run_async:
+                    _, upload_id, _ = store_upload(file, current_app.config["UPLOAD_FOLDER"])
+                    try:
+                        job_id = get_job_queue().submit(current_app.config["UPLOAD_FOLDER"], upload_id, orient=orient, pretty=pretty)
+                    except QueueFullError as e:
+                        return jsonify({"error": str(e)}), 429, {"Retry-After": str(RETRY_AFTER)}
+                    return jsonify({
+                        "job_id": job_id,
+                        "upload_id": upload_id,
+                        "status": "queued",
+                        "status_url": f"/api/jobs/{job_id}",
+                    }), 202
+                if stream:
+                    upload_id, chunks = stream_and_save_file(file, current_app.config["UPLOAD_FOLDER"], stream=stream)
+                    mimetype = "application/x-ndjson" if stream == "ndjson" else "application/json"
+                    return Response(chunks, mimetype=mimetype, headers={"X-Upload-Id": upload_id})
+                (upload_id, json_output), profile = call_profiled(process_upload, file, current_app.config["UPLOAD_FOLDER"], orient=orient, pretty=pretty)
+                if profile is not None:
+                    json_output = attach_profile(json_output, profile)
+                # Return the raw JSON string, the upload id can be passed to /api/rescreen/<upload_id>
+                return Response(json_output, mimetype='application/json', headers={"X-Upload-Id": upload_id})
             except (pd.errors.ParserError, pd.errors.EmptyDataError, ValueError, IOError, OSError) as e:
                 return jsonify({"error": f"An error occurred while processing the file: {str(e)}"}), 500
 
+    @app.route("/api/batch", methods=["POST"])
+    def batch_upload():
+        # Several "file" parts and/or "upload_id" values of earlier uploads, "sheets=Champions,Contenders" (default "All")
+        files = request.files.getlist("file")
+        for file in files:
+            extension = secure_filename(file.filename).rsplit(".", 1)[-1].lower() if file.filename else ""
+            if extension not in ["csv", "xls", "xlsx"]:
+                return jsonify({"error": f"Unsupported file format for '{file.filename}'. Please upload CSV, XLS, or XLSX files."}), 400
+        upload_ids = request.form.getlist("upload_id") + request.args.getlist("upload_id")
+        if not files and not upload_ids:
+            return jsonify({"error": "No file part or upload id"}), 400
+        sheets = request.values.get("sheets")
+        orient = request.args.get("orient", "records")
+        pretty = request.args.get("pretty", "0").lower() in ("1", "true", "yes")
+        try:
+            (upload_ids, json_output), profile = call_profiled(
+                process_batch, files, current_app.config["UPLOAD_FOLDER"], upload_ids=upload_ids, sheet_names=sheets, orient=orient, pretty=pretty
+            )
+            if profile is not None:
+                json_output = attach_profile(json_output, profile)
+            return Response(json_output, mimetype='application/json', headers={"X-Upload-Id": ",".join(upload_ids)})
+        except FileNotFoundError as e:
+            return jsonify({"error": str(e)}), 404
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except (pd.errors.ParserError, IOError, OSError) as e:
+            return jsonify({"error": f"An error occurred while processing the files: {str(e)}"}), 500
+
+    @app.route("/api/rescreen/<upload_id>", methods=["GET", "POST"])
+    def rescreen(upload_id):
+        # Re-run the screen of an earlier upload against the current market data, without parsing Excel again
+        orient = request.args.get("orient", "records")
+        if orient not in ORIENTATIONS:
+            return jsonify({"error": f"Unsupported orientation '{orient}', expected one of {', '.join(ORIENTATIONS)}."}), 400
+        pretty = request.args.get("pretty", "0").lower() in ("1", "true", "yes")
+        try:
+            json_output, profile = call_profiled(rescreen_upload, upload_id, current_app.config["UPLOAD_FOLDER"], orient=orient, pretty=pretty)
+            if profile is not None:
+                json_output = attach_profile(json_output, profile)
+            return Response(json_output, mimetype='application/json', headers={"X-Upload-Id": upload_id})
+        except FileNotFoundError as e:
+            return jsonify({"error": str(e)}), 404
+        except (pd.errors.ParserError, ValueError, IOError, OSError) as e:
+            return jsonify({"error": f"An error occurred while processing the file: {str(e)}"}), 500
+
+    @app.route("/api/results/<upload_id>")
+    def query_results(upload_id):
+        # ?filter=<rule expression>&sort=-Div Yield,Symbol&columns=Symbol,Div Yield&page=1&page_size=100
+        try:
+            payload, profile = call_profiled(
+                query_upload_result,
+                upload_id,
+                current_app.config["UPLOAD_FOLDER"],
+                filter_expression=request.args.get("filter"),
+                sort=request.args.get("sort"),
+                columns=request.args.get("columns"),
+                page=request.args.get("page", 1, type=int),
+                page_size=request.args.get("page_size", 100, type=int),
+                orient=request.args.get("orient", "records"),
+            )
+            if profile is not None:
+                payload["profile"] = profile
+            return Response(DateTimeEncoder(separators=(",", ":")).encode(payload), mimetype='application/json')
+        except FileNotFoundError as e:
+            return jsonify({"error": str(e)}), 404
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except (pd.errors.ParserError, IOError, OSError) as e:
+            return jsonify({"error": f"An error occurred while processing the file: {str(e)}"}), 500
+
+    @app.route("/api/valuation/<upload_id>")
+    def valuation(upload_id):
+        # ?terminal_growth=0.025&high_growth_years=5&fade_years=5&beta=1&symbols=KO,PEP&grid=1&growth_steps=-0.01,0,0.01
+        args = request.args
+        try:
+            params = ValuationParams(
+                high_growth_years=args.get("high_growth_years", ValuationParams.high_growth_years, type=int),
+                fade_years=args.get("fade_years", ValuationParams.fade_years, type=int),
+                terminal_growth=args.get("terminal_growth", ValuationParams.terminal_growth, type=float),
+                max_growth=args.get("max_growth", ValuationParams.max_growth, type=float),
+                beta=args.get("beta", ValuationParams.beta, type=float),
+            )
+            grid = args.get("grid", "0").lower() in ("1", "true", "yes") or "growth_steps" in args or "discount_steps" in args
+            symbols = [symbol.strip() for symbol in args.get("symbols", "").split(",") if symbol.strip()]
+            payload, profile = call_profiled(
+                value_upload_result,
+                upload_id,
+                current_app.config["UPLOAD_FOLDER"],
+                params=params,
+                symbols=symbols or None,
+                growth_steps=parse_steps(args.get("growth_steps")) if grid else None,
+                discount_steps=parse_steps(args.get("discount_steps")) if grid else None,
+                orient=args.get("orient", "records"),
+            )
+            if profile is not None:
+                payload["profile"] = profile
+            return Response(DateTimeEncoder(separators=(",", ":")).encode(payload), mimetype='application/json')
+        except FileNotFoundError as e:
+            return jsonify({"error": str(e)}), 404
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except (pd.errors.ParserError, IOError, OSError) as e:
+            return jsonify({"error": f"An error occurred while processing the file: {str(e)}"}), 500
+
+    @app.route("/api/projection/<upload_id>")
+    def projection(upload_id):
+        # ?years=10&paths=10000&percentiles=5,25,50,75,95&seed=42&symbols=KO,PEP
+        args = request.args
+        try:
+            symbols = [symbol.strip() for symbol in args.get("symbols", "").split(",") if symbol.strip()]
+            payload, profile = call_profiled(
+                project_upload_result,
+                upload_id,
+                current_app.config["UPLOAD_FOLDER"],
+                years=args.get("years", PROJECTION_YEARS, type=int),
+                paths=args.get("paths", PROJECTION_PATHS, type=int),
+                percentiles=parse_percentiles(args.get("percentiles")),
+                seed=args.get("seed", None, type=int),
+                symbols=symbols or None,
+                orient=args.get("orient", "records"),
+            )
+            if profile is not None:
+                payload["profile"] = profile
+            return Response(DateTimeEncoder(separators=(",", ":")).encode(payload), mimetype='application/json')
+        except FileNotFoundError as e:
+            return jsonify({"error": str(e)}), 404
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except (pd.errors.ParserError, IOError, OSError) as e:
+            return jsonify({"error": f"An error occurred while processing the file: {str(e)}"}), 500
+
+    @app.route("/api/screen/<upload_id>", methods=["POST"])
+    def custom_screen(upload_id):
+        # Body: one rule set, a list of rule sets, or {"rule_sets": [...]}, as JSON (or YAML when PyYAML is installed)
+        orient = request.args.get("orient", "records")
+        try:
+            body = parse_rule_set(request.get_data(as_text=True))
+            if isinstance(body, dict) and "rule_sets" in body:
+                body = body["rule_sets"]
+            definitions = body if isinstance(body, list) else [body]
+            payload, profile = call_profiled(run_rule_sets, upload_id, current_app.config["UPLOAD_FOLDER"], definitions, orient=orient)
+            if profile is not None:
+                payload["profile"] = profile
+            return Response(DateTimeEncoder(separators=(",", ":")).encode(payload), mimetype='application/json')
+        except FileNotFoundError as e:
+            return jsonify({"error": str(e)}), 404
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except (pd.errors.ParserError, IOError, OSError) as e:
+            return jsonify({"error": f"An error occurred while processing the file: {str(e)}"}), 500
+
+    @app.route("/api/jobs/<job_id>")
+    def get_job(job_id):
+        record = get_job_queue().get(current_app.config["UPLOAD_FOLDER"], job_id)
+        if record is None:
+            return jsonify({"error": f"No job with id '{job_id}'."}), 404
+        if record["status"] != "done":
+            return jsonify(record)
+        result = get_result_store(current_app.config["UPLOAD_FOLDER"]).read_result(record["result_key"])
+        if result is None:
+            return jsonify({"error": "The job result has expired, upload the file again."}), 404
+        # Embed the stored JSON as-is instead of parsing and re-encoding it
+        header = json.dumps({key: value for key, value in record.items() if key != "result_key"})
+        return Response(header[:-1] + ', "result": ' + result + "}", mimetype='application/json')
+
+    @app.route("/api/snapshots")
+    def list_snapshots():
+        return jsonify({"snapshots": get_snapshot_store(current_app.config["UPLOAD_FOLDER"]).dates()})
+
+    @app.route("/api/snapshots/<as_of_date>/diff")
+    def diff_snapshot(as_of_date):
+        # Screening flags that flipped since the previous snapshot, or since "?previous=YYYY-MM-DD"
+        try:
+            return jsonify(get_snapshot_store(current_app.config["UPLOAD_FOLDER"]).diff(as_of_date, request.args.get("previous")))
+        except FileNotFoundError as e:
+            return jsonify({"error": str(e)}), 404
+        except (ValueError, IOError, OSError) as e:
+            return jsonify({"error": f"An error occurred while comparing snapshots: {str(e)}"}), 500
+
+    @app.route("/metrics")
+    def metrics():
+        # Pipeline stage, request and upstream metrics of every worker on this host, in Prometheus text format
+        return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+    # The exported frontend is indexed once, asset requests never touch the filesystem to find a file
+    static_manifest = StaticManifest(app.static_folder)
+
     @app.route("/", defaults={"path": ""})
     @app.route("/<path:path>")
     def serve_next(path):
-        print(f"Requested path: {path}")
-        print(f"Full path: {os.path.join(current_app.static_folder, path)}")
         if path.startswith("api/"):
-            # Let Flask handle API routes
-            return app.send_static_file("404.html")
-        # Try to serve the file directly
-        if path != "" and os.path.exists(os.path.join(current_app.static_folder, path)):
-            return send_from_directory(current_app.static_folder, path)
-        # For app router, we need to check for HTML files
-        if path == "" or "." not in path:
-            if os.path.exists(os.path.join(current_app.static_folder, f"{path}.html")):
-                return send_from_directory(current_app.static_folder, f"{path}.html")
-        return send_from_directory(current_app.static_folder, "index.html")
-    
-    # This line is optional, but can be helpful for debugging
-    if __name__ == "__main__":
-        print("Routes module loaded successfully")
\ No newline at end of file
+            # Unknown API routes get the exported 404 page
+            not_found = static_manifest.find("404.html")
+            return static_manifest.send(not_found, status=404) if not_found else (jsonify({"error": "Not found"}), 404)
+        # Unknown paths fall back to index.html for the app router
+        asset = static_manifest.find(path) or static_manifest.find("index.html")
+        if asset is None:
+            return jsonify({"error": "Not found"}), 404
+        return static_manifest.send(asset)
@@ -0,0 +1,139 @@
+# pylint: disable = missing-module-docstring, missing-final-newline, trailing-whitespace, line-too-long
+import os
+import json
+import logging
+from concurrent.futures.process import BrokenProcessPool
+from .clean_file_data import (
+    UPLOAD_ID_PATTERN, store_upload, load_normalized_sheet, sheet_symbols, apply_screen,
+    save_screened_result, sheet_result_key, get_market_data,
+)
+from .fmp_api_calls import get_all_eps
+from .result_store import get_result_store
+from .serialization import serialize_result, ORIENTATIONS
+from .instrumentation import stage
+from .jobs import get_process_pool, reset_process_pool, JOB_WORKERS
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on the (workbook, sheet) pairs of one batch
+BATCH_MAX_SHEETS = int(os.getenv("BATCH_MAX_SHEETS", "32"))
+
+# Sheet screened when a batch names none
+DEFAULT_SHEETS = ("All",)
+
+# Excel caps sheet names at 31 characters
+MAX_SHEET_NAME_LENGTH = 31
+
+def parse_sheet_names(value):
+    """Sheet names from a comma-separated string or a list, deduplicated in order, ["All"] when none are given."""
+    if isinstance(value, str):
+        value = value.split(",")
+    names = list(dict.fromkeys(name.strip() for name in value or () if name and name.strip()))
+    for name in names:
+        if len(name) > MAX_SHEET_NAME_LENGTH:
+            raise ValueError(f"Invalid sheet name '{name}', sheet names have at most {MAX_SHEET_NAME_LENGTH} characters.")
+    return names or list(DEFAULT_SHEETS)
+
+def read_sheet_symbols(upload_folder, upload_id, sheet_name):
+    """Pool entry point: parse one sheet into the sheet cache and return its symbols."""
+    _, df = load_normalized_sheet(get_result_store(upload_folder), upload_id, sheet_name=sheet_name)
+    return sheet_symbols(df)
+
+def screen_sheet(upload_folder, upload_id, sheet_name, quotes, reference, orient, pretty):
+    """Pool entry point: screen one cached sheet with the batch's quotes, store and return its JSON."""
+    store = get_result_store(upload_folder)
+    result_metadata, df = load_normalized_sheet(store, upload_id, sheet_name=sheet_name)
+    df = apply_screen(df, reference, quotes=quotes)
+    # Flag snapshots and the queryable frame of an upload describe its "All" sheet
+    if sheet_name == "All":
+        save_screened_result(store, upload_id, reference, result_metadata, df)
+    with stage("serialize", rows=len(df)):
+        section_json = serialize_result(result_metadata, df, orient=orient, pretty=pretty)
+    with store.write_result(sheet_result_key(store, upload_id, reference, orient, pretty, sheet_name)) as f:
+        f.write(section_json)
+    return section_json
+
+class BatchRunner:
+    """Spreads the sheets of a batch over the worker's process pool, the one screening jobs run in.
+
+    Every sheet is parsed in a pool process first (the normalized frame lands in the sheet
+    cache), then the quotes of the deduplicated union of their symbols are fetched once here,
+    and finally every sheet is screened and serialized in a pool process again.
+    """
+
+    def __init__(self, in_process=JOB_WORKERS <= 1):
+        self.in_process = in_process
+
+    def map(self, func, calls):
+        """Results of func(*args) for every args tuple of calls, in order."""
+        if self.in_process or len(calls) <= 1:
+            return [func(*args) for args in calls]
+        pool = get_process_pool()
+        try:
+            return list(pool.map(func, *zip(*calls)))
+        except BrokenProcessPool as e:
+            # A pool process died (e.g. out of memory), the next batch or job starts a fresh pool
+            reset_process_pool(pool)
+            raise OSError(f"A batch worker process exited unexpectedly: {e}") from e
+
+    def screen(self, upload_folder, upload_ids, sheet_names=None, orient="records", pretty=False):
+        """Screen every named sheet of every stored upload, return the combined JSON text.
+
+        The result holds one section per (upload, sheet), in the order given, each with the
+        upload id, the sheet name and the same "metadata" and "data" as a single upload.
+        """
+        if orient not in ORIENTATIONS:
+            raise ValueError(f"Unsupported orientation '{orient}', expected one of {', '.join(ORIENTATIONS)}.")
+        upload_ids = list(dict.fromkeys(upload_ids))
+        for upload_id in upload_ids:
+            if not UPLOAD_ID_PATTERN.match(upload_id or ""):
+                raise ValueError(f"Invalid upload id '{upload_id}'.")
+        sections = [(upload_id, sheet_name) for upload_id in upload_ids for sheet_name in parse_sheet_names(sheet_names)]
+        if not sections or len(sections) > BATCH_MAX_SHEETS:
+            raise ValueError(f"Expected between 1 and {BATCH_MAX_SHEETS} sheets in a batch.")
+
+        store = get_result_store(upload_folder)
+        for upload_id in upload_ids:
+            if store.find_upload(upload_id) is None and not os.path.exists(store.sheet_path(upload_id)):
+                raise FileNotFoundError(f"No stored upload with id '{upload_id}'.")
+        reference = get_market_data()
+
+        # Sheets screened earlier against the same market-data snapshot are served from the store
+        results = {
+            section: store.read_result(sheet_result_key(store, section[0], reference, orient, pretty, section[1]))
+            for section in sections
+        }
+        pending = [section for section, cached in results.items() if cached is None]
+        if pending:
+            symbol_lists = self.map(read_sheet_symbols, [(upload_folder, upload_id, sheet_name) for upload_id, sheet_name in pending])
+            symbols = list(dict.fromkeys(symbol for symbol_list in symbol_lists for symbol in symbol_list))
+            with stage("batch_quotes", rows=len(symbols)):
+                quotes = get_all_eps(symbols)
+            screened = self.map(screen_sheet, [(upload_folder, upload_id, sheet_name, quotes, reference, orient, pretty) for upload_id, sheet_name in pending])
+            results.update(zip(pending, screened))
+
+        # Splice the stored section documents in as-is instead of parsing and re-encoding them
+        parts = []
+        for (upload_id, sheet_name), section_json in results.items():
+            header = json.dumps({"upload_id": upload_id, "sheet": sheet_name}, separators=(",", ":"))
+            parts.append(header[:-1] + "," + section_json.lstrip()[1:])
+        metadata = json.dumps({"uploads": len(upload_ids), "sheets": len(sections)}, separators=(",", ":"))
+        return '{"metadata":' + metadata + ',"sections":[' + ",".join(parts) + "]}"
+
+_batch_runner = None
+
+def get_batch_runner():
+    global _batch_runner  # pylint: disable=global-statement
+    if _batch_runner is None:
+        _batch_runner = BatchRunner()
+    return _batch_runner
+
+def screen_batch(upload_folder, upload_ids, sheet_names=None, orient="records", pretty=False):
+    """Library entry point for stored uploads, see BatchRunner.screen."""
+    return get_batch_runner().screen(upload_folder, upload_ids, sheet_names, orient, pretty)
+
+def process_batch(files, upload_folder, upload_ids=(), sheet_names=None, orient="records", pretty=False):
+    """Store every uploaded workbook, then screen them together with earlier uploads, return (upload ids, JSON string)."""
+    stored = [store_upload(file, upload_folder)[1] for file in files if file and file.filename]
+    upload_ids = list(dict.fromkeys([*stored, *upload_ids]))
+    return upload_ids, screen_batch(upload_folder, upload_ids, sheet_names, orient, pretty)
@@ -1,387 +1,395 @@
 # pylint: disable = missing-module-docstring, missing-function-docstring, missing-final-newline, trailing-whitespace, line-too-long, missing-class-docstring, invalid-name
 import os
+import re
 import json
-from datetime import datetime, date
+from datetime import datetime
 from collections import OrderedDict
 import logging
 import pandas as pd
-import numpy as np
 from werkzeug.utils import secure_filename
-from .fmp_api_calls import get_10_year_tbill, get_30_year_tbond, get_all_eps, get_industry_pe_values, get_sector_pe_values, get_market_risk_premium
-from .mappings import industry_mapping, sector_mapping, dividend_category_mapping
+from .fmp_api_calls import get_all_eps
+from .fundamentals_store import join_fundamentals, fundamentals_store, SCREEN_FUNDAMENTALS
+from .market_data import market_data, snapshot_version
+from .result_store import get_result_store, CHUNK_SIZE
+from .sheet_cache import save_sheet, load_sheet
+from .snapshot_store import get_snapshot_store, AS_OF_PATTERN
+from .mappings import industry_mapping, sector_mapping
+from .workbook_reader import read_workbook_sheet, read_csv_sheet
+from .serialization import serialize_result, iter_serialized_result, dataframe_to_custom_json, STREAM_FORMATS
+from .screening import lookup_pe
+from .result_query import save_result_frame, load_result_frame, filter_mask, parse_columns, query_frame, DEFAULT_PAGE_SIZE
+from .rule_engine import default_rule_set, reference_variables, compile_rule_set, evaluate_rule_sets
+from .instrumentation import stage
+from .sheet_schema import layout_sheet, compact_dtypes
+from .valuation import value_frame
+from .projection import project_frame, PROJECTION_YEARS, PROJECTION_PATHS, PROJECTION_PERCENTILES
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Call the API once to get the 10-year T-bill rate
-tbill_rate = get_10_year_tbill()
+# Upload ids are the sha256 of the uploaded bytes
+UPLOAD_ID_PATTERN = re.compile(r"^[0-9a-f]{64}$")
 
-# Call the API once to get the 30-year t-bond rate
-tbond_rate = get_30_year_tbond()
+def normalize_sheet(file_path, sheet_name="All"):
+    """Read one sheet ("All" unless another is named) of a saved workbook and apply the column cleanup, return (metadata, frame)."""
+    if file_path:
+        if file_path.endswith(".xls") or file_path.endswith(".xlsx") or file_path.endswith(".csv"):
+            if file_path.endswith(".csv"):
+                # A CSV export holds the "All" sheet only, with the same title, as-of and header rows
+                if sheet_name != "All":
+                    raise ValueError(f"A CSV file holds a single sheet, it has no sheet named '{sheet_name}'.")
+                title, date_time, df = read_csv_sheet(file_path)
+            else:
+                # Open the workbook once: title and date from the first two rows, data below the header row
+                title, date_time, df = read_workbook_sheet(file_path, sheet_name=sheet_name)
+            
+            # Format the date_time to remove the timestamp
+            if isinstance(date_time, (datetime, pd.Timestamp)):
+                date_time = date_time.date().isoformat()
+            elif isinstance(date_time, str):
+                # If it's already a string, try to parse and format it
+                try:
+                    parsed_date = datetime.fromisoformat(date_time)
+                    date_time = parsed_date.date().isoformat()
+                except ValueError:
+                    # If parsing fails, keep the original string
+                    pass
+            
+            # Drop, rename and reorder columns as declared in sheet_schema, in one pass
+            df = layout_sheet(df)
+            
+            # map column values from excel file to api response for industry and sector
+            df['Industry'] = df['Industry'].map(industry_mapping)
+            df['Sector'] = df['Sector'].map(sector_mapping)
+
+            # Replace null entries in "Chowder Number" column with 0
+            df["Chowder Number"] = df["Chowder Number"].fillna(0)
+            
+            # Categoricals and narrow numbers for the cached sheet
+            compact_dtypes(df)
+            
+            # Metadata header for the JSON output
+            result_metadata = OrderedDict([
+                ("title", title),
+                ("as_of_date", date_time)
+            ])
 
-# Get the industry and sector PE values
-industry_pe_dict = get_industry_pe_values()
-sector_pe_dict = get_sector_pe_values()
+            return result_metadata, df
+        else:
+            raise ValueError("The file is not an Excel (.xls or .xlsx) or CSV file.")
+    return None
 
-# Get the market risk premium rate
-market_risk_premium = get_market_risk_premium()
+def get_market_data():
+    # Market reference data, fetched lazily and cached across uploads and workers
+    with stage("market_data"):
+        return market_data.get()
 
-# Function to safely get PE value
-def safe_get_pe(dictionary, exchange, key):
-    return dictionary.get((exchange, key), np.nan)
+def sheet_symbols(df):
+    # Company symbols of a sheet, the quote fetch batches them by URL length
+    return df['Symbol'].dropna().astype(str).tolist()
 
-# parse dividend category year ranges into a string range mapping
-def parse_range(range_str):
-    """Parse a string range into a tuple of integers."""
-    if range_str.endswith('+'):
-        return (int(range_str[:-1]), float('inf'))
-    return tuple(map(int, range_str.split('-')))
-    
-# get dividend category based on years and a string range mapping
-def get_dividend_category(years, category_mapping):
-    """Determine the dividend category based on years and a string range mapping."""
-    for category, range_str in category_mapping.items():
-        start, end = parse_range(range_str)
-        if start <= years <= end:
-            return category
-    return "N/A"  # or any default category you prefer
-
-# Get dividend categories in parsed years
-def categorize_dividend(years):
-    return get_dividend_category(years, dividend_category_mapping)
-
-# Estimate the standard deviation of the DGR
-def calculate_dgr_cv(dgr_1y, dgr_3y, dgr_5y):
-    estimated_series = [dgr_1y, dgr_3y, dgr_3y, dgr_5y, dgr_5y]
-    std_dev = np.std(estimated_series)
-    mean = np.mean(estimated_series)
-    return (std_dev / mean) * 100 if mean != 0 else float('inf')
-
-# Estimate the standard deviation of the DGR
-def categorize_dgr_volatility(cv):
-    if cv < 20:
-        return "Low Volatility"
-    elif 20 <= cv < 50:
-        return "Medium Volatility"
-    else:
-        return "High Volatility"
+def merge_quotes(df, quotes=None):
+    """Left-join EPS and exchange quotes for every symbol of the sheet, fetched unless a quotes frame is given."""
+    with stage("eps_merge", rows=len(df)):
+        # call bulk API endpoint to retrieve all eps values (one row per symbol)
+        all_eps = get_all_eps(sheet_symbols(df)) if quotes is None else quotes
+        
+        # add eps and exchange columns by symbol, without copying the frame like a merge would
+        quotes = all_eps.set_index('Symbol').reindex(df['Symbol'])
+        for column in quotes.columns:
+            df[column] = quotes[column].to_numpy()
+        return df
 
-# Define chowder number criteria
-def meets_chowder_criteria(row):
-    yield_threshold = 3.0
-    high_yield_chowder = 12
-    low_yield_chowder = 15
+def add_derived_columns(df, reference, rule_set=None):
+    """Add the P/E lookups and every rule-defined column to a frame that already carries quotes."""
+    with stage("derived_columns", rows=len(df)):
+        # Apply the PE values for Sector and Industry
+        df['Industry PE'] = lookup_pe(df, reference.industry_pe_dict, 'Industry')
+        df['Sector PE'] = lookup_pe(df, reference.sector_pe_dict, 'Sector')
+        
+        # Rename Annualized to Annualized Dividend
+        df.rename(columns={"Annualized": "Annualized Dividend"}, inplace=True)
+        
+        # Flags, ratios and categories, evaluated column-wise by the rule engine
+        rule_set = rule_set or default_rule_set()
+        df = rule_set.apply(df, reference_variables(reference))
+        
+        # Categoricals, nullable boolean flags and narrow numbers where lossless
+        return compact_dtypes(df)
+
+def apply_screen(df, reference=None, rule_set=None, quotes=None):
+    """Merge EPS quotes into a normalized sheet and add every derived screening column.
+
+    The derived columns come from a compiled rule set, app/rules/default_screen.json unless another is given.
+    quotes (Symbol, Exchange, EPS) can be fetched up front, e.g. once for several sheets.
+    """
+    df = merge_quotes(df, quotes)
     
-    if row['Div Yield'] >= yield_threshold:
-        return row['Chowder Number'] >= high_yield_chowder
-    return row['Chowder Number'] >= low_yield_chowder
-
-class DateTimeEncoder(json.JSONEncoder):
-    # Custom JSON encoder to handle datetime objects
-    def default(self, o):
-        # Convert datetime and date objects to ISO format
-        if isinstance(o, (datetime, date)):
-            # Use the ISO format without milliseconds
-            return o.isoformat()
-        # Let the base class default method raise the TypeError
-        return super(DateTimeEncoder, self).default(o)
-
-def dataframe_to_custom_json(df):
-    # Use the current DataFrame column order instead of reading from Excel
-    column_order = df.columns.tolist()
-
-    # Reset index to make sure we include any index as a column
-    df_reset = df.reset_index(drop=True)
+    if reference is None:
+        reference = get_market_data()
     
-    # Convert datetime columns to strings
-    for col in df_reset.select_dtypes(include=['datetime64', 'datetime64[ns]']).columns:
-        df_reset[col] = df_reset[col].dt.date.astype(str)
+    df = add_derived_columns(df, reference, rule_set)
     
-    # Convert to list of OrderedDicts to preserve current column order
-    result = []
-    for _, row in df_reset.iterrows():
-        ordered_row = OrderedDict()
-        for col in column_order:
-            value = row[col]
-            # Convert NaN to null for JSON compatibility
-            if pd.isna(value):
-                ordered_row[col] = None
-            elif isinstance(value, bool):
-                ordered_row[col] = bool(value)  # Ensure booleans are correctly serialized
-            elif isinstance(value, str) and len(value) == 19 and value[10] == ' ':
-                # This checks if the value looks like "YYYY-MM-DD HH:MM:SS"
-                ordered_row[col] = value[:10]  # Keep only "YYYY-MM-DD"
-            else:
-                ordered_row[col] = value
-        result.append(ordered_row)
+    # Extra columns from the local fundamentals store, when configured
+    if SCREEN_FUNDAMENTALS:
+        with stage("fundamentals_join", rows=len(df)):
+            df = join_fundamentals(df, SCREEN_FUNDAMENTALS)
     
-    return result
-
-def clean_and_save_file(file, upload_folder):
-    if file and file.filename:
-        filename = secure_filename(file.filename)
-        file_path = os.path.join(upload_folder, filename)
-        file.save(file_path)
-
-        if filename.endswith(".xls") or filename.endswith(".xlsx"):
-            xls = pd.ExcelFile(file_path)
-
-            if "All" in xls.sheet_names:
-                # Read metadata from first two rows
-                metadata = pd.read_excel(file_path, sheet_name="All", nrows=2, header=None)
-                title = metadata.iloc[0, 0]
-                date_time = metadata.iloc[1, 0]
-                
-                # Format the date_time to remove the timestamp
-                if isinstance(date_time, (datetime, pd.Timestamp)):
-                    date_time = date_time.date().isoformat()
-                elif isinstance(date_time, str):
-                    # If it's already a string, try to parse and format it
-                    try:
-                        parsed_date = datetime.fromisoformat(date_time)
-                        date_time = parsed_date.date().isoformat()
-                    except ValueError:
-                        # If parsing fails, keep the original string
-                        pass
-                
-                # Read the main data, skipping the first two rows
-                df = pd.read_excel(file_path, sheet_name="All", header=2, parse_dates=True)
-                
-                # Convert all company symbols to a comma-separated string
-                companies = ','.join(df['Symbol'])
-                
-                # call bulk API endpoint to retrieve all eps values
-                all_eps = get_all_eps(companies)
-                
-                # drop column with name of "FV"
-                if "FV" in df.columns:
-                    df = df.drop(columns=["FV"])
-                else:
-                    print("Warning: 'FV' column not found")
-
-                # Move 'Industry' to the third position
-                if 'Industry' in df.columns:
-                    industry_col = df.pop('Industry')
-                    df.insert(3, 'Industry', industry_col)
-                else:
-                    print("Warning: 'Industry' column not found")
-                
-                # drop column with name of "New Member"
-                if "New Member" in df.columns:
-                    df = df.drop(columns=["New Member"])
-                else:
-                    print("Warning: 'New Member' column not found")
-                
-                # Move 'Fair Value' to the fourth position
-                if 'Fair Value' in df.columns:
-                    fair_value_col = df.pop('Fair Value')
-                    df.insert(4, 'Fair Value', fair_value_col)
-                else:
-                    print("Warning: 'Fair Value' column not found")
-                
-                # Move 'FV %' to the fifth position
-                if 'FV %' in df.columns:
-                    fv_percent_col = df.pop('FV %')
-                    df.insert(5, 'FV %', fv_percent_col)
-                else:
-                    print("Warning: 'FV %' column not found")
-                
-                # Rename column "Price" to "Current Price"
-                if "Price" in df.columns:
-                    df.rename(columns={"Price": "Current Price"}, inplace=True)
-                else:
-                    print("Warning: 'Price' column not found")
-                
-                # drop column with name of "Unnamed: 24"
-                if "Unnamed: 24" in df.columns:
-                    df = df.drop(columns=["Unnamed: 24"])
-                else:
-                    print("Warning: 'Unnamed: 24' column not found")
-                
-                # map column values from excel file to api response for industry and sector
-                df['Industry'] = df['Industry'].map(industry_mapping)
-                df['Sector'] = df['Sector'].map(sector_mapping)
-
-                # Move "Chowder Number" to the sixth position
-                if "Chowder Number" in df.columns:
-                    chowder_number_col = df.pop("Chowder Number")
-                    df.insert(6, "Chowder Number", chowder_number_col)
-                else:
-                    print("Warning: 'Chowder Number' column not found")
-                
-                # Replace null entries in "Chowder Number" column with 0
-                df["Chowder Number"] = df["Chowder Number"].fillna(0)
-                
-                # Add the new "Meets Chowder Criteria" column
-                df['Meets Chowder Criteria'] = df.apply(meets_chowder_criteria, axis=1)
-                
-                # Move "Meets Chowder Criteria" to the seventh position
-                if "Meets Chowder Criteria" in df.columns:
-                    meets_chowder_criteria_col = df.pop("Meets Chowder Criteria")
-                    df.insert(7, "Meets Chowder Criteria", meets_chowder_criteria_col)
-                else:
-                    print("Warning: 'Meets Chowder Criteria' column not found")
-                
-                # Add the new "Greater Than 10 Year T-Bill" column
-                df["Greater Than 10 Year T-Bill"] = np.nan
-                
-                # Move "Greater Than 10 Year T-Bill" to the eighth position
-                if "Greater Than 10 Year T-Bill" in df.columns:
-                    greater_than_10_year_tbill_col = df.pop("Greater Than 10 Year T-Bill")
-                    df.insert(8, "Greater Than 10 Year T-Bill", greater_than_10_year_tbill_col)
-                else:
-                    print("Warning: 'Greater Than 10 Year T-Bill' column not found")
-                
-                # Set initial value to 0 and then retrieve 10 year t-bill rate and add 1 then conpare to div yield
-                df["Greater Than 10 Year T-Bill"] = df.apply(lambda row: 
-                    (np.nan_to_num(row["Greater Than 10 Year T-Bill"], nan=tbill_rate) + 1) < row["Div Yield"], 
-                    axis=1
-                )
-                
-                # add eps and exchange columns
-                df = pd.merge(df, all_eps, on='Symbol', how='left')
-                
-                # create new columns for IRR and IRR Greater than T-Bond
-                df['IRR'] = (df['EPS'] / df['Current Price']) * 100
-                df['IRR Greater than T-Bond'] = df['IRR'] > tbond_rate
-                
-                # Move "IRR" to the ninth position
-                if "IRR" in df.columns:
-                    irr_col = df.pop("IRR")
-                    df.insert(9, "IRR", irr_col)
-                else:
-                    print("Warning: 'IRR' column not found")
-                
-                # Move "IRR Greater than T-Bond" to the tenth position
-                if "IRR Greater than T-Bond" in df.columns:
-                    irr_greater_than_tbond_col = df.pop("IRR Greater than T-Bond")
-                    df.insert(10, "IRR Greater than T-Bond", irr_greater_than_tbond_col)
-                else:
-                    print("Warning: 'IRR Greater than T-Bond' column not found")
-                
-                # create new column for PE Less Than Half EPS Growth Rate
-                df['PE Less Half EPS Growth Rate'] = df['P/E'] < (df['EPS 1Y'] / 2)
-                
-                # Move "PE Less Half EPS Growth Rate" to the eleventh position
-                if "PE Less Half EPS Growth Rate" in df.columns:
-                    pe_less_half_eps_growth_rate_col = df.pop("PE Less Half EPS Growth Rate")
-                    df.insert(11, "PE Less Half EPS Growth Rate", pe_less_half_eps_growth_rate_col)
-                else:
-                    print("Warning: 'PE Less Half EPS Growth Rate' column not found")
-                
-                # create new column for "Growth Plus Yield By PE Less Than 2"
-                df['Growth Plus Yield By PE Less Than 2'] = ((df['EPS 1Y'] + df['Div Yield']) / df['P/E']) > 2
-                
-                # Move "Growth Plus Yield By PE Less Than 2" to the twelfth position
-                if "Growth Plus Yield By PE Less Than 2" in df.columns:
-                    growth_plus_yield_by_pe_less_than_2_col = df.pop("Growth Plus Yield By PE Less Than 2")
-                    df.insert(12, "Growth Plus Yield By PE Less Than 2", growth_plus_yield_by_pe_less_than_2_col)
-                else:
-                    print("Warning: 'Growth Plus Yield By PE Less Than 2' column not found")
-                
-                # create new column for "Price to Cash Flow"
-                df['Price to Cash Flow'] = df['Current Price'] / df['CF/Share']
-                
-                # Move "Price to Cash Flow" to the thirteenth position
-                if "Price to Cash Flow" in df.columns:
-                    price_to_cash_flow_col = df.pop("Price to Cash Flow")
-                    df.insert(13, "Price to Cash Flow", price_to_cash_flow_col)
-                else:
-                    print("Warning: 'Price to Cash Flow' column not found")
-                
-                # create new colume for "PCF Ratio Less Than 10"
-                df['PCF Ratio Less Than 10'] = df['Price to Cash Flow'] < 10
-                
-                # Move "PCF Ratio Less Than 10" to the fourteenth position
-                if "PCF Ratio Less Than 10" in df.columns:
-                    pcf_ratio_less_than_10_col = df.pop("PCF Ratio Less Than 10")
-                    df.insert(14, "PCF Ratio Less Than 10", pcf_ratio_less_than_10_col)
-                else:
-                    print("Warning: 'PCF Ratio Less Than 10' column not found")
-                
-                # Apply the PE values for Sector and Industry
-                df['Industry PE'] = df.apply(lambda row: safe_get_pe(industry_pe_dict, row['Exchange'], row['Industry']), axis=1)
-                df['Sector PE'] = df.apply(lambda row: safe_get_pe(sector_pe_dict, row['Exchange'], row['Sector']), axis=1)
-                
-                # Add 'Less Than Industry PE' column
-                df['PE Less Than Industry PE'] = df['P/E'] < df['Industry PE']
-
-                # Add 'Less Than Sector PE' column
-                df['PE Less Than Sector PE'] = df['P/E'] < df['Sector PE']
-                
-                # Add 'Weighted DGR' column
-                df['Weighted DGR'] = (df['DGR 10Y'] * 0.2) + (df['DGR 5Y'] * 0.4) + (df['DGR 3Y'] * 0.3) + (df['DGR 1Y'] * 0.5)
-                
-                # Add '3Y DGR Greater Than 10Y DGR'
-                df['3Y DGR Greater Than 10Y DGR'] = df['DGR 3Y'] > df['DGR 10Y']
-                
-                # Add '1Y DGR Less Than 1Y ESP Growth Rate'
-                df['1Y DGR Less Than 1Y ESP Growth Rate'] = df['DGR 1Y'] < df['EPS 1Y']
-                
-                # Add 'Div Yield + Weighted DGR Greater Than Market Risk Rate + 10 Year T-Bill'
-                df['Div Yield + Weighted DGR Greater Than Market Risk Rate + 10 Year T-Bill'] = (df['Div Yield'] + df['Weighted DGR']) > (market_risk_premium + tbill_rate)
-                
-                # 1Y EPS Growth Greater Than Weighted DGR
-                df['1Y EPS Growth Greater Than Weighted DGR'] = df['EPS 1Y'] > df['Weighted DGR']
-                
-                # Div Yield + 1Y EPS Growth Greater Than Market Risk Rate + 10 Year T-Bill
-                df['Div Yield + 1Y EPS Growth Greater Than Market Risk Rate + 10 Year T-Bill'] = (df['Div Yield'] + df['EPS 1Y']) > (market_risk_premium + tbill_rate)
-                
-                # Rename Annualized to Annualized Dividend
-                df.rename(columns={"Annualized": "Annualized Dividend"}, inplace=True)
-                
-                # Calculate Payout Ratio
-                df['Payout Ratio'] = (df['Annualized Dividend'] / df['EPS']) * 100
-                
-                # Calculate FCF Payout Ratio
-                df['FCF Payout Ratio'] = (df['Annualized Dividend'] / df['CF/Share']) * 100
-                
-                # Calculate Dividend Coverage Ratio
-                df['Dividend Coverage Ratio'] = df['EPS'] / df['Annualized Dividend']
-                
-                # Calculate Dividend Growth Acceleration
-                df['Dividend Growth Acceleration'] = df['DGR 3Y'] - df['DGR 10Y']
-                
-                # Calculate Projected Yield on Cost
-                df['Projected Yield on Cost'] = (df['Div Yield']/100) * ((1 + (df['DGR 5Y']/100)) ** 5)
-                
-                # Return Dividend Category
-                df['Dividend Category'] = df['No Years'].apply(categorize_dividend)
-                
-                # Calculating 5-Year EPS CAGR from PEG and P/E
-                df['5-Year EPS CAGR'] = df['P/E'] / df['PEG']
-                
-                # Calculate DGR Coefficient of Variation and Categorize DGR Volatility
-                df['DGR_CV'] = df.apply(lambda row: calculate_dgr_cv(row['DGR 1Y'], row['DGR 3Y'], row['DGR 5Y']), axis=1)
-                df['DGR_Volatility_Category'] = df['DGR_CV'].apply(categorize_dgr_volatility)
-                
-                # Convert main data to list of OrderedDicts, passing the Excel file path
-                main_data = dataframe_to_custom_json(df)
-                
-                # Combine metadata and main data
-                full_data = OrderedDict([
-                    ("metadata", OrderedDict([
-                        ("title", title),
-                        ("as_of_date", date_time)
-                    ])),
-                    ("data", main_data)
-                ])
-
-                # Convert to JSON string
-                full_json = json.dumps(full_data, indent=2, cls=DateTimeEncoder)
-
-                # Save the JSON output
-                json_filename = os.path.splitext(filename)[0] + ".json"
-                json_path = os.path.join(upload_folder, json_filename)
-                with open(json_path, "w", encoding="utf-8") as f:
-                    f.write(full_json)
-
-                return full_json  # Return the JSON string
-            else:
-                raise ValueError("The Excel file does not contain a sheet named 'All'.")
-        else:
-            raise ValueError("The file is not an Excel file (.xls or .xlsx).")
-    return None
+    return df
+
+def result_variant(variant):
+    # Stored results depend on the default rule set, and on the fundamentals join when one is configured
+    variant = f"{variant}:rules={default_rule_set().digest[:16]}"
+    return f"{variant}:fundamentals={SCREEN_FUNDAMENTALS}" if SCREEN_FUNDAMENTALS else variant
+
+def screen_path(file_path, reference=None):
+    """Screen the "All" sheet of a saved workbook and return (metadata, screened frame)."""
+    result_metadata, df = normalize_sheet(file_path)
+    return result_metadata, apply_screen(df, reference)
+
+def load_normalized_sheet(store, content_hash, file_path=None, sheet_name="All"):
+    """Normalized sheet of an upload, from the columnar cache when present, otherwise parsed and cached."""
+    sheet_path = store.sheet_path(content_hash, sheet_name)
+    with stage("sheet_cache_read") as timing:
+        cached = load_sheet(sheet_path)
+        timing.rows = len(cached[1]) if cached is not None else 0
+    if cached is not None:
+        store.touch(sheet_path)
+        return cached
+    file_path = file_path or store.find_upload(content_hash)
+    if file_path is None:
+        raise FileNotFoundError(f"No stored upload with id '{content_hash}'.")
+    with stage("workbook_read") as timing:
+        result_metadata, df = normalize_sheet(file_path, sheet_name)
+        timing.rows = len(df)
+    save_sheet(sheet_path, result_metadata, df)
+    return result_metadata, df
+
+def record_snapshot(store, result_metadata, df):
+    # Keep the screened flags by as-of date so later sheets can be diffed against them
+    as_of_date = result_metadata.get("as_of_date")
+    if isinstance(as_of_date, str) and AS_OF_PATTERN.match(as_of_date):
+        with stage("snapshot", rows=len(df)):
+            get_snapshot_store(store.root).save(as_of_date, df)
+    else:
+        logger.warning("Not snapshotting a sheet without an ISO as-of date: %r", as_of_date)
+
+def store_upload(file, upload_folder):
+    """Save the upload by content and return (store, upload id, saved path)."""
+    store = get_result_store(upload_folder)
+    extension = os.path.splitext(secure_filename(file.filename))[1].lower()
+    content_hash, file_path = store.save_upload(file, extension)
+    return store, content_hash, file_path
+
+def result_frame_path(store, content_hash, reference):
+    # Columnar copy of a screened result, queried by /api/results/<upload_id>
+    return store.result_path(store.result_key(content_hash, snapshot_version(reference), result_variant("frame")), ".feather")
+
+def save_screened_result(store, content_hash, reference, result_metadata, df):
+    # Snapshot the flags and keep the queryable columnar copy of a freshly screened upload
+    record_snapshot(store, result_metadata, df)
+    with stage("result_frame_save", rows=len(df)):
+        save_result_frame(result_frame_path(store, content_hash, reference), result_metadata, df)
+
+def sheet_result_key(store, content_hash, reference, orient="records", pretty=False, sheet_name="All"):
+    # Stored JSON of one screened sheet, "All" keeps the key single-file uploads have always used
+    variant = f"{orient}:{int(bool(pretty))}"
+    if sheet_name != "All":
+        variant = f"sheet={sheet_name}:{variant}"
+    return store.result_key(content_hash, snapshot_version(reference), result_variant(variant))
+
+def screen_stored_upload_with_key(store, content_hash, orient="records", pretty=False, file_path=None):
+    """Return (result key, screened JSON) for a stored upload, reusing the stored result while the market-data snapshot is unchanged."""
+    reference = get_market_data()
+    key = sheet_result_key(store, content_hash, reference, orient, pretty)
+    with stage("result_cache_read"):
+        cached = store.read_result(key)
+    if cached is not None:
+        return key, cached
+
+    result_metadata, df = load_normalized_sheet(store, content_hash, file_path)
+    df = apply_screen(df, reference)
+    save_screened_result(store, content_hash, reference, result_metadata, df)
+
+    # Convert to JSON string, column by column
+    with stage("serialize", rows=len(df)):
+        full_json = serialize_result(result_metadata, df, orient=orient, pretty=pretty)
+
+    # Save the JSON output
+    with store.write_result(key) as f:
+        f.write(full_json)
+
+    return key, full_json
+
+def screen_stored_upload(store, content_hash, orient="records", pretty=False, file_path=None):
+    return screen_stored_upload_with_key(store, content_hash, orient, pretty, file_path)[1]
+
+def process_upload(file, upload_folder, orient="records", pretty=False):
+    """Store and screen an upload, return (upload id, JSON string)."""
+    if not (file and file.filename):
+        return None, None
+    # Uploads are stored by content, identical bytes with an unchanged market-data snapshot reuse the stored JSON
+    store, content_hash, file_path = store_upload(file, upload_folder)
+    return content_hash, screen_stored_upload(store, content_hash, orient, pretty, file_path)
+
+def clean_and_save_file(file, upload_folder, orient="records", pretty=False):
+    return process_upload(file, upload_folder, orient, pretty)[1]  # Return the JSON string
+
+def rescreen_upload(upload_id, upload_folder, orient="records", pretty=False):
+    """Recompute the derived columns of an earlier upload against the current market-data snapshot."""
+    if not UPLOAD_ID_PATTERN.match(upload_id or ""):
+        raise ValueError(f"Invalid upload id '{upload_id}'.")
+    return screen_stored_upload(get_result_store(upload_folder), upload_id, orient, pretty)
+
+def load_result(store, content_hash, reference):
+    """Return (metadata, screened frame, stored sort orders), screening the upload again when no fresh copy is stored."""
+    path = result_frame_path(store, content_hash, reference)
+    with stage("result_frame_read"):
+        loaded = load_result_frame(path) if store.is_fresh(path) else None
+    if loaded is not None:
+        return loaded
+    result_metadata, df = load_normalized_sheet(store, content_hash)
+    df = apply_screen(df, reference)
+    if save_result_frame(path, result_metadata, df):
+        loaded = load_result_frame(path)
+    return loaded or (result_metadata, df, {})
+
+def query_upload_result(upload_id, upload_folder, filter_expression=None, sort=None, columns=None, page=1, page_size=DEFAULT_PAGE_SIZE, orient="records"):
+    """One page of an upload's screened result, filtered, sorted and projected on the server."""
+    if not UPLOAD_ID_PATTERN.match(upload_id or ""):
+        raise ValueError(f"Invalid upload id '{upload_id}'.")
+    store = get_result_store(upload_folder)
+    reference = get_market_data()
+    result_metadata, df, orders = load_result(store, upload_id, reference)
+
+    selected = parse_columns(columns, df.columns)
+    mask = filter_mask(df, filter_expression, reference_variables(reference)) if filter_expression else None
+    total, page_df = query_frame(df, orders, mask, sort, selected, page, page_size)
+    return {
+        "metadata": result_metadata,
+        "upload_id": upload_id,
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "pages": -(-total // page_size),
+        "columns": selected,
+        "data": dataframe_to_custom_json(page_df, orient),
+    }
+
+def value_upload_result(upload_id, upload_folder, params=None, symbols=None, growth_steps=None, discount_steps=None, orient="records"):
+    """DDM and DCF fair values for every symbol of an upload's screened sheet (or the given symbols).
+
+    Discounting uses the current market-data snapshot; growth x discount sensitivity grids are
+    added when growth_steps or discount_steps are given.
+    """
+    if not UPLOAD_ID_PATTERN.match(upload_id or ""):
+        raise ValueError(f"Invalid upload id '{upload_id}'.")
+    store = get_result_store(upload_folder)
+    reference = get_market_data()
+    result_metadata, df, _ = load_result(store, upload_id, reference)
+    if symbols:
+        df = df[df["Symbol"].isin(symbols)]
+    with stage("valuation", rows=len(df)):
+        frame, summary = value_frame(df, reference, params, fundamentals_store, growth_steps, discount_steps)
+    return {
+        "metadata": result_metadata,
+        "upload_id": upload_id,
+        "params": summary,
+        "rows": len(frame),
+        "data": dataframe_to_custom_json(frame, orient),
+    }
+
+def project_upload_result(upload_id, upload_folder, years=PROJECTION_YEARS, paths=PROJECTION_PATHS, percentiles=PROJECTION_PERCENTILES, seed=None, symbols=None, orient="records"):
+    """Monte Carlo percentile bands of dividend per share and yield on cost over the next years,
+    for every symbol of an upload's screened sheet (or the given symbols)."""
+    if not UPLOAD_ID_PATTERN.match(upload_id or ""):
+        raise ValueError(f"Invalid upload id '{upload_id}'.")
+    store = get_result_store(upload_folder)
+    result_metadata, df, _ = load_result(store, upload_id, get_market_data())
+    if symbols:
+        df = df[df["Symbol"].isin(symbols)]
+    with stage("projection", rows=len(df)):
+        frame, summary = project_frame(df, years, paths, percentiles, seed)
+    return {
+        "metadata": result_metadata,
+        "upload_id": upload_id,
+        "params": summary,
+        "rows": len(frame),
+        "data": dataframe_to_custom_json(frame, orient),
+    }
+
+# Upper bound on the rule sets evaluated by one request
+MAX_RULE_SETS = 16
+
+def run_rule_sets(upload_id, upload_folder, definitions, orient="records"):
+    """Evaluate user rule sets over the screened sheet of an earlier upload, all in one pass.
+
+    Rule expressions can use every sheet and screening column. Returns one entry per rule set
+    with the symbols (filtered when the set has a "filter") and the set's output columns.
+    """
+    if not UPLOAD_ID_PATTERN.match(upload_id or ""):
+        raise ValueError(f"Invalid upload id '{upload_id}'.")
+    if not definitions or len(definitions) > MAX_RULE_SETS:
+        raise ValueError(f"Expected between 1 and {MAX_RULE_SETS} rule sets.")
+    rule_sets = [compile_rule_set(definition) for definition in definitions]
+
+    store = get_result_store(upload_folder)
+    reference = get_market_data()
+    result_metadata, df = load_normalized_sheet(store, upload_id)
+    df = apply_screen(df, reference)
+
+    results = []
+    for rule_set, (outputs, mask) in zip(rule_sets, evaluate_rule_sets(df, rule_sets, reference_variables(reference))):
+        frame = pd.DataFrame({"Symbol": df["Symbol"].to_numpy(), **outputs})
+        if mask is not None:
+            frame = frame[mask]
+        results.append({
+            "name": rule_set.name,
+            "rule_set_hash": rule_set.digest,
+            "rows": len(frame),
+            "data": dataframe_to_custom_json(frame, orient),
+        })
+    return {"metadata": result_metadata, "upload_id": upload_id, "results": results}
+
+def stream_and_save_file(file, upload_folder, stream="ndjson"):
+    """Screen the upload eagerly, then return (upload id, generator yielding the serialized result in batches).
+
+    Every chunk is also written to the stored copy (.ndjson or .json), which only becomes
+    visible once the stream has been fully consumed. A stored copy for the same bytes and
+    market-data snapshot is streamed straight from disk instead.
+    """
+    if stream not in STREAM_FORMATS:
+        raise ValueError(f"Unsupported stream format '{stream}', expected one of {', '.join(STREAM_FORMATS)}.")
+    if not (file and file.filename):
+        return None, None
+
+    store, content_hash, file_path = store_upload(file, upload_folder)
+    reference = get_market_data()
+    key = store.result_key(content_hash, snapshot_version(reference), result_variant(f"stream:{stream}"))
+    extension = ".ndjson" if stream == "ndjson" else ".json"
+
+    cached = store.open_result(key, extension)
+    if cached is not None:
+        def replay():
+            with cached:
+                for chunk in iter(lambda: cached.read(CHUNK_SIZE), ""):
+                    yield chunk
+        return content_hash, replay()
+
+    result_metadata, df = load_normalized_sheet(store, content_hash, file_path)
+    df = apply_screen(df, reference)
+    save_screened_result(store, content_hash, reference, result_metadata, df)
+    chunks = iter_serialized_result(result_metadata, df, stream=stream)
+    rows = len(df)
+
+    def generate():
+        # Times the whole stream, including the client reading it
+        with stage("serialize", rows=rows), store.write_result(key, extension) as f:
+            for chunk in chunks:
+                f.write(chunk)
+                yield chunk
+
+    return content_hash, generate()
 
 def process_file(file, upload_folder):
     try:
@@ -1,20 +1,22 @@
 # pylint: disable=missing-module-docstring, missing-function-docstring, missing-final-newline, trailing-whitespace, line-too-long, missing-class-docstring, missing-timeout
 
-import json
 import os
-from urllib.request import urlopen
-from urllib.error import URLError, HTTPError
 from datetime import date, timedelta
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Tuple
 from dotenv import load_dotenv
 import pandas as pd
-import certifi
+from .http_client import HTTPClient
+from .quote_cache import QuoteCache
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Format the date as yyyy-mm-dd
-formatted_today = date.today().strftime("%Y-%m-%d")
+# Format today's date as yyyy-mm-dd (evaluated per call so long-running workers do not go stale)
+def get_formatted_today():
+    return date.today().strftime("%Y-%m-%d")
 
 # get the most recent business day
 def get_most_recent_business_day():
@@ -29,86 +31,150 @@ load_dotenv()
 # get FMP_API_KEY from .env file
 FMP_API_KEY = os.getenv("FMP_API_KEY")
 
+# Shared keep-alive client, sized for the concurrent batch fetches below
+fmp_client = HTTPClient(pool_size=16)
+
+# Shared per-symbol quote cache (in-process LRU plus the optional QUOTE_CACHE_DB SQLite file)
+quote_cache = QuoteCache()
+
 def get_jsonparsed_data(url):
-    try:
-        response = urlopen(url, cafile=certifi.where())
-        data = response.read().decode("utf-8")
-        return json.loads(data)
-    except HTTPError as e:
-        print(f"HTTP Error {e.code}: {e.reason}")
-        return None
-    except URLError as e:
-        print(f"URL Error: {e.reason}")
-        return None
-    except json.JSONDecodeError:
-        print("Error decoding JSON response")
-        return None
-    except (ValueError, TypeError) as e:
-        print(f"An error occurred: {e}")
-        return None
+    # Raises FMPRequestError (an IOError) instead of returning None on failure
+    return fmp_client.get_json(url)
 
-def get_10_year_tbill():
-    formatted_previous = get_most_recent_business_day()
-    api_response = get_jsonparsed_data(f"https://financialmodelingprep.com/api/v4/treasury?from={formatted_previous}&to={formatted_today}&apikey={FMP_API_KEY}")
-    # Extract the "year10" value and convert it to float
-    year10_value = float(api_response[0]["year10"])
-    return year10_value
+# URL builders for the market reference endpoints
+def treasury_url():
+    return f"https://financialmodelingprep.com/api/v4/treasury?from={get_most_recent_business_day()}&to={get_formatted_today()}&apikey={FMP_API_KEY}"
 
-def get_30_year_tbond():
-    formatted_previous = get_most_recent_business_day()
-    api_response = get_jsonparsed_data(f"https://financialmodelingprep.com/api/v4/treasury?from={formatted_previous}&to={formatted_today}&apikey={FMP_API_KEY}")
-    # Extract the "year30" value and convert it to float
-    year30_value = float(api_response[0]["year30"])
-    return year30_value
-
-def get_all_eps(companies):
-    api_response = get_jsonparsed_data(f"https://financialmodelingprep.com/api/v3/quote/{companies}?apikey={FMP_API_KEY}")
-    # Create a DataFrame from the JSON data
-    df_json = pd.DataFrame(api_response)
-    # Extract the required columns (symbol and eps)
-    df_json = df_json[['symbol', 'exchange', 'eps']]
-    # Rename the columns in the DataFrame
-    df_json = df_json.rename(columns={'symbol': 'Symbol'})
-    df_json = df_json.rename(columns={'exchange': 'Exchange'})
-    df_json = df_json.rename(columns={'eps': 'EPS'})
-    return df_json
+def pe_ratio_url(kind, exchange):
+    # kind is "industry" or "sector"
+    return f"https://financialmodelingprep.com/api/v4/{kind}_price_earning_ratio?date={get_most_recent_business_day()}&exchange={exchange}&apikey={FMP_API_KEY}"
 
-def get_industry_pe_values():
-    formatted_previous = get_most_recent_business_day()
-    nyse_response = get_jsonparsed_data(f"https://financialmodelingprep.com/api/v4/industry_price_earning_ratio?date={formatted_previous}&exchange=NYSE&apikey={FMP_API_KEY}")
-    nasdaq_response = get_jsonparsed_data(f"https://financialmodelingprep.com/api/v4/industry_price_earning_ratio?date={formatted_previous}&exchange=NASDAQ&apikey={FMP_API_KEY}")
-    
+def market_risk_premium_url():
+    return f"https://financialmodelingprep.com/api/v4/market_risk_premium?apikey={FMP_API_KEY}"
+
+# Parsers shared by the single-value getters and the batched fetcher
+def parse_treasury_rate(api_response, maturity):
+    # Extract the maturity value (e.g. "year10") and convert it to float
+    return float(api_response[0][maturity])
+
+def parse_pe_values(nyse_response, nasdaq_response, kind):
     # Combine responses and create a dataframe
     df = pd.DataFrame(nyse_response + nasdaq_response)
     
     # Convert 'pe' column to numeric type
     df['pe'] = pd.to_numeric(df['pe'])
     
-    # Create a multi-index dictionary mapping (exchange, industry) to PE values
-    industry_pe_dict = df.set_index(['exchange', 'industry'])['pe'].to_dict()
+    # Create a multi-index dictionary mapping (exchange, industry or sector) to PE values
+    return df.set_index(['exchange', kind])['pe'].to_dict()
+
+def parse_market_risk_premium(api_response):
+    # Extract the total equity risk premium value and convert it to float
+    return api_response[0]["totalEquityRiskPremium"] / 100
+
+def get_10_year_tbill():
+    return parse_treasury_rate(get_jsonparsed_data(treasury_url()), "year10")
+
+def get_30_year_tbond():
+    return parse_treasury_rate(get_jsonparsed_data(treasury_url()), "year30")
+
+# Quote requests put every symbol in the URL path, so keep each request well under common URL limits
+MAX_QUOTE_URL_LENGTH = 2000
+MAX_SYMBOLS_PER_QUOTE = 150
+
+def quote_url(symbols):
+    return f"https://financialmodelingprep.com/api/v3/quote/{','.join(symbols)}?apikey={FMP_API_KEY}"
+
+def batch_symbols(symbols, max_symbols=MAX_SYMBOLS_PER_QUOTE, max_url_length=MAX_QUOTE_URL_LENGTH):
+    """Split symbols into as few batches as possible, each within both the symbol and URL length limits."""
+    batches = []
+    current = []
+    length = len(quote_url([]))
+    for symbol in symbols:
+        added = len(symbol) + (1 if current else 0)
+        if current and (len(current) >= max_symbols or length + added > max_url_length):
+            batches.append(current)
+            current = []
+            length = len(quote_url([]))
+            added = len(symbol)
+        current.append(symbol)
+        length += added
+    if current:
+        batches.append(current)
+    return batches
+
+def fetch_quotes(symbols):
+    # Fetch every batch concurrently and stack the responses
+    urls = [quote_url(batch) for batch in batch_symbols(symbols)]
+    responses = get_jsonparsed_data_batch(urls)
+    records = [quote for url in urls for quote in (responses[url] or [])]
     
-    return industry_pe_dict
+    # Create a DataFrame from the JSON data and extract the required columns (symbol, exchange and eps)
+    df_json = pd.DataFrame(records, columns=['symbol', 'exchange', 'eps'])
+    # Rename the columns in the DataFrame
+    df_json = df_json.rename(columns={'symbol': 'Symbol', 'exchange': 'Exchange', 'eps': 'EPS'})
+    # One row per symbol so the merge in clean_and_save_file never duplicates rows
+    return df_json.drop_duplicates(subset='Symbol', keep='first').reset_index(drop=True)
+
+def get_all_eps(companies, use_cache=True):
+    # Accept either a comma-separated string or any iterable of symbols, deduplicated in order
+    if isinstance(companies, str):
+        companies = companies.split(",")
+    symbols = list(dict.fromkeys(symbol.strip() for symbol in companies if isinstance(symbol, str) and symbol.strip()))
+    if not use_cache:
+        return fetch_quotes(symbols)
+    # Only symbols that are missing or stale in the quote cache go out to FMP
+    return quote_cache.get_quotes(symbols, fetch_quotes)
+
+def get_industry_pe_values():
+    nyse_response = get_jsonparsed_data(pe_ratio_url("industry", "NYSE"))
+    nasdaq_response = get_jsonparsed_data(pe_ratio_url("industry", "NASDAQ"))
+    return parse_pe_values(nyse_response, nasdaq_response, "industry")
 
 def get_sector_pe_values():
-    formatted_previous = get_most_recent_business_day()
-    nyse_response = get_jsonparsed_data(f"https://financialmodelingprep.com/api/v4/sector_price_earning_ratio?date={formatted_previous}&exchange=NYSE&apikey={FMP_API_KEY}")
-    nasdaq_response = get_jsonparsed_data(f"https://financialmodelingprep.com/api/v4/sector_price_earning_ratio?date={formatted_previous}&exchange=NASDAQ&apikey={FMP_API_KEY}")
-    
-    # Combine responses and create a dataframe
-    df = pd.DataFrame(nyse_response + nasdaq_response)
-    
-    # Convert 'pe' column to numeric type
-    df['pe'] = pd.to_numeric(df['pe'])
-    
-    # Create a multi-index dictionary mapping (exchange, sector) to PE values
-    sector_pe_dict = df.set_index(['exchange', 'sector'])['pe'].to_dict()
-    
-    return sector_pe_dict
+    nyse_response = get_jsonparsed_data(pe_ratio_url("sector", "NYSE"))
+    nasdaq_response = get_jsonparsed_data(pe_ratio_url("sector", "NASDAQ"))
+    return parse_pe_values(nyse_response, nasdaq_response, "sector")
 
 def get_market_risk_premium():
     # Get the total equity risk premium
-    api_response = get_jsonparsed_data(f"https://financialmodelingprep.com/api/v4/market_risk_premium?apikey={FMP_API_KEY}")
-    # Extract the total equity risk premium value and convert it to float
-    total_equity_premium = api_response[0]["totalEquityRiskPremium"] / 100
-    # Return the total equity risk premium
-    return total_equity_premium
\ No newline at end of file
+    return parse_market_risk_premium(get_jsonparsed_data(market_risk_premium_url()))
+
+# Snapshot of all market reference data used by the screening pipeline
+@dataclass(frozen=True)
+class ReferenceData:
+    tbill_rate: float
+    tbond_rate: float
+    market_risk_premium: float
+    industry_pe_dict: Dict[Tuple[str, str], float] = field(default_factory=dict)
+    sector_pe_dict: Dict[Tuple[str, str], float] = field(default_factory=dict)
+    business_day: str = ""
+
+# Fetch a set of URLs concurrently, requesting each distinct URL only once
+def get_jsonparsed_data_batch(urls, max_workers=8):
+    unique_urls = list(dict.fromkeys(urls))
+    if not unique_urls:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(unique_urls))) as executor:
+        return dict(zip(unique_urls, executor.map(get_jsonparsed_data, unique_urls)))
+
+def get_reference_data():
+    """Fetch every rate and P/E table in one concurrent round trip and return a typed snapshot."""
+    business_day = get_most_recent_business_day()
+    urls = {
+        "treasury": treasury_url(),
+        "industry_nyse": pe_ratio_url("industry", "NYSE"),
+        "industry_nasdaq": pe_ratio_url("industry", "NASDAQ"),
+        "sector_nyse": pe_ratio_url("sector", "NYSE"),
+        "sector_nasdaq": pe_ratio_url("sector", "NASDAQ"),
+        "market_risk_premium": market_risk_premium_url(),
+    }
+    responses = get_jsonparsed_data_batch(urls.values())
+    data = {name: responses[url] for name, url in urls.items()}
+    return ReferenceData(
+        tbill_rate=parse_treasury_rate(data["treasury"], "year10"),
+        tbond_rate=parse_treasury_rate(data["treasury"], "year30"),
+        market_risk_premium=parse_market_risk_premium(data["market_risk_premium"]),
+        industry_pe_dict=parse_pe_values(data["industry_nyse"], data["industry_nasdaq"], "industry"),
+        sector_pe_dict=parse_pe_values(data["sector_nyse"], data["sector_nasdaq"], "sector"),
+        business_day=business_day,
+    )
\ No newline at end of file
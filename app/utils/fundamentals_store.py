@@ -0,0 +1,198 @@
+# pylint: disable = missing-module-docstring, missing-final-newline, trailing-whitespace, line-too-long
+import os
+import json
+import time
+import tempfile
+import threading
+import logging
+import pandas as pd
+from sqlalchemy import create_engine, event, select, func, bindparam
+from sqlalchemy.exc import SQLAlchemyError
+from ..models.fundamentals import metadata, fundamentals_tables
+
+logger = logging.getLogger(__name__)
+
+# SQLite file by default, any SQLAlchemy URL works (e.g. the Aurora PostgreSQL cluster)
+DEFAULT_DB_URL = os.getenv("FUNDAMENTALS_DB_URL", "sqlite:///" + os.path.join(tempfile.gettempdir(), "dividend_fundamentals.db"))
+
+# Symbols per IN (...) list, below SQLite's oldest bound-parameter limit
+MAX_SYMBOLS_PER_QUERY = 900
+
+# Rows per upsert statement batch
+UPSERT_BATCH_SIZE = 5000
+
+# Extra screening columns as "table.column" pairs, e.g. "ratios_ttm.payoutRatioTTM,financial_scores.piotroskiScore"
+SCREEN_FUNDAMENTALS = os.getenv("SCREEN_FUNDAMENTALS", "")
+
+# lambda/bulk_data_fetcher dataset names -> tables
+BULK_DATASET_TABLES = {
+    "ratios": "ratios",
+    "key_metrics": "key_metrics",
+    "ratios_ttm": "ratios_ttm",
+    "key_metrics_ttm": "key_metrics_ttm",
+    "income_statement": "income_statements",
+    "balance_sheet_statement": "balance_sheet_statements",
+    "cash_flow_statement": "cashflow_statements",
+    "income_statement_growth": "income_statement_growth",
+    "scores": "financial_scores",
+}
+
+class FundamentalsStore:
+    """Fundamentals from the FMP endpoints in schemas/, keyed by (symbol, period, date).
+
+    Writes are bulk upserts; reads return one frame for any number of symbols, optionally
+    reduced to each symbol's most recent row.
+    """
+
+    def __init__(self, url=DEFAULT_DB_URL):
+        self.url = url
+        self._engine = None
+        self._engine_pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def engine(self):
+        # One engine per process, pooled connections must not cross a fork
+        if self._engine is None or self._engine_pid != os.getpid():
+            with self._lock:
+                if self._engine is None or self._engine_pid != os.getpid():
+                    engine = create_engine(self.url)
+                    if engine.dialect.name == "sqlite":
+                        event.listen(engine, "connect", _sqlite_pragmas)
+                    metadata.create_all(engine)
+                    self._engine, self._engine_pid = engine, os.getpid()
+        return self._engine
+
+    @staticmethod
+    def table(name):
+        if name not in fundamentals_tables:
+            raise ValueError(f"Unknown fundamentals table '{name}', expected one of {', '.join(fundamentals_tables)}.")
+        return fundamentals_tables[name]
+
+    def _insert(self, table):
+        dialect = self.engine.dialect.name
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert  # pylint: disable=import-outside-toplevel
+        elif dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert  # pylint: disable=import-outside-toplevel
+        else:
+            raise ValueError(f"Upserts are not supported on {dialect}.")
+        statement = insert(table)
+        keys = [column.name for column in table.primary_key]
+        updates = {column.name: statement.excluded[column.name] for column in table.c if column.name not in keys}
+        return statement.on_conflict_do_update(index_elements=keys, set_=updates)
+
+    def upsert(self, name, df):
+        """Insert or replace rows by primary key, columns the table does not know are ignored."""
+        table = self.table(name)
+        keys = [column.name for column in table.primary_key]
+        known = [column for column in df.columns if column in table.c]
+        if len(known) < len(df.columns):
+            logger.debug("Ignoring unknown %s columns: %s", name, sorted(set(df.columns) - set(known)))
+
+        df = df[known].dropna(subset=keys)
+        df = df.assign(fetched_at=time.time())
+        # None instead of NaN so missing values are stored as NULL
+        df = df.astype(object).where(df.notna(), None)
+        records = df.to_dict("records")
+
+        statement = self._insert(table)
+        with self.engine.begin() as conn:
+            for start in range(0, len(records), UPSERT_BATCH_SIZE):
+                conn.execute(statement, records[start:start + UPSERT_BATCH_SIZE])
+        return len(records)
+
+    def read(self, name, symbols, columns=None, latest=True, period=None):
+        """Rows of a table for many symbols at once, one query per MAX_SYMBOLS_PER_QUERY symbols.
+
+        latest keeps each symbol's most recent row by date (tables without a date hold one row per symbol).
+        """
+        table = self.table(name)
+        symbols = list(dict.fromkeys(symbol for symbol in symbols if symbol))
+        if columns:
+            selected = [table.c.symbol] + [table.c[column] for column in columns if column != "symbol"]
+        else:
+            selected = list(table.c)
+
+        query = select(*selected).where(table.c.symbol.in_(bindparam("symbols", expanding=True)))
+        if period is not None and "period" in table.c:
+            query = query.where(table.c.period == period)
+        if latest and "date" in table.c:
+            rank = func.row_number().over(partition_by=table.c.symbol, order_by=table.c.date.desc()).label("_rank")
+            ranked = query.add_columns(rank).subquery()
+            query = select(*[ranked.c[column.name] for column in selected]).where(ranked.c["_rank"] == 1)
+
+        frames = []
+        try:
+            with self.engine.connect() as conn:
+                for start in range(0, len(symbols), MAX_SYMBOLS_PER_QUERY):
+                    result = conn.execute(query, {"symbols": symbols[start:start + MAX_SYMBOLS_PER_QUERY]})
+                    frames.append(pd.DataFrame(result.fetchall(), columns=list(result.keys())))
+        except SQLAlchemyError as e:
+            raise IOError(f"Reading {name} from the fundamentals store failed: {e}") from e
+        if not frames:
+            return pd.DataFrame(columns=[column.name for column in selected])
+        return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+    def import_parquet(self, name, paths, batch_size=50_000):
+        """Upsert Parquet parts written by the bulk fetcher, batch by batch."""
+        import pyarrow.parquet as pq  # pylint: disable=import-outside-toplevel
+        rows = 0
+        for path in paths:
+            for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+                rows += self.upsert(name, batch.to_pandas())
+        return rows
+
+    def import_bulk_output(self, root):
+        """Load the latest complete fetch of every dataset found under a local bulk output directory."""
+        imported = {}
+        for directory, _, files in os.walk(root):
+            if "_latest.json" not in files:
+                continue
+            with open(os.path.join(directory, "_latest.json"), encoding="utf-8") as f:
+                manifest_key = json.load(f)["manifest"]
+            with open(os.path.join(root, manifest_key), encoding="utf-8") as f:
+                manifest = json.load(f)
+            name = BULK_DATASET_TABLES.get(manifest["dataset"])
+            if name is None:
+                continue
+            paths = [os.path.join(root, part["key"]) for part in manifest["parts"]]
+            imported[manifest_key] = self.import_parquet(name, paths)
+            logger.info("Imported %d %s rows from %s", imported[manifest_key], name, manifest_key)
+        return imported
+
+def parse_column_spec(spec):
+    """"table.column,table.column" -> {table: [columns]}, validated against the known tables."""
+    columns = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, column = item.partition(".")
+        if column not in FundamentalsStore.table(name).c:
+            raise ValueError(f"Unknown fundamentals column '{item}'.")
+        columns.setdefault(name, []).append(column)
+    return columns
+
+def join_fundamentals(df, spec=SCREEN_FUNDAMENTALS, store=None, key_column="Symbol"):
+    """Left-join the latest stored fundamentals onto a screened frame, one read per table.
+
+    Columns keep their FMP names; if the store cannot be read they are added empty so the
+    output shape does not depend on the store being available.
+    """
+    store = store or fundamentals_store
+    symbols = df[key_column].dropna().astype(str).tolist()
+    for name, columns in parse_column_spec(spec).items():
+        try:
+            values = store.read(name, symbols, columns=columns)
+        except IOError as e:
+            logger.warning("Fundamentals join skipped for %s: %s", name, e)
+            values = pd.DataFrame(columns=["symbol", *columns])
+        values = values.rename(columns={"symbol": key_column})
+        df = df.merge(values.drop_duplicates(key_column), on=key_column, how="left")
+    return df
+
+def _sqlite_pragmas(dbapi_connection, _):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+fundamentals_store = FundamentalsStore()
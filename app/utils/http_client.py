@@ -0,0 +1,116 @@
+# pylint: disable = missing-module-docstring, missing-final-newline, trailing-whitespace, line-too-long
+import os
+import re
+import time
+import logging
+import threading
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from tenacity import Retrying, stop_after_attempt, retry_if_exception_type, wait_exponential_jitter
+from .instrumentation import record_upstream
+
+logger = logging.getLogger(__name__)
+
+# Status codes worth retrying: rate limiting and transient upstream failures
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+def redact(url):
+    # Never let the API key end up in logs or error responses
+    return re.sub(r"(apikey=)[^&]+", r"\1***", url)
+
+def endpoint_name(url):
+    # Metric label for a URL: the path up to the endpoint, "/api/v3/quote" for "/api/v3/quote/AAPL,MSFT"
+    return "/".join(urlsplit(url).path.split("/")[:4]) or "/"
+
+class FMPRequestError(IOError):
+    """Raised when an FMP request fails for good (after retries) or returns an error payload."""
+
+    def __init__(self, message, status_code=None, retry_after=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+class RetryableResponseError(FMPRequestError):
+    """A 429/5xx response, retried with backoff (honouring Retry-After when present)."""
+
+def parse_retry_after(value):
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+class HTTPClient:
+    """Keep-alive connection pool with timeouts and retrying GETs for JSON endpoints.
+
+    The session is created lazily per process so gunicorn workers never share sockets
+    inherited from the master process.
+    """
+
+    def __init__(self, timeout=(3.05, 30), pool_size=16, max_attempts=4, backoff=0.5, max_backoff=30.0):
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.max_attempts = max_attempts
+        self.max_backoff = max_backoff
+        self._backoff = wait_exponential_jitter(initial=backoff, max=max_backoff)
+        self._session = None
+        self._session_pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        if self._session is None or self._session_pid != os.getpid():
+            with self._lock:
+                if self._session is None or self._session_pid != os.getpid():
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    self._session = session
+                    self._session_pid = os.getpid()
+        return self._session
+
+    def _wait(self, retry_state):
+        # Rate-limited responses tell us how long to wait, otherwise back off exponentially
+        retry_after = getattr(retry_state.outcome.exception(), "retry_after", None)
+        if retry_after is not None:
+            return min(retry_after, self.max_backoff)
+        return self._backoff(retry_state)
+
+    def _get_json_once(self, url):
+        response = self.session.get(url, timeout=self.timeout)
+        if response.status_code in RETRYABLE_STATUS_CODES:
+            raise RetryableResponseError(
+                f"HTTP Error {response.status_code} for {redact(url)}",
+                status_code=response.status_code,
+                retry_after=parse_retry_after(response.headers.get("Retry-After")),
+            )
+        if not response.ok:
+            raise FMPRequestError(f"HTTP Error {response.status_code}: {response.reason} for {redact(url)}", status_code=response.status_code)
+        try:
+            data = response.json()
+        except ValueError as e:
+            raise FMPRequestError(f"Error decoding JSON response from {redact(url)}") from e
+        # FMP reports bad keys and plan limits as a 200 with an "Error Message" body
+        if isinstance(data, dict) and "Error Message" in data:
+            raise FMPRequestError(f"FMP error for {redact(url)}: {data['Error Message']}", status_code=response.status_code)
+        return data
+
+    def get_json(self, url):
+        retrying = Retrying(
+            stop=stop_after_attempt(self.max_attempts),
+            wait=self._wait,
+            retry=retry_if_exception_type((requests.ConnectionError, requests.Timeout, RetryableResponseError)),
+            before_sleep=lambda state: logger.warning("Retrying %s after: %s", redact(url), redact(str(state.outcome.exception()))),
+            reraise=True,
+        )
+        started = time.perf_counter()
+        ok = False
+        try:
+            data = retrying(self._get_json_once, url)
+            ok = True
+            return data
+        except requests.RequestException as e:
+            raise FMPRequestError(f"Request to {redact(url)} failed: {redact(str(e))}") from e
+        finally:
+            record_upstream(endpoint_name(url), time.perf_counter() - started, ok)
\ No newline at end of file
@@ -0,0 +1,378 @@
+# pylint: disable = missing-module-docstring, missing-final-newline, trailing-whitespace, line-too-long
+import os
+import io
+import json
+import time
+import atexit
+import shutil
+import pstats
+import bisect
+import cProfile
+import tempfile
+import threading
+import tracemalloc
+import logging
+import contextvars
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - non-POSIX platforms only report tracemalloc peaks
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Per-process metric files, merged when /metrics is scraped so every gunicorn worker and job process is counted
+METRICS_DIR = os.getenv("METRICS_DIR", os.path.join(tempfile.gettempdir(), "dividend_metrics"))
+
+# Seconds between writes of a process's metric file, 0 writes on every change
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+
+# "?profile=1" is only honoured with PROFILING_ENABLED=1, a profile exposes source paths and timings to the caller
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0").lower() in ("1", "true", "yes")
+
+# Histogram upper bounds: seconds, bytes of peak memory growth, bytes of response body
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+MEMORY_BUCKETS = tuple(float(2 ** power) for power in range(20, 32, 2))  # 1 MiB .. 1 GiB
+SIZE_BUCKETS = tuple(float(2 ** power) for power in range(8, 28, 2))  # 256 B .. 64 MiB
+
+# Functions listed in a request profile, by cumulative time
+PROFILE_TOP_FUNCTIONS = 30
+
+# Exported metric families: name -> (type, help, histogram buckets)
+METRICS = {
+    "dividend_pipeline_stage_duration_seconds": ("histogram", "Wall time per pipeline stage.", DURATION_BUCKETS),
+    "dividend_pipeline_stage_memory_peak_bytes": ("histogram", "Peak memory growth per pipeline stage.", MEMORY_BUCKETS),
+    "dividend_pipeline_stage_cpu_seconds_total": ("counter", "CPU time spent in each pipeline stage.", None),
+    "dividend_pipeline_stage_rows_total": ("counter", "Rows processed by each pipeline stage.", None),
+    "dividend_pipeline_stage_failures_total": ("counter", "Pipeline stages that raised.", None),
+    "dividend_http_request_duration_seconds": ("histogram", "Request latency by route, method and status.", DURATION_BUCKETS),
+    "dividend_http_response_size_bytes": ("histogram", "Response body size by route (streamed responses are not counted).", SIZE_BUCKETS),
+    "dividend_http_requests_in_flight": ("gauge", "Requests currently being handled.", None),
+    "dividend_upstream_request_duration_seconds": ("histogram", "Latency of upstream API calls (including retries) by endpoint and outcome.", DURATION_BUCKETS),
+}
+
+class Stage:
+    """Measurements of one pipeline stage; rows can be set inside the with block once known."""
+
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.memory_peak_bytes = 0
+        self.failed = False
+
+    def as_dict(self):
+        return {
+            "stage": self.name,
+            "wall_seconds": round(self.wall_seconds, 6),
+            "cpu_seconds": round(self.cpu_seconds, 6),
+            "rows": self.rows,
+            "memory_peak_bytes": self.memory_peak_bytes,
+            "failed": self.failed,
+        }
+
+def _labels(labels):
+    # Series are keyed by their rendered label set, e.g. 'route="/api/upload",status="200"'
+    return ",".join(f'{key}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for key, value in sorted(labels.items()))
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OverflowError):
+        return True
+    return True
+
+class MetricsRegistry:
+    """Histograms, counters and gauges of the families in METRICS, for this process.
+
+    Updates only touch memory. A background thread writes changed values to
+    <directory>/<pid>.json every flush_seconds (and at exit), and render() sums the files of
+    all processes, so one scrape covers every gunicorn worker and job process, each at most
+    flush_seconds behind. Gauges of processes that have exited are left out.
+    """
+
+    def __init__(self, directory=METRICS_DIR, flush_seconds=METRICS_FLUSH_SECONDS):
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self._values = {}
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._flusher_pid = None
+
+    def _series(self, name, labels, default):
+        # A forked child starts its own file instead of overwriting its parent's
+        if self._pid != os.getpid():
+            self._values, self._pid = {}, os.getpid()
+        family = self._values.setdefault(name, {})
+        key = _labels(labels)
+        if key not in family:
+            family[key] = default()
+        return family, key
+
+    def observe(self, name, value, **labels):
+        buckets = METRICS[name][2]
+        with self._lock:
+            family, key = self._series(name, labels, lambda: {"buckets": [0] * (len(buckets) + 1), "sum": 0.0, "count": 0})
+            series = family[key]
+            series["buckets"][bisect.bisect_left(buckets, value)] += 1
+            series["sum"] += value
+            series["count"] += 1
+            self._dirty = True
+        self._changed()
+
+    def inc(self, name, amount=1, **labels):
+        # Counters and gauges, gauges go down with a negative amount
+        with self._lock:
+            family, key = self._series(name, labels, float)
+            family[key] += amount
+            self._dirty = True
+        self._changed()
+
+    def _changed(self):
+        if not self.directory:
+            return
+        if self.flush_seconds <= 0:
+            self.flush()
+        elif self._flusher_pid != os.getpid():
+            self._start_flusher()
+
+    def _start_flusher(self):
+        # One flusher per process, threads do not survive a fork
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        threading.Thread(target=self._flush_periodically, name="metrics-flush", daemon=True).start()
+        atexit.register(self.flush)
+
+    def _flush_periodically(self):
+        pid = os.getpid()
+        while self._flusher_pid == pid:
+            time.sleep(self.flush_seconds)
+            if self._dirty:
+                self.flush()
+
+    def flush(self):
+        """Write this process's values to its metric file now."""
+        if not self.directory:
+            return
+        path = os.path.join(self.directory, f"{os.getpid()}.json")
+        partial_path = f"{path}.tmp"
+        # Written under the lock so an older payload never replaces a newer one
+        with self._lock:
+            self._dirty = False
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                with open(partial_path, "w", encoding="utf-8") as f:
+                    json.dump(self._values, f)
+                os.replace(partial_path, path)
+            except OSError as e:
+                logger.debug("Could not write metrics to %s: %s", path, e)
+
+    def collect(self):
+        """Values summed over every process file (or just this process without a directory)."""
+        if not self.directory or not os.path.isdir(self.directory):
+            with self._lock:
+                return json.loads(json.dumps(self._values))
+        merged = {}
+        for file_name in os.listdir(self.directory):
+            stem, extension = os.path.splitext(file_name)
+            if extension != ".json" or not stem.isdigit():
+                continue
+            try:
+                with open(os.path.join(self.directory, file_name), encoding="utf-8") as f:
+                    process_values = json.load(f)
+            except (OSError, ValueError):
+                continue
+            alive = None
+            for name, family in process_values.items():
+                if name not in METRICS:
+                    continue
+                if METRICS[name][0] == "gauge":
+                    alive = _pid_alive(int(stem)) if alive is None else alive
+                    if not alive:
+                        continue
+                total = merged.setdefault(name, {})
+                for key, value in family.items():
+                    if isinstance(value, dict):
+                        current = total.setdefault(key, {"buckets": [0] * len(value["buckets"]), "sum": 0.0, "count": 0})
+                        current["buckets"] = [a + b for a, b in zip(current["buckets"], value["buckets"])]
+                        current["sum"] += value["sum"]
+                        current["count"] += value["count"]
+                    else:
+                        total[key] = total.get(key, 0) + value
+        return merged
+
+    def reset(self):
+        with self._lock:
+            self._values = {}
+            self._dirty = False
+        if self.directory:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def render(self):
+        """Prometheus text exposition (format 0.0.4) of the merged metrics."""
+        # The scraped process reports its current values, the others as of their last flush
+        self.flush()
+        merged = self.collect()
+        lines = []
+        for name, (kind, help_text, buckets) in METRICS.items():
+            family = merged.get(name, {})
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key in sorted(family):
+                series = family[key]
+                labels = f"{{{key}}}" if key else ""
+                if kind != "histogram":
+                    lines.append(f"{name}{labels} {float(series)!r}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets + (float("inf"),), series["buckets"]):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{name}_bucket{{{key + "," if key else ""}le="{le}"}} {cumulative}')
+                lines.append(f"{name}_sum{labels} {float(series['sum'])!r}")
+                lines.append(f"{name}_count{labels} {series['count']}")
+        return "\n".join(lines) + "\n"
+
+# Shared registry for the pipeline stages, HTTP requests and upstream calls
+metrics = MetricsRegistry()
+
+# Stages and upstream calls of the current request, while collect_stages() is active
+_collected = contextvars.ContextVar("collected_stages", default=None)
+
+def _max_rss_bytes():
+    # ru_maxrss is in KiB on Linux
+    if resource is None:
+        return 0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+@contextmanager
+def stage(name, rows=None, registry=None):
+    """Time a pipeline stage: wall and CPU time, rows processed and peak memory growth.
+
+    Peak memory comes from tracemalloc while it is tracing (e.g. under ?profile=1),
+    otherwise from the growth of the process's maximum RSS. Each stage is recorded in the
+    Prometheus metrics and the current request's trace, and logged at DEBUG.
+    """
+    record = Stage(name, rows)
+    tracing = tracemalloc.is_tracing()
+    traced_before = rss_before = 0
+    if tracing:
+        traced_before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+    else:
+        rss_before = _max_rss_bytes()
+    cpu_started = time.thread_time()
+    started = time.perf_counter()
+    try:
+        yield record
+    except Exception:
+        record.failed = True
+        raise
+    finally:
+        record.wall_seconds = time.perf_counter() - started
+        record.cpu_seconds = time.thread_time() - cpu_started
+        if tracing and tracemalloc.is_tracing():
+            record.memory_peak_bytes = max(0, tracemalloc.get_traced_memory()[1] - traced_before)
+        elif not tracing:
+            record.memory_peak_bytes = max(0, _max_rss_bytes() - rss_before)
+        fields = record.as_dict()
+        # Slow requests log their stages through the request sampler, per-stage lines are for debugging
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "stage=%s wall_seconds=%.4f cpu_seconds=%.4f rows=%s memory_peak_bytes=%d failed=%s",
+                name, record.wall_seconds, record.cpu_seconds, record.rows, record.memory_peak_bytes, record.failed,
+                extra={f"pipeline_{key}": value for key, value in fields.items()},
+            )
+        registry = registry or metrics
+        registry.observe("dividend_pipeline_stage_duration_seconds", record.wall_seconds, stage=name)
+        registry.observe("dividend_pipeline_stage_memory_peak_bytes", record.memory_peak_bytes, stage=name)
+        registry.inc("dividend_pipeline_stage_cpu_seconds_total", record.cpu_seconds, stage=name)
+        registry.inc("dividend_pipeline_stage_rows_total", record.rows or 0, stage=name)
+        registry.inc("dividend_pipeline_stage_failures_total", int(record.failed), stage=name)
+        collected = _collected.get()
+        if collected is not None:
+            collected.append(fields)
+
+def record_upstream(endpoint, seconds, ok=True, registry=None):
+    """Record one upstream API call, also listed in the current request's trace."""
+    outcome = "ok" if ok else "error"
+    (registry or metrics).observe("dividend_upstream_request_duration_seconds", seconds, endpoint=endpoint, outcome=outcome)
+    collected = _collected.get()
+    if collected is not None:
+        collected.append({"upstream": endpoint, "wall_seconds": round(seconds, 6), "outcome": outcome})
+
+def start_trace():
+    """Start collecting stage measurements and upstream calls, return (trace list, token for end_trace)."""
+    trace = []
+    return trace, _collected.set(trace)
+
+def end_trace(token):
+    _collected.reset(token)
+
+@contextmanager
+def collect_stages():
+    """Collect the stage measurements and upstream calls recorded inside the block into the yielded list."""
+    trace, token = start_trace()
+    try:
+        yield trace
+    finally:
+        end_trace(token)
+
+# cProfile and tracemalloc are process-wide, one profiled request at a time
+_profile_lock = threading.Lock()
+
+def run_profiled(func, *args, **kwargs):
+    """Call func under cProfile and tracemalloc, return (result, profile).
+
+    The profile holds the stage measurements of the call and its most expensive functions.
+    If another request is already being profiled the call runs unprofiled.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        return func(*args, **kwargs), {"error": "Another request is being profiled, try again."}
+    profiler = cProfile.Profile()
+    started_tracing = not tracemalloc.is_tracing()
+    try:
+        if started_tracing:
+            tracemalloc.start()
+        with collect_stages() as stages:
+            started = time.perf_counter()
+            profiler.enable()
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                profiler.disable()
+            wall_seconds = time.perf_counter() - started
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+        _profile_lock.release()
+    return result, {
+        "wall_seconds": round(wall_seconds, 6),
+        "stages": stages,
+        "functions": profile_functions(profiler),
+    }
+
+def profile_functions(profiler, limit=PROFILE_TOP_FUNCTIONS):
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    rows = []
+    for (filename, line, function), (_, calls, total, cumulative, _) in stats.stats.items():  # pylint: disable=no-member
+        rows.append({
+            "function": f"{os.path.basename(filename)}:{line}({function})",
+            "calls": calls,
+            "total_seconds": round(total, 6),
+            "cumulative_seconds": round(cumulative, 6),
+        })
+    rows.sort(key=lambda row: row["cumulative_seconds"], reverse=True)
+    return rows[:limit]
+
+def attach_profile(json_text, profile):
+    """Add a "profile" member to a serialized JSON object without re-encoding it."""
+    body = json_text.rstrip()
+    return body[:-1] + ',"profile":' + json.dumps(profile) + "}"
@@ -0,0 +1,213 @@
+# pylint: disable = missing-module-docstring, missing-final-newline, trailing-whitespace, line-too-long
+import os
+import re
+import json
+import time
+import uuid
+import threading
+import logging
+import multiprocessing
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from .clean_file_data import screen_stored_upload_with_key
+from .result_store import get_result_store
+from .serialization import ORIENTATIONS
+
+try:
+    from gevent import monkey as gevent_monkey
+except ImportError:  # pragma: no cover - only gunicorn's gevent workers are patched
+    gevent_monkey = None
+
+logger = logging.getLogger(__name__)
+
+# Pool processes per gunicorn worker, shared by queued jobs and batch screening, and jobs allowed in flight before new ones are rejected
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", str(4 * JOB_WORKERS)))
+
+# "spawn" keeps pool processes clear of the gevent hub and threads of the web worker
+JOB_START_METHOD = os.getenv("JOB_START_METHOD", "spawn")
+
+# Which JobQueue implementation get_job_queue builds
+JOB_BACKEND = os.getenv("JOB_BACKEND", "local")
+
+# Seconds a finished job's record is kept
+JOB_RECORD_TTL = int(os.getenv("JOB_RECORD_TTL", str(24 * 60 * 60)))
+
+# Job ids are uuid4 hex strings
+JOB_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+# Seconds clients are asked to wait before retrying when the queue is full
+RETRY_AFTER = 5
+
+class QueueFullError(Exception):
+    """Raised when a queue already holds its maximum number of unfinished jobs."""
+
+class JobRecordStore:
+    """Job status records as small JSON files, so every gunicorn worker can answer GET /api/jobs/<id>."""
+
+    def __init__(self, root):
+        self.root = os.path.join(root, "jobs")
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, job_id):
+        return os.path.join(self.root, f"{job_id}.json")
+
+    def write(self, record):
+        path = self.path(record["job_id"])
+        partial_path = f"{path}.{os.getpid()}.{time.time_ns()}.part"
+        with open(partial_path, "w", encoding="utf-8") as f:
+            json.dump(record, f)
+        os.replace(partial_path, path)
+
+    def update(self, job_id, **fields):
+        record = self.read(job_id) or {"job_id": job_id}
+        record.update(fields)
+        self.write(record)
+        return record
+
+    def prune(self, max_age=JOB_RECORD_TTL):
+        cutoff = time.time() - max_age
+        with os.scandir(self.root) as it:
+            for entry in it:
+                try:
+                    if entry.is_file() and entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+                except OSError:
+                    continue
+
+    def read(self, job_id):
+        if not JOB_ID_PATTERN.match(job_id or ""):
+            return None
+        try:
+            with open(self.path(job_id), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+def run_screen_job(upload_folder, job_id, upload_id, orient, pretty):
+    """Pool entry point: screen a stored upload and return the key of the stored result."""
+    JobRecordStore(upload_folder).update(job_id, status="running", started_at=time.time())
+    key, _ = screen_stored_upload_with_key(get_result_store(upload_folder), upload_id, orient, pretty)
+    return key
+
+def gevent_patched():
+    return gevent_monkey is not None and gevent_monkey.is_module_patched("threading")
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+def get_process_pool():
+    """The worker's process pool, created on first use so importing the app never starts processes.
+
+    Under gunicorn's gevent workers the pool's management thread is a greenlet and its
+    result pipes are waited on cooperatively, so jobs and batches do not block the hub.
+    Forking a monkey-patched process copies the hub and its patched locks into the
+    children, so "fork" is replaced by "spawn" there.
+    """
+    global _pool, _pool_pid  # pylint: disable=global-statement
+    with _pool_lock:
+        # A pool inherited from a parent process has no processes of its own
+        if _pool is None or _pool_pid != os.getpid():
+            start_method = JOB_START_METHOD
+            if start_method == "fork" and gevent_patched():
+                logger.warning('JOB_START_METHOD="fork" is unsafe in a gevent worker, using "spawn"')
+                start_method = "spawn"
+            _pool = ProcessPoolExecutor(max_workers=JOB_WORKERS, mp_context=multiprocessing.get_context(start_method))
+            _pool_pid = os.getpid()
+        return _pool
+
+def reset_process_pool(pool):
+    """Drop a broken pool (a process died, e.g. out of memory), the next caller starts a fresh one."""
+    global _pool  # pylint: disable=global-statement
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+class JobQueue(ABC):
+    """Interface for screening job backends (a Redis or SQS backed queue can implement the same two methods)."""
+
+    @abstractmethod
+    def submit(self, upload_folder, upload_id, orient="records", pretty=False):
+        """Queue the screening of a stored upload, return the job id."""
+
+    @abstractmethod
+    def get(self, upload_folder, job_id):
+        """The job's status record, None for an unknown job."""
+
+class LocalJobQueue(JobQueue):
+    """Runs screening jobs in the worker's process pool, no external broker required.
+
+    At most JOB_WORKERS jobs run at once (fewer while a batch uses the pool); once
+    max_pending jobs are unfinished, submit raises QueueFullError so the caller can push
+    back on the client.
+    """
+
+    def __init__(self, max_pending=JOB_MAX_PENDING):
+        self.max_pending = max_pending
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, upload_folder, upload_id, orient="records", pretty=False):
+        # Rejected now rather than reported later as a failed job
+        if orient not in ORIENTATIONS:
+            raise ValueError(f"Unsupported orientation '{orient}', expected one of {', '.join(ORIENTATIONS)}.")
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise QueueFullError(f"{self._pending} jobs are already queued, try again later.")
+            self._pending += 1
+
+        job_id = uuid.uuid4().hex
+        records = JobRecordStore(upload_folder)
+        records.prune()
+        records.write({
+            "job_id": job_id,
+            "upload_id": upload_id,
+            "status": "queued",
+            "submitted_at": time.time(),
+        })
+        pool = get_process_pool()
+        try:
+            future = pool.submit(run_screen_job, upload_folder, job_id, upload_id, orient, pretty)
+        except RuntimeError as e:
+            with self._lock:
+                self._pending -= 1
+            if isinstance(e, BrokenProcessPool):
+                reset_process_pool(pool)
+            records.update(job_id, status="failed", error="The job pool is shutting down.", finished_at=time.time())
+            raise
+
+        def on_done(done):
+            with self._lock:
+                self._pending -= 1
+            error = done.exception()
+            if isinstance(error, BrokenProcessPool):
+                reset_process_pool(pool)
+            if error is None:
+                records.update(job_id, status="done", result_key=done.result(), finished_at=time.time())
+            else:
+                logger.error("Screening job %s failed: %s", job_id, error)
+                records.update(job_id, status="failed", error=str(error), finished_at=time.time())
+
+        future.add_done_callback(on_done)
+        return job_id
+
+    def get(self, upload_folder, job_id):
+        return JobRecordStore(upload_folder).read(job_id)
+
+# Available backends by JOB_BACKEND name
+JOB_BACKENDS = {
+    "local": LocalJobQueue,
+}
+
+_job_queue = None
+
+def get_job_queue():
+    global _job_queue  # pylint: disable=global-statement
+    if _job_queue is None:
+        if JOB_BACKEND not in JOB_BACKENDS:
+            raise ValueError(f"Unknown JOB_BACKEND '{JOB_BACKEND}', expected one of {', '.join(JOB_BACKENDS)}.")
+        _job_queue = JOB_BACKENDS[JOB_BACKEND]()
+    return _job_queue
\ No newline at end of file
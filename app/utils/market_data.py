@@ -0,0 +1,154 @@
+# pylint: disable = missing-module-docstring, missing-final-newline, trailing-whitespace, line-too-long
+import os
+import json
+import time
+import tempfile
+import threading
+import hashlib
+import logging
+from contextlib import contextmanager
+from .fmp_api_calls import ReferenceData, get_reference_data, get_most_recent_business_day
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms fall back to unlocked refreshes
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Seconds a snapshot stays fresh within the same business day
+DEFAULT_TTL = int(os.getenv("MARKET_DATA_TTL", str(6 * 60 * 60)))
+
+# Seconds to keep serving a stale snapshot after a failed refresh before trying again
+RETRY_INTERVAL = 60
+
+# Cache file shared by every gunicorn worker on the host
+DEFAULT_CACHE_PATH = os.getenv("MARKET_DATA_CACHE", os.path.join(tempfile.gettempdir(), "dividend_market_data.json"))
+
+def snapshot_to_dict(snapshot):
+    # PE dictionaries are keyed by (exchange, name) tuples, store them as triples
+    return {
+        "tbill_rate": snapshot.tbill_rate,
+        "tbond_rate": snapshot.tbond_rate,
+        "market_risk_premium": snapshot.market_risk_premium,
+        "industry_pe": [[exchange, name, pe] for (exchange, name), pe in snapshot.industry_pe_dict.items()],
+        "sector_pe": [[exchange, name, pe] for (exchange, name), pe in snapshot.sector_pe_dict.items()],
+        "business_day": snapshot.business_day,
+    }
+
+def snapshot_from_dict(data):
+    return ReferenceData(
+        tbill_rate=data["tbill_rate"],
+        tbond_rate=data["tbond_rate"],
+        market_risk_premium=data["market_risk_premium"],
+        industry_pe_dict={(exchange, name): pe for exchange, name, pe in data["industry_pe"]},
+        sector_pe_dict={(exchange, name): pe for exchange, name, pe in data["sector_pe"]},
+        business_day=data["business_day"],
+    )
+
+def snapshot_version(snapshot):
+    """Stable short hash of a snapshot, changes whenever any rate or P/E value changes."""
+    payload = json.dumps(snapshot_to_dict(snapshot), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+class MarketDataProvider:
+    """Lazily fetched, TTL-cached market reference data.
+
+    Nothing is fetched until the first get(). A snapshot is fresh while it belongs to the
+    most recent business day and is younger than ttl seconds. Fresh snapshots are shared
+    between processes through a small JSON cache file, and only one process refreshes at a time.
+    """
+
+    def __init__(self, fetch=get_reference_data, ttl=DEFAULT_TTL, cache_path=DEFAULT_CACHE_PATH):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.cache_path = cache_path
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._fetched_at = 0.0
+        self._retry_at = 0.0
+
+    def is_fresh(self, snapshot, fetched_at):
+        return (
+            snapshot is not None
+            and snapshot.business_day == get_most_recent_business_day()
+            and time.time() - fetched_at < self.ttl
+        )
+
+    def get(self):
+        if self.is_fresh(self._snapshot, self._fetched_at) or time.time() < self._retry_at:
+            return self._snapshot
+        with self._lock:
+            if not self.is_fresh(self._snapshot, self._fetched_at) and time.time() >= self._retry_at:
+                self._snapshot, self._fetched_at = self._load_or_refresh()
+            return self._snapshot
+
+    def version(self):
+        return snapshot_version(self.get())
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+            self._fetched_at = 0.0
+            self._retry_at = 0.0
+
+    def _read_cache(self):
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                data = json.load(f)
+            return snapshot_from_dict(data["snapshot"]), data["fetched_at"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None, 0.0
+
+    def _write_cache(self, snapshot, fetched_at):
+        partial_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        try:
+            with open(partial_path, "w", encoding="utf-8") as f:
+                json.dump({"fetched_at": fetched_at, "snapshot": snapshot_to_dict(snapshot)}, f)
+            os.replace(partial_path, self.cache_path)
+        except OSError as e:
+            logger.warning("Could not write market data cache %s: %s", self.cache_path, e)
+
+    @contextmanager
+    def _cache_lock(self):
+        if fcntl is None:
+            yield
+            return
+        try:
+            lock_file = open(f"{self.cache_path}.lock", "a", encoding="utf-8")  # pylint: disable=consider-using-with
+        except OSError:
+            yield
+            return
+        with lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load_or_refresh(self):
+        # Another worker may already have refreshed the shared cache
+        snapshot, fetched_at = self._read_cache()
+        if self.is_fresh(snapshot, fetched_at):
+            return snapshot, fetched_at
+
+        with self._cache_lock():
+            snapshot, fetched_at = self._read_cache()
+            if self.is_fresh(snapshot, fetched_at):
+                return snapshot, fetched_at
+            try:
+                fresh = self.fetch()
+            except (TypeError, KeyError, IndexError, ValueError, OSError) as e:
+                # Keep serving the last known values rather than failing every upload
+                stale = self._snapshot or snapshot
+                if stale is None:
+                    raise ValueError(f"Market reference data is unavailable: {e}") from e
+                logger.warning("Market data refresh failed, serving snapshot from %s: %s", stale.business_day, e)
+                self._retry_at = time.time() + RETRY_INTERVAL
+                return stale, fetched_at if stale is snapshot else self._fetched_at
+            fetched_at = time.time()
+            self._write_cache(fresh, fetched_at)
+            return fresh, fetched_at
+
+# Shared provider used by the upload pipeline
+market_data = MarketDataProvider()
\ No newline at end of file
@@ -0,0 +1,123 @@
+# pylint: disable = missing-module-docstring, missing-final-newline, trailing-whitespace, line-too-long
+import os
+import warnings
+import numpy as np
+import pandas as pd
+from .valuation import column_values
+
+# Default and maximum horizon in years
+PROJECTION_YEARS = 10
+MAX_PROJECTION_YEARS = 50
+
+# Default and maximum simulated paths per symbol
+PROJECTION_PATHS = 10_000
+MAX_PROJECTION_PATHS = 100_000
+
+# Percentile bands returned for every year
+PROJECTION_PERCENTILES = (5, 25, 50, 75, 95)
+
+# Bytes of simulated paths held at once, symbols are simulated in chunks of this size
+PROJECTION_CHUNK_BYTES = int(os.getenv("PROJECTION_CHUNK_BYTES", str(64 * 1024 * 1024)))
+
+# Yearly growth draws are clipped to [-100%, MAX_GROWTH], a dividend cannot turn negative
+MAX_GROWTH = 1.0
+
+# The distinct DGR columns of the sheet, weighted equally: each is one estimate of the symbol's yearly growth
+GROWTH_SERIES = ("DGR 1Y", "DGR 3Y", "DGR 5Y", "DGR 10Y")
+
+def growth_distribution(df):
+    """Mean and standard deviation of each symbol's yearly dividend growth (fractions), from its DGR series.
+
+    Every rate in GROWTH_SERIES counts once. Missing rates are skipped, symbols without any DGR
+    get NaN and no projection.
+    """
+    estimated = np.column_stack([column_values(df, column) for column in GROWTH_SERIES]) / 100
+    with warnings.catch_warnings():
+        # All-NaN rows are expected and come out as NaN
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        return np.nanmean(estimated, axis=1), np.nanstd(estimated, axis=1)
+
+def simulate_growth_bands(mean, std, years=PROJECTION_YEARS, paths=PROJECTION_PATHS, percentiles=PROJECTION_PERCENTILES, seed=None, chunk_bytes=PROJECTION_CHUNK_BYTES):
+    """Percentiles of cumulative dividend growth, shape (symbols, len(percentiles), years).
+
+    Yearly growth of a path is mean + std * z, with one (years x paths) matrix of standard normal
+    draws shared by every symbol (common random numbers): each symbol's bands are a plain Monte
+    Carlo estimate, symbols are compared on the same scenarios, and a symbol's result does not
+    depend on which other symbols are projected with it. A chunk of symbols is expanded into one
+    float32 (symbols x years x paths) array, compounded along the year axis and sorted along the
+    path axis, then reduced to the percentile bands before the next chunk is built.
+    """
+    mean = np.asarray(mean, dtype=np.float32)
+    std = np.asarray(std, dtype=np.float32)
+    draws = np.random.default_rng(seed).standard_normal((years, paths), dtype=np.float32)
+
+    # Linear interpolation between the sorted paths, as np.percentile does
+    positions = np.asarray(percentiles, dtype=float) / 100 * (paths - 1)
+    lower = np.floor(positions).astype(int)
+    upper = np.minimum(lower + 1, paths - 1)
+    fraction = positions - lower
+
+    bands = np.empty((len(mean), len(percentiles), years))
+    chunk = max(1, min(len(mean), chunk_bytes // (paths * years * np.dtype(np.float32).itemsize)))
+    # One buffer reused by every chunk
+    buffer = np.empty((chunk, years, paths), dtype=np.float32)
+    for start in range(0, len(mean), chunk):
+        stop = min(start + chunk, len(mean))
+        growth = np.multiply(draws, std[start:stop, None, None], out=buffer[:stop - start])
+        growth += mean[start:stop, None, None]
+        np.clip(growth, -1.0, MAX_GROWTH, out=growth)
+        growth += 1.0
+        for year in range(1, years):
+            growth[:, year] *= growth[:, year - 1]
+        growth.sort(axis=2)
+        values = growth[..., lower] * (1 - fraction) + growth[..., upper] * fraction
+        bands[start:stop] = np.moveaxis(values, 2, 1)
+    return bands
+
+def parse_percentiles(value):
+    """Percentiles from "5,50,95", the default bands when empty."""
+    if not value:
+        return PROJECTION_PERCENTILES
+    try:
+        percentiles = tuple(float(percentile) for percentile in value.split(",") if percentile.strip())
+    except ValueError as e:
+        raise ValueError(f"Invalid percentiles '{value}', expected comma-separated numbers.") from e
+    if not percentiles or len(percentiles) > 21 or not all(0 <= percentile <= 100 for percentile in percentiles):
+        raise ValueError("Expected between 1 and 21 percentiles between 0 and 100.")
+    return percentiles
+
+def project_frame(df, years=PROJECTION_YEARS, paths=PROJECTION_PATHS, percentiles=PROJECTION_PERCENTILES, seed=None):
+    """Monte Carlo dividend-income bands for every row of a screened frame.
+
+    Returns (frame, summary): per symbol the growth mean and spread used (percent) and, for each
+    percentile, the projected annual dividend per share and yield on cost (percent) for years 1..years.
+    """
+    if not 1 <= years <= MAX_PROJECTION_YEARS:
+        raise ValueError(f"Expected a horizon between 1 and {MAX_PROJECTION_YEARS} years.")
+    if not 1 <= paths <= MAX_PROJECTION_PATHS:
+        raise ValueError(f"Expected between 1 and {MAX_PROJECTION_PATHS} paths.")
+    # A drawn seed is reported so a projection can be repeated
+    seed = int(np.random.SeedSequence().entropy % 2**63) if seed is None else seed
+
+    dividend = column_values(df, "Annualized Dividend")
+    div_yield = column_values(df, "Div Yield")
+    mean, std = growth_distribution(df)
+    bands = simulate_growth_bands(mean, std, years, paths, percentiles, seed)
+
+    frame = pd.DataFrame({
+        "Symbol": df["Symbol"].to_numpy(dtype=object),
+        "Annualized Dividend": dividend,
+        "Div Yield": div_yield,
+        "Growth Mean %": mean * 100,
+        "Growth Std %": std * 100,
+    })
+    for index, percentile in enumerate(percentiles):
+        label = f"P{percentile:g}"
+        frame[f"Dividend {label}"] = band_column(dividend[:, None] * bands[:, index])
+        frame[f"Yield on Cost {label}"] = band_column(div_yield[:, None] * bands[:, index])
+    return frame, {"years": years, "paths": paths, "percentiles": list(percentiles), "seed": seed}
+
+def band_column(values):
+    # One list of yearly values per symbol, rounded past the float32 simulation's precision, missing values as None
+    values = np.round(values, 4)
+    return pd.Series(np.where(np.isfinite(values), values, None).tolist(), dtype=object).to_numpy()
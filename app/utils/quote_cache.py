@@ -0,0 +1,143 @@
+# pylint: disable = missing-module-docstring, missing-final-newline, trailing-whitespace, line-too-long
+import os
+import time
+import sqlite3
+import threading
+import logging
+from collections import OrderedDict
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Seconds a cached quote is considered fresh
+DEFAULT_STALENESS = int(os.getenv("QUOTE_CACHE_TTL", str(4 * 60 * 60)))
+
+# Maximum number of symbols kept in the in-process tier
+DEFAULT_MAX_ENTRIES = int(os.getenv("QUOTE_CACHE_SIZE", "20000"))
+
+# Optional SQLite file shared by every worker on the host, disabled when unset
+DEFAULT_SQLITE_PATH = os.getenv("QUOTE_CACHE_DB") or None
+
+# SQLite's default limit on bound parameters per statement
+SQLITE_MAX_VARIABLES = 900
+
+QUOTE_COLUMNS = ['Symbol', 'Exchange', 'EPS']
+
+class QuoteCache:
+    """Symbol-keyed cache of (exchange, eps) quotes with a staleness window.
+
+    Lookups go to an LRU dict first, then to the optional SQLite tier, and only the
+    symbols that are missing or stale in both are passed to the fetch function.
+    Symbols FMP does not know are cached too, so they are not requested on every upload.
+    """
+
+    def __init__(self, staleness=DEFAULT_STALENESS, max_entries=DEFAULT_MAX_ENTRIES, sqlite_path=DEFAULT_SQLITE_PATH):
+        self.staleness = staleness
+        self.max_entries = max_entries
+        self.sqlite_path = sqlite_path
+        self._entries = OrderedDict()  # symbol -> (fetched_at, exchange, eps, found)
+        self._lock = threading.Lock()
+        if self.sqlite_path:
+            self._init_sqlite()
+
+    # SQLite tier
+    def _connect(self):
+        return sqlite3.connect(self.sqlite_path, timeout=10)
+
+    def _init_sqlite(self):
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS quotes ("
+                "symbol TEXT PRIMARY KEY, exchange TEXT, eps REAL, found INTEGER NOT NULL, fetched_at REAL NOT NULL)"
+            )
+
+    def _read_sqlite(self, symbols, fresh_after):
+        rows = {}
+        if not self.sqlite_path or not symbols:
+            return rows
+        try:
+            with self._connect() as conn:
+                for start in range(0, len(symbols), SQLITE_MAX_VARIABLES):
+                    chunk = symbols[start:start + SQLITE_MAX_VARIABLES]
+                    placeholders = ",".join("?" * len(chunk))
+                    cursor = conn.execute(
+                        f"SELECT symbol, fetched_at, exchange, eps, found FROM quotes WHERE symbol IN ({placeholders}) AND fetched_at >= ?",
+                        [*chunk, fresh_after],
+                    )
+                    for symbol, fetched_at, exchange, eps, found in cursor:
+                        rows[symbol] = (fetched_at, exchange, eps, bool(found))
+        except sqlite3.Error as e:
+            logger.warning("Quote cache read failed, falling back to FMP: %s", e)
+        return rows
+
+    def _write_sqlite(self, entries):
+        if not self.sqlite_path or not entries:
+            return
+        try:
+            with self._connect() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO quotes (symbol, fetched_at, exchange, eps, found) VALUES (?, ?, ?, ?, ?)",
+                    [(symbol, fetched_at, exchange, eps, int(found)) for symbol, (fetched_at, exchange, eps, found) in entries.items()],
+                )
+        except sqlite3.Error as e:
+            logger.warning("Quote cache write failed: %s", e)
+
+    # In-process tier
+    def _remember(self, entries):
+        with self._lock:
+            for symbol, entry in entries.items():
+                self._entries[symbol] = entry
+                self._entries.move_to_end(symbol)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _recall(self, symbols, fresh_after):
+        hits = {}
+        with self._lock:
+            for symbol in symbols:
+                entry = self._entries.get(symbol)
+                if entry is not None and entry[0] >= fresh_after:
+                    self._entries.move_to_end(symbol)
+                    hits[symbol] = entry
+        return hits
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_quotes(self, symbols, fetch):
+        """Return a Symbol/Exchange/EPS frame for symbols, calling fetch(missing_symbols) only for cache misses."""
+        symbols = list(dict.fromkeys(symbols))
+        now = time.time()
+        fresh_after = now - self.staleness
+
+        entries = self._recall(symbols, fresh_after)
+        missing = [symbol for symbol in symbols if symbol not in entries]
+
+        from_disk = self._read_sqlite(missing, fresh_after)
+        if from_disk:
+            self._remember(from_disk)
+            entries.update(from_disk)
+            missing = [symbol for symbol in missing if symbol not in from_disk]
+
+        if missing:
+            fetched = fetch(missing)
+            new_entries = {
+                row.Symbol: (now, row.Exchange, row.EPS, True)
+                for row in fetched[QUOTE_COLUMNS].itertuples(index=False)
+            }
+            # Remember unknown symbols as well so they are not requested again inside the window
+            for symbol in missing:
+                new_entries.setdefault(symbol, (now, None, None, False))
+            self._remember(new_entries)
+            self._write_sqlite(new_entries)
+            entries.update(new_entries)
+            logger.info("Quote cache: %d hits, %d fetched", len(symbols) - len(missing), len(missing))
+
+        records = [
+            (symbol, entries[symbol][1], entries[symbol][2])
+            for symbol in symbols
+            if symbol in entries and entries[symbol][3]
+        ]
+        return pd.DataFrame.from_records(records, columns=QUOTE_COLUMNS)
\ No newline at end of file
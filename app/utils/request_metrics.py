@@ -0,0 +1,78 @@
+# pylint: disable = missing-module-docstring, missing-final-newline, trailing-whitespace, line-too-long
+import os
+import time
+import random
+import logging
+from flask import request, g
+from .instrumentation import metrics, start_trace, end_trace
+
+logger = logging.getLogger(__name__)
+
+# Requests slower than this many seconds are candidates for a trace log
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "2.0"))
+
+# Share of slow requests whose trace (stages and upstream calls) is logged
+SLOW_REQUEST_SAMPLE_RATE = float(os.getenv("SLOW_REQUEST_SAMPLE_RATE", "0.1"))
+
+# Share of all requests logged as one structured line, replaces per-request debug logging
+REQUEST_LOG_SAMPLE_RATE = float(os.getenv("REQUEST_LOG_SAMPLE_RATE", "0.01"))
+
+def route_name():
+    # The URL rule keeps label cardinality bounded: "/api/results/<upload_id>", not every upload id
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+def install_request_metrics(app, registry=None, slow_seconds=None, slow_sample_rate=None, log_sample_rate=None):
+    """Record latency, in-flight count and response size of every request, and log sampled traces of slow ones.
+
+    Latency is measured until the response object is ready; a streamed body is still being
+    sent after that, and unless it declares a Content-Length it is left out of the size histogram.
+    """
+    registry = registry or metrics
+    slow_seconds = SLOW_REQUEST_SECONDS if slow_seconds is None else slow_seconds
+    slow_sample_rate = SLOW_REQUEST_SAMPLE_RATE if slow_sample_rate is None else slow_sample_rate
+    log_sample_rate = REQUEST_LOG_SAMPLE_RATE if log_sample_rate is None else log_sample_rate
+
+    @app.before_request
+    def start_request():
+        g.request_started = time.perf_counter()
+        # Stages and upstream calls of this request, for the slow-request trace
+        g.request_trace, g.request_trace_token = start_trace()
+        registry.inc("dividend_http_requests_in_flight", 1)
+
+    @app.after_request
+    def measure_response(response):
+        g.response_status = response.status_code
+        # Files sent with send_file declare their length, generated streams do not
+        g.response_size = response.content_length if response.is_streamed else response.calculate_content_length()
+        return response
+
+    @app.teardown_request
+    def finish_request(error=None):
+        started = g.pop("request_started", None)
+        if started is None:
+            return
+        seconds = time.perf_counter() - started
+        end_trace(g.pop("request_trace_token"))
+        route = route_name()
+        status = g.pop("response_status", 500 if error is not None else 200)
+        size = g.pop("response_size", None)
+        registry.inc("dividend_http_requests_in_flight", -1)
+        registry.observe("dividend_http_request_duration_seconds", seconds, route=route, method=request.method, status=status)
+        if size is not None:
+            registry.observe("dividend_http_response_size_bytes", size, route=route, method=request.method)
+
+        fields = {"method": request.method, "route": route, "status": status, "seconds": round(seconds, 6), "bytes": size}
+        if seconds >= slow_seconds and random.random() < slow_sample_rate:
+            logger.warning(
+                "slow request method=%s route=%s status=%s seconds=%.3f trace=%s",
+                request.method, route, status, seconds, g.request_trace,
+                extra={"request": fields, "request_trace": g.request_trace},
+            )
+        elif random.random() < log_sample_rate:
+            logger.info(
+                "request method=%s route=%s status=%s seconds=%.4f bytes=%s",
+                request.method, route, status, seconds, size,
+                extra={"request": fields},
+            )
+
+    return app
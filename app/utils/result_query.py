@@ -0,0 +1,96 @@
+# pylint: disable = missing-module-docstring, missing-final-newline, trailing-whitespace, line-too-long
+import logging
+import numpy as np
+import pandas as pd
+from .sheet_cache import save_sheet, load_sheet
+from .rule_engine import compile_rule_set, evaluate_rule_sets
+
+logger = logging.getLogger(__name__)
+
+# Columns whose sort orders are computed when a result is stored
+SORT_INDEX_COLUMNS = ("Div Yield", "Chowder Number", "FV %", "Weighted DGR")
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Stored sort orders are extra int32 columns named <prefix><column>
+ASCENDING_PREFIX = "__asc__"
+DESCENDING_PREFIX = "__desc__"
+
+def sort_order(values, ascending=True):
+    """Row positions in sorted order, stable, missing values last in both directions."""
+    series = pd.Series(values).reset_index(drop=True)
+    return series.sort_values(ascending=ascending, kind="stable", na_position="last").index.to_numpy(dtype=np.int32)
+
+def save_result_frame(path, metadata, df):
+    """Store a screened frame as memory-mappable Feather together with its precomputed sort orders."""
+    orders = {}
+    for column in SORT_INDEX_COLUMNS:
+        if column in df.columns:
+            orders[ASCENDING_PREFIX + column] = sort_order(df[column], True)
+            orders[DESCENDING_PREFIX + column] = sort_order(df[column], False)
+    return save_sheet(path, metadata, df.assign(**orders))
+
+def load_result_frame(path):
+    """Return (metadata, frame, sort orders) for a stored frame, or None on a miss."""
+    cached = load_sheet(path)
+    if cached is None:
+        return None
+    metadata, df = cached
+    orders = {}
+    for column in [column for column in df.columns if column.startswith((ASCENDING_PREFIX, DESCENDING_PREFIX))]:
+        orders[column] = df.pop(column).to_numpy()
+    return metadata, df, orders
+
+def parse_sort(text):
+    """"-Div Yield,Symbol" -> [("Div Yield", False), ("Symbol", True)]."""
+    keys = []
+    for item in filter(None, (part.strip() for part in (text or "").split(","))):
+        ascending = not item.startswith("-")
+        keys.append((item.lstrip("+-").strip(), ascending))
+    return keys
+
+def parse_columns(text, available):
+    if not text:
+        return list(available)
+    columns = [column.strip() for column in text.split(",") if column.strip()]
+    unknown = [column for column in columns if column not in available]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(unknown)}.")
+    return columns
+
+def filter_mask(df, expression, variables=None):
+    """Row mask for a rule-engine filter expression, e.g. `Div Yield` > 3 and `Meets Chowder Criteria`."""
+    rule_set = compile_rule_set({"name": "filter", "rules": [], "filter": expression})
+    _, mask = evaluate_rule_sets(df, [rule_set], variables)[0]
+    return mask
+
+def query_frame(df, orders=None, mask=None, sort=None, columns=None, page=1, page_size=DEFAULT_PAGE_SIZE):
+    """Filter, sort, paginate and project a frame, return (matching row count, page frame).
+
+    Only the rows of the requested page are materialized; a single-column sort on one of
+    SORT_INDEX_COLUMNS uses the stored order instead of sorting.
+    """
+    orders = orders or {}
+    keys = parse_sort(sort)
+    for column, _ in keys:
+        if column not in df.columns:
+            raise ValueError(f"Cannot sort on unknown column '{column}'.")
+    if page < 1 or not 1 <= page_size <= MAX_PAGE_SIZE:
+        raise ValueError(f"page must be at least 1 and page_size between 1 and {MAX_PAGE_SIZE}.")
+
+    if not keys:
+        positions = np.arange(len(df))
+    elif len(keys) == 1 and (ASCENDING_PREFIX if keys[0][1] else DESCENDING_PREFIX) + keys[0][0] in orders:
+        column, ascending = keys[0]
+        positions = orders[(ASCENDING_PREFIX if ascending else DESCENDING_PREFIX) + column]
+    else:
+        by = [column for column, _ in keys]
+        positions = df[by].reset_index(drop=True).sort_values(by, ascending=[ascending for _, ascending in keys], kind="stable", na_position="last").index.to_numpy()
+
+    if mask is not None:
+        positions = positions[np.asarray(mask, dtype=bool)[positions]]
+
+    start = (page - 1) * page_size
+    page_positions = positions[start:start + page_size]
+    return len(positions), df[columns or list(df.columns)].iloc[page_positions].reset_index(drop=True)
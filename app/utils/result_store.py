@@ -0,0 +1,162 @@
+# pylint: disable = missing-module-docstring, missing-final-newline, trailing-whitespace, line-too-long
+import os
+import time
+import hashlib
+import logging
+from contextlib import contextmanager
+from .sheet_schema import SHEET_SCHEMA_VERSION
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on the bytes kept in the store (raw uploads plus results)
+DEFAULT_MAX_BYTES = int(os.getenv("RESULT_STORE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# Seconds a stored result may be served, bounds how stale its EPS quotes can get
+DEFAULT_MAX_AGE = int(os.getenv("RESULT_STORE_TTL", os.getenv("QUOTE_CACHE_TTL", str(4 * 60 * 60))))
+
+# Bump whenever the screening output changes so older results are not served
+# 2: columnar serializer, streamed output and results of cached (re-screened) sheets
+RESULT_FORMAT_VERSION = "2"
+
+CHUNK_SIZE = 1024 * 1024
+
+class ResultStore:
+    """Content-addressed store for uploaded workbooks and their computed JSON results.
+
+    Raw uploads live in <root>/files/<sha256><ext>, results in <root>/results/<key><ext>.
+    Each file's mtime records when it was written (used for max_age) and its atime records
+    the last hit (used for least-recently-used eviction once max_bytes is exceeded).
+    """
+
+    def __init__(self, root, max_bytes=DEFAULT_MAX_BYTES, max_age=DEFAULT_MAX_AGE):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.files_dir = os.path.join(root, "files")
+        self.results_dir = os.path.join(root, "results")
+        os.makedirs(self.files_dir, exist_ok=True)
+        os.makedirs(self.results_dir, exist_ok=True)
+
+    def save_upload(self, file, extension):
+        """Stream an uploaded file to disk while hashing it, return (sha256, path)."""
+        digest = hashlib.sha256()
+        partial_path = os.path.join(self.files_dir, f".{os.getpid()}.{time.time_ns()}.part")
+        stream = getattr(file, "stream", file)
+        with open(partial_path, "wb") as f:
+            for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+                f.write(chunk)
+        sha = digest.hexdigest()
+        path = os.path.join(self.files_dir, sha + extension)
+        os.replace(partial_path, path)
+        self.touch(path)
+        return sha, path
+
+    def find_upload(self, content_hash, extensions=(".xlsx", ".xls", ".csv")):
+        """Path of a previously saved upload, or None when it was never stored or has been evicted."""
+        for extension in extensions:
+            path = os.path.join(self.files_dir, content_hash + extension)
+            if os.path.exists(path):
+                self.touch(path)
+                return path
+        return None
+
+    def sheet_path(self, content_hash, sheet_name="All"):
+        # Columnar copy of a normalized sheet, see sheet_cache, keyed by the sheet schema version; sheets other than "All" also by a hash of their name
+        if sheet_name == "All":
+            return os.path.join(self.files_dir, f"{content_hash}.{SHEET_SCHEMA_VERSION}.feather")
+        sheet_hash = hashlib.sha256(sheet_name.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.files_dir, f"{content_hash}.{SHEET_SCHEMA_VERSION}.{sheet_hash}.feather")
+
+    @staticmethod
+    def result_key(content_hash, snapshot_version, variant):
+        """Key of a result: upload bytes, market-data snapshot and output variant together."""
+        raw = f"{RESULT_FORMAT_VERSION}:{content_hash}:{snapshot_version}:{variant}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def result_path(self, key, extension=".json"):
+        return os.path.join(self.results_dir, key + extension)
+
+    @staticmethod
+    def touch(path):
+        # Record the hit in atime only, mtime keeps the write time
+        try:
+            os.utime(path, (time.time(), os.stat(path).st_mtime))
+        except OSError:
+            pass
+
+    def is_fresh(self, path):
+        """True when path exists and was written within max_age (counts as a hit)."""
+        try:
+            fresh = time.time() - os.stat(path).st_mtime <= self.max_age
+        except OSError:
+            return False
+        if fresh:
+            self.touch(path)
+        return fresh
+
+    def open_result(self, key, extension=".json"):
+        """Open a fresh stored result for reading, or return None on a miss."""
+        path = self.result_path(key, extension)
+        try:
+            handle = open(path, encoding="utf-8")  # pylint: disable=consider-using-with
+        except OSError:
+            return None
+        if time.time() - os.fstat(handle.fileno()).st_mtime > self.max_age:
+            handle.close()
+            return None
+        self.touch(path)
+        return handle
+
+    def read_result(self, key, extension=".json"):
+        handle = self.open_result(key, extension)
+        if handle is None:
+            return None
+        with handle:
+            return handle.read()
+
+    @contextmanager
+    def write_result(self, key, extension=".json"):
+        """Write a result through a temp file, it only becomes visible once the block completes."""
+        path = self.result_path(key, extension)
+        partial_path = f"{path}.{os.getpid()}.{time.time_ns()}.part"
+        try:
+            with open(partial_path, "w", encoding="utf-8") as f:
+                yield f
+            os.replace(partial_path, path)
+        finally:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+        self.evict()
+
+    def evict(self):
+        """Delete least recently used files until the store fits in max_bytes."""
+        entries = []
+        for directory in (self.files_dir, self.results_dir):
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.is_file() and not entry.name.endswith(".part"):
+                        try:
+                            stat = entry.stat()
+                        except OSError:
+                            continue
+                        entries.append((stat.st_atime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                continue
+        return total
+
+# One store per upload folder
+_stores = {}
+
+def get_result_store(upload_folder):
+    store = _stores.get(upload_folder)
+    if store is None:
+        store = _stores[upload_folder] = ResultStore(upload_folder)
+    return store
\ No newline at end of file
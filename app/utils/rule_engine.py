@@ -0,0 +1,397 @@
+# pylint: disable = missing-module-docstring, missing-final-newline, trailing-whitespace, line-too-long
+import os
+import re
+import ast
+import json
+import hashlib
+import operator
+import threading
+import logging
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from .screening import categorize_dividends
+from .sheet_schema import wide_values
+from .valuation import ValuationParams, gordon_growth, multi_stage_dcf
+
+try:
+    import yaml
+except ImportError:  # pragma: no cover - rule sets are JSON only without PyYAML
+    yaml = None
+
+logger = logging.getLogger(__name__)
+
+# Rule set applied by apply_screen
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "rules", "default_screen.json")
+
+# Market reference values every expression can use by name
+REFERENCE_VARIABLES = ("tbill_rate", "tbond_rate", "market_risk_premium")
+
+# Compiled rule sets kept by definition hash
+MAX_COMPILED_RULE_SETS = 128
+
+# `Column Name` in an expression refers to a column
+COLUMN_PATTERN = re.compile(r"`([^`]+)`")
+
+CONSTANTS = {"inf": np.inf, "nan": np.nan}
+
+BINARY_OPERATORS = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv, ast.Mod: operator.mod, ast.Pow: operator.pow,
+    ast.BitAnd: operator.and_, ast.BitOr: operator.or_, ast.BitXor: operator.xor,
+}
+
+# Operators that only make sense on numbers, text and lists are rejected (think "x" * 10 ** 9)
+ARITHMETIC_OPERATORS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow)
+
+# Object arrays of these inferred types hold text
+TEXT_TYPES = ("string", "bytes", "mixed", "mixed-integer")
+
+COMPARISONS = {
+    ast.Lt: operator.lt, ast.LtE: operator.le, ast.Gt: operator.gt,
+    ast.GtE: operator.ge, ast.Eq: operator.eq, ast.NotEq: operator.ne,
+}
+
+UNARY_OPERATORS = {ast.USub: operator.neg, ast.UAdd: operator.pos, ast.Not: np.logical_not, ast.Invert: operator.invert}
+
+def _cv(*columns):
+    # Row-wise coefficient of variation in percent, inf where the mean is 0
+    stacked = np.column_stack(columns).astype(float)
+    std_dev = np.std(stacked, axis=1)
+    mean = np.mean(stacked, axis=1)
+    return np.where(mean != 0, (std_dev / mean) * 100, np.inf)
+
+def _select(conditions, choices, default=np.nan):
+    return np.select(list(conditions), list(choices), default=default)
+
+def _dividend_category(years):
+    return categorize_dividends(pd.Series(years)).to_numpy()
+
+def _numeric(value):
+    # Arithmetic operand check, text would be repeated or concatenated element by element in Python
+    if isinstance(value, (str, bytes, list, tuple)) or (
+        isinstance(value, np.ndarray) and (value.dtype.kind in "USV" or (value.dtype.kind == "O" and pd.api.types.infer_dtype(value, skipna=True) in TEXT_TYPES))
+    ):
+        raise TypeError("arithmetic needs numbers, not text")
+    return value
+
+def _ddm(dividend, growth, discount):
+    return gordon_growth(dividend, growth, discount)
+
+def _dcf(cash_flow, growth, discount):
+    # Stage lengths and terminal growth are the valuation defaults, a rule cannot ask for a million-year loop
+    params = ValuationParams()
+    return multi_stage_dcf(cash_flow, growth, discount, params.terminal_growth, params.high_growth_years, params.fade_years)
+
+# Functions available to expressions, all operate on whole columns
+FUNCTIONS = {
+    "where": np.where,
+    "select": _select,
+    "abs": np.abs,
+    "sqrt": np.sqrt,
+    "log": np.log,
+    "minimum": np.minimum,
+    "maximum": np.maximum,
+    "isnull": pd.isna,
+    "notnull": pd.notna,
+    "fillna": lambda values, fill: np.where(pd.isna(values), fill, values),
+    "cv": _cv,
+    "dividend_category": _dividend_category,
+    # ddm(dividend, growth, discount) and dcf(cash flow, growth, discount), rates as fractions
+    "ddm": _ddm,
+    "dcf": _dcf,
+}
+
+# Argument counts checked at compile time, the rest take what their NumPy counterpart takes
+FUNCTION_ARITY = {"ddm": 3, "dcf": 3}
+
+# Functions taking lists of columns, the only place a [...] literal may appear
+LIST_FUNCTIONS = ("select",)
+
+class RuleSetError(ValueError):
+    """Raised for a rule set that cannot be parsed, compiled or evaluated."""
+
+class _Node:
+    """A compiled expression: a function of the evaluation context plus a canonical key.
+
+    Equal keys mean equal values within one pass, so subexpressions shared by several
+    rule sets are computed once.
+    """
+
+    __slots__ = ("key", "fn", "constant")
+
+    def __init__(self, key, fn, constant=False):
+        self.key = key
+        self.fn = fn
+        self.constant = constant
+
+    def __call__(self, context):
+        memo = context["memo"]
+        if self.key not in memo:
+            memo[self.key] = self.fn(context)
+        return memo[self.key]
+
+class _Compiler:
+    def __init__(self, params, outputs, scope):
+        self.params = params
+        self.outputs = outputs  # columns defined by earlier rules of the same set
+        self.scope = scope
+        self.columns = {}
+
+    def compile(self, expression):
+        if not isinstance(expression, str) or not expression.strip():
+            raise RuleSetError(f"Expected an expression string, got {expression!r}.")
+
+        def placeholder(match):
+            name = f"__column_{len(self.columns)}"
+            self.columns[name] = match.group(1)
+            return name
+
+        try:
+            tree = ast.parse(COLUMN_PATTERN.sub(placeholder, expression.strip()), mode="eval")
+        except SyntaxError as e:
+            raise RuleSetError(f"Invalid expression {expression!r}: {e.msg}") from e
+        return self.visit(tree.body)
+
+    def visit(self, node):
+        method = getattr(self, f"visit_{type(node).__name__}", None)
+        if method is None:
+            raise RuleSetError(f"Unsupported syntax in rule expression: {type(node).__name__}")
+        return method(node)
+
+    def visit_Constant(self, node):
+        value = node.value
+        if not isinstance(value, (int, float, str, bool, type(None))):
+            raise RuleSetError(f"Unsupported constant {value!r}.")
+        return _Node(f"const({value!r})", lambda context: value, constant=True)
+
+    def visit_Name(self, node):
+        name = node.id
+        if name in self.columns:
+            column = self.columns[name]
+            if column in self.outputs:
+                return _Node(f"out({self.scope},{column!r})", lambda context: context["outputs"][column])
+            return _Node(f"col({column!r})", lambda context: context["column"](column))
+        if name in self.params:
+            value = self.params[name]
+            return _Node(f"const({value!r})", lambda context: value, constant=True)
+        if name in REFERENCE_VARIABLES:
+            return _Node(f"ref({name})", lambda context: context["variables"][name])
+        if name in CONSTANTS:
+            value = CONSTANTS[name]
+            return _Node(f"const({name})", lambda context: value, constant=True)
+        raise RuleSetError(f"Unknown name '{name}', columns are written as `Column Name`.")
+
+    def visit_BinOp(self, node):
+        op = BINARY_OPERATORS.get(type(node.op))
+        if op is None:
+            raise RuleSetError(f"Unsupported operator {type(node.op).__name__}.")
+        left, right = self.visit(node.left), self.visit(node.right)
+        # Arithmetic on two plain values runs in Python (think 9 ** 9 ** 9 or "x" * 10 ** 9), keep it column-wise
+        if left.constant and right.constant:
+            raise RuleSetError("Arithmetic needs at least one column or reference value, write the combined constant instead.")
+        if not isinstance(node.op, ARITHMETIC_OPERATORS):
+            return _Node(f"{op.__name__}({left.key},{right.key})", lambda context: op(left(context), right(context)))
+        if any(isinstance(operand, ast.Constant) and isinstance(operand.value, str) for operand in (node.left, node.right)):
+            raise RuleSetError("Arithmetic needs numbers, not text.")
+        # Columns and params are only known at evaluation time, text among them is rejected then
+        return _Node(f"{op.__name__}({left.key},{right.key})", lambda context: op(_numeric(left(context)), _numeric(right(context))))
+
+    def visit_UnaryOp(self, node):
+        op = UNARY_OPERATORS[type(node.op)]
+        operand = self.visit(node.operand)
+        return _Node(f"{op.__name__}({operand.key})", lambda context: op(operand(context)), constant=operand.constant)
+
+    def visit_BoolOp(self, node):
+        op = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+        values = [self.visit(value) for value in node.values]
+        return _Node(f"{op.__name__}({','.join(value.key for value in values)})", lambda context: op.reduce([value(context) for value in values]))
+
+    def visit_Compare(self, node):
+        # a < b < c is (a < b) & (b < c), like in Python
+        operands = [self.visit(node.left)] + [self.visit(comparator) for comparator in node.comparators]
+        ops = [COMPARISONS[type(op)] for op in node.ops]
+        pairs = list(zip(ops, operands, operands[1:]))
+
+        def fn(context):
+            result = None
+            for op, left, right in pairs:
+                value = op(left(context), right(context))
+                result = value if result is None else result & value
+            return result
+
+        return _Node("&".join(f"{op.__name__}({left.key},{right.key})" for op, left, right in pairs), fn)
+
+    def visit_IfExp(self, node):
+        test, body, orelse = self.visit(node.test), self.visit(node.body), self.visit(node.orelse)
+        return _Node(f"where({test.key},{body.key},{orelse.key})", lambda context: np.where(test(context), body(context), orelse(context)))
+
+    def visit_List(self, node):
+        raise RuleSetError(f"Lists are only allowed as arguments of {', '.join(LIST_FUNCTIONS)}.")
+
+    visit_Tuple = visit_List
+
+    def visit_argument(self, name, node):
+        if name not in LIST_FUNCTIONS or not isinstance(node, (ast.List, ast.Tuple)):
+            return self.visit(node)
+        items = [self.visit(item) for item in node.elts]
+        return _Node(f"[{','.join(item.key for item in items)}]", lambda context: [item(context) for item in items])
+
+    def visit_Call(self, node):
+        if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS:
+            raise RuleSetError(f"Unknown function in rule expression, expected one of {', '.join(FUNCTIONS)}.")
+        if node.keywords:
+            raise RuleSetError("Rule functions take positional arguments only.")
+        name = node.func.id
+        if name in FUNCTION_ARITY and len(node.args) != FUNCTION_ARITY[name]:
+            raise RuleSetError(f"{name}() takes {FUNCTION_ARITY[name]} arguments, got {len(node.args)}.")
+        fn = FUNCTIONS[name]
+        args = [self.visit_argument(name, arg) for arg in node.args]
+        return _Node(f"{name}({','.join(arg.key for arg in args)})", lambda context: fn(*[arg(context) for arg in args]))
+
+def rule_set_hash(definition):
+    return hashlib.sha256(json.dumps(definition, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+class CompiledRuleSet:
+    """A rule set compiled into column-wise NumPy expressions.
+
+    Each rule defines one output column from earlier outputs, sheet columns, the rule set's
+    params and the market reference values; an optional "filter" expression picks rows.
+    """
+
+    def __init__(self, definition):
+        if not isinstance(definition, dict) or not isinstance(definition.get("rules"), list):
+            raise RuleSetError('A rule set is an object with a "rules" list.')
+        self.digest = rule_set_hash(definition)
+        self.name = definition.get("name") or self.digest[:12]
+        params = definition.get("params") or {}
+        if not isinstance(params, dict):
+            raise RuleSetError('"params" must be an object.')
+
+        outputs = set()
+        self.rules = []
+        for rule in definition["rules"]:
+            if not isinstance(rule, dict) or not rule.get("column"):
+                raise RuleSetError('Every rule needs a "column" name and an "expr".')
+            node = _Compiler(params, set(outputs), self.digest).compile(rule.get("expr"))
+            self.rules.append((rule["column"], node, rule.get("position")))
+            outputs.add(rule["column"])
+
+        self.filter = None
+        if definition.get("filter"):
+            self.filter = _Compiler(params, outputs, self.digest).compile(definition["filter"])
+
+    def evaluate(self, context):
+        """Return an OrderedDict of output column -> array (plus the row mask when a filter is set)."""
+        context["outputs"] = outputs = OrderedDict()
+        length = context["length"]
+        with np.errstate(all="ignore"):
+            for column, node, _ in self.rules:
+                try:
+                    outputs[column] = _as_column(node(context), length)
+                except (TypeError, ValueError, KeyError) as e:
+                    raise RuleSetError(f"Rule '{column}' of '{self.name}' failed: {e}") from e
+            mask = None
+            if self.filter is not None:
+                try:
+                    selected = _as_column(self.filter(context), length)
+                    # Missing values (NaN, a nullable flag's NA) never pass the filter
+                    mask = pd.notna(selected) & selected.astype(bool)
+                except (TypeError, ValueError, KeyError) as e:
+                    raise RuleSetError(f"Filter of '{self.name}' failed: {e}") from e
+        return outputs, mask
+
+    def apply(self, df, variables=None):
+        """Add the rule set's columns to df (at their "position" when given, appended otherwise)."""
+        outputs, _ = evaluate_rule_sets(df, [self], variables)[0]
+        for column, _, position in self.rules:
+            if column in df.columns:
+                df.pop(column)
+            if position is None:
+                df[column] = outputs[column]
+            else:
+                df.insert(position, column, outputs[column])
+        return df
+
+def _as_column(value, length):
+    if isinstance(value, pd.Series):
+        value = value.to_numpy()
+    if np.ndim(value) == 0:
+        value = np.full(length, value)
+    value = np.asarray(value)
+    if value.shape != (length,):
+        raise ValueError(f"expected one value per row ({length}), got shape {value.shape}")
+    # Text results as Python strings, like the rest of the frame
+    return value.astype(object) if value.dtype.kind == "U" else value
+
+def _column_reader(df):
+    cache = {}
+
+    def read(column):
+        if column not in cache:
+            if column not in df.columns:
+                raise KeyError(f"column '{column}' not found")
+            # Compact dtypes (categoricals, nullable booleans, narrow numbers) are widened for arithmetic
+            cache[column] = wide_values(df[column])
+        return cache[column]
+
+    return read
+
+def evaluate_rule_sets(df, rule_sets, variables=None):
+    """Evaluate several compiled rule sets in one pass over df.
+
+    Columns are read from the frame once and identical subexpressions are computed once,
+    whichever rule set they belong to. Returns a list of (outputs, mask) pairs.
+    """
+    context = {
+        "column": _column_reader(df),
+        "variables": variables or {},
+        "memo": {},
+        "length": len(df),
+    }
+    return [rule_set.evaluate(context) for rule_set in rule_sets]
+
+_compiled = OrderedDict()
+_compiled_lock = threading.Lock()
+
+def compile_rule_set(definition):
+    """Compile a rule set definition, reusing the compiled form of an identical definition."""
+    digest = rule_set_hash(definition)
+    with _compiled_lock:
+        compiled = _compiled.get(digest)
+        if compiled is not None:
+            _compiled.move_to_end(digest)
+            return compiled
+    compiled = CompiledRuleSet(definition)
+    with _compiled_lock:
+        _compiled[digest] = compiled
+        while len(_compiled) > MAX_COMPILED_RULE_SETS:
+            _compiled.popitem(last=False)
+    return compiled
+
+def parse_rule_set(text):
+    """Parse a JSON (or, with PyYAML installed, YAML) rule set definition."""
+    try:
+        return json.loads(text)
+    except ValueError as json_error:
+        if yaml is None:
+            raise RuleSetError(f"Invalid JSON rule set: {json_error}") from json_error
+        try:
+            return yaml.safe_load(text)
+        except yaml.YAMLError as e:
+            raise RuleSetError(f"Invalid rule set: {e}") from e
+
+def load_rule_set(path):
+    with open(path, encoding="utf-8") as f:
+        return compile_rule_set(parse_rule_set(f.read()))
+
+def reference_variables(reference):
+    return {name: getattr(reference, name) for name in REFERENCE_VARIABLES}
+
+_default_rule_set = None
+
+def default_rule_set():
+    global _default_rule_set  # pylint: disable=global-statement
+    if _default_rule_set is None:
+        _default_rule_set = load_rule_set(DEFAULT_RULES_PATH)
+    return _default_rule_set
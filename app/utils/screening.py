@@ -0,0 +1,34 @@
+# pylint: disable = missing-module-docstring, missing-final-newline, trailing-whitespace, line-too-long, invalid-name
+import numpy as np
+import pandas as pd
+from .mappings import dividend_category_mapping
+
+# parse dividend category year ranges into a string range mapping
+def parse_range(range_str):
+    """Parse a string range into a tuple of integers."""
+    if range_str.endswith('+'):
+        return (int(range_str[:-1]), float('inf'))
+    return tuple(map(int, range_str.split('-')))
+
+# Precomputed (category, start, end) bin table, parsed once instead of per row
+dividend_category_bins = [(category, *parse_range(range_str)) for category, range_str in dividend_category_mapping.items()]
+
+# Get dividend categories for a whole column of years
+def categorize_dividends(years, bins=None, default="N/A"):
+    """Vectorized lookup of the dividend category for each value of 'No Years'."""
+    bins = dividend_category_bins if bins is None else bins
+    values = pd.to_numeric(years, errors='coerce').to_numpy(dtype=float)
+    conditions = [(values >= start) & (values <= end) for _, start, end in bins]
+    choices = [category for category, _, _ in bins]
+    return pd.Series(np.select(conditions, choices, default=default), index=years.index, dtype=object)
+
+# Look up (exchange, key) P/E values through a left join on the key columns
+def lookup_pe(df, pe_dict, key_column):
+    """Return one P/E value per row of df, NaN where (Exchange, key_column) has no match."""
+    table = pd.DataFrame(
+        [(exchange, key, pe) for (exchange, key), pe in pe_dict.items()],
+        columns=['Exchange', key_column, 'PE'],
+    ).astype({'Exchange': object, key_column: object})
+    keys = df[['Exchange', key_column]].astype(object).reset_index(drop=True)
+    joined = keys.merge(table, on=['Exchange', key_column], how='left', sort=False)
+    return pd.Series(pd.to_numeric(joined['PE']).to_numpy(), index=df.index)
\ No newline at end of file
@@ -0,0 +1,104 @@
+# pylint: disable = missing-module-docstring, missing-function-docstring, missing-final-newline, trailing-whitespace, line-too-long, missing-class-docstring, invalid-name
+import json
+from datetime import datetime, date
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+# Supported layouts for the "data" section of a result
+ORIENTATIONS = ("records", "columns")
+
+class DateTimeEncoder(json.JSONEncoder):
+    # Custom JSON encoder to handle datetime objects
+    def default(self, o):
+        # Convert datetime and date objects to ISO format
+        if isinstance(o, (datetime, date)):
+            # Use the ISO format without milliseconds
+            return o.isoformat()
+        # Let the base class default method raise the TypeError
+        return super(DateTimeEncoder, self).default(o)
+
+def column_to_list(col):
+    """Convert one column to a list of JSON-ready Python values in a single columnar pass."""
+    # Datetime columns are reduced to their date, missing dates become null
+    if pd.api.types.is_datetime64_any_dtype(col.dtype):
+        return col.dt.strftime("%Y-%m-%d").astype(object).where(col.notna(), None).tolist()
+
+    # Plain numpy bools and integers can never hold missing values
+    if col.dtype == bool or (pd.api.types.is_integer_dtype(col.dtype) and not isinstance(col.dtype, pd.api.extensions.ExtensionDtype)):
+        return col.tolist()
+
+    # Plain numpy floats: only patch the NaN positions
+    if pd.api.types.is_float_dtype(col.dtype) and not isinstance(col.dtype, pd.api.extensions.ExtensionDtype):
+        values = col.to_numpy()
+        result = values.tolist()
+        for i in np.flatnonzero(np.isnan(values)):
+            result[i] = None
+        return result
+
+    # Object, categorical and nullable extension columns
+    values = col.astype(object)
+    missing = values.isna().to_numpy()
+    if values.map(type).eq(str).any():
+        # Strings that look like "YYYY-MM-DD HH:MM:SS" keep only "YYYY-MM-DD"
+        text = values.str
+        timestamp_like = (text.len().eq(19) & text[10].eq(" ")).fillna(False).to_numpy(dtype=bool)
+        if timestamp_like.any():
+            values = values.copy()
+            values[timestamp_like] = text[:10][timestamp_like]
+    result = values.tolist()
+    for i in np.flatnonzero(missing):
+        result[i] = None
+    return result
+
+def dataframe_to_custom_json(df, orient="records"):
+    """Build the JSON-ready "data" section of a result, one column at a time.
+
+    orient="records" gives a list of row objects in the current column order,
+    orient="columns" gives one list of values per column.
+    """
+    if orient not in ORIENTATIONS:
+        raise ValueError(f"Unsupported orientation '{orient}', expected one of {', '.join(ORIENTATIONS)}.")
+    columns = OrderedDict((col, column_to_list(df[col])) for col in df.columns)
+    if orient == "columns":
+        return columns
+    names = list(columns.keys())
+    return [dict(zip(names, row)) for row in zip(*columns.values())]
+
+def serialize_result(metadata, df, orient="records", pretty=False):
+    """Serialize metadata plus the screened frame, compact unless pretty is requested."""
+    full_data = OrderedDict([
+        ("metadata", metadata),
+        ("data", dataframe_to_custom_json(df, orient)),
+    ])
+    if pretty:
+        return json.dumps(full_data, indent=2, cls=DateTimeEncoder)
+    return json.dumps(full_data, separators=(",", ":"), cls=DateTimeEncoder)
+
+# Supported streaming formats and the number of rows serialized per chunk
+STREAM_FORMATS = ("ndjson", "json")
+STREAM_BATCH_SIZE = 500
+
+def iter_serialized_result(metadata, df, stream="ndjson", batch_size=STREAM_BATCH_SIZE):
+    """Yield the result as text chunks: the metadata header first, then rows in batches.
+
+    stream="ndjson" emits one JSON object per line, starting with {"metadata": ...}.
+    stream="json" emits the same compact document serialize_result builds, in pieces.
+    """
+    if stream not in STREAM_FORMATS:
+        raise ValueError(f"Unsupported stream format '{stream}', expected one of {', '.join(STREAM_FORMATS)}.")
+    dumps = DateTimeEncoder(separators=(",", ":")).encode
+    if stream == "ndjson":
+        yield dumps(OrderedDict([("metadata", metadata)])) + "\n"
+    else:
+        yield '{"metadata":' + dumps(metadata) + ',"data":['
+
+    for start in range(0, len(df), batch_size):
+        rows = dataframe_to_custom_json(df.iloc[start:start + batch_size])
+        if stream == "ndjson":
+            yield "".join(dumps(row) + "\n" for row in rows)
+        else:
+            yield ("," if start else "") + ",".join(dumps(row) for row in rows)
+
+    if stream == "json":
+        yield "]}"
@@ -0,0 +1,51 @@
+# pylint: disable = missing-module-docstring, missing-final-newline, trailing-whitespace, line-too-long
+import os
+import json
+import time
+import logging
+from collections import OrderedDict
+
+try:
+    import pyarrow as pa
+    from pyarrow import feather
+except ImportError:  # pragma: no cover - the sheet cache is skipped without pyarrow
+    pa = None
+    feather = None
+
+logger = logging.getLogger(__name__)
+
+# Schema metadata key holding the sheet's title/as-of header
+METADATA_KEY = b"dividend_sheet_metadata"
+
+def save_sheet(path, metadata, df):
+    """Persist a normalized sheet as uncompressed Feather (Arrow IPC) so it can be memory-mapped.
+
+    Returns False when pyarrow is unavailable or the frame cannot be represented in Arrow.
+    """
+    if feather is None:
+        return False
+    partial_path = f"{path}.{os.getpid()}.{time.time_ns()}.part"
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        schema_metadata = dict(table.schema.metadata or {})
+        schema_metadata[METADATA_KEY] = json.dumps(metadata).encode("utf-8")
+        feather.write_feather(table.replace_schema_metadata(schema_metadata), partial_path, compression="uncompressed")
+        os.replace(partial_path, path)
+        return True
+    except (pa.ArrowException, OSError, TypeError, ValueError) as e:
+        logger.warning("Could not cache normalized sheet %s: %s", path, e)
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        return False
+
+def load_sheet(path):
+    """Load a cached sheet through a memory map, return (metadata, frame) or None on a miss."""
+    if feather is None or not os.path.exists(path):
+        return None
+    try:
+        table = feather.read_table(path, memory_map=True)
+    except (pa.ArrowException, OSError) as e:
+        logger.warning("Could not read cached sheet %s: %s", path, e)
+        return None
+    metadata = json.loads(table.schema.metadata[METADATA_KEY], object_pairs_hook=OrderedDict)
+    return metadata, table.to_pandas()
\ No newline at end of file
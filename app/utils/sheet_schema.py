@@ -0,0 +1,112 @@
+# pylint: disable = missing-module-docstring, missing-final-newline, trailing-whitespace, line-too-long
+import json
+import hashlib
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Output layout of the CCC "All" sheet, applied in one pass by layout_sheet.
+# Sheet columns that are not part of the output
+DROPPED_COLUMNS = ("FV", "New Member", "Unnamed: 24")
+
+# Sheet name -> output name
+RENAMED_COLUMNS = {"Price": "Current Price"}
+
+# Columns moved to a fixed output position, the rest keep their sheet order
+PINNED_COLUMNS = (("Industry", 3), ("Fair Value", 4), ("FV %", 5), ("Chowder Number", 6))
+
+# Low-cardinality text columns, stored as categoricals
+CATEGORICAL_COLUMNS = ("Sector", "Industry", "Exchange", "Streak Basis", "Dividend Category", "DGR_Volatility_Category")
+
+# Screening flags, stored as nullable booleans
+FLAG_COLUMNS = (
+    "Meets Chowder Criteria",
+    "Greater Than 10 Year T-Bill",
+    "IRR Greater than T-Bond",
+    "PE Less Half EPS Growth Rate",
+    "Growth Plus Yield By PE Less Than 2",
+    "PCF Ratio Less Than 10",
+    "PE Less Than Industry PE",
+    "PE Less Than Sector PE",
+    "3Y DGR Greater Than 10Y DGR",
+    "1Y DGR Less Than 1Y ESP Growth Rate",
+    "Div Yield + Weighted DGR Greater Than Market Risk Rate + 10 Year T-Bill",
+    "1Y EPS Growth Greater Than Weighted DGR",
+    "Div Yield + 1Y EPS Growth Greater Than Market Risk Rate + 10 Year T-Bill",
+)
+
+# Bump when normalize_sheet changes what a cached sheet holds in a way the declarations above do not show
+SHEET_LAYOUT_VERSION = "1"
+
+# Layout version plus the column declarations, part of every cached sheet's file name so a changed layout or dtype rule is never read from an older cache
+SHEET_SCHEMA_VERSION = hashlib.sha256(json.dumps(
+    [SHEET_LAYOUT_VERSION, DROPPED_COLUMNS, RENAMED_COLUMNS, PINNED_COLUMNS, CATEGORICAL_COLUMNS, FLAG_COLUMNS]
+).encode("utf-8")).hexdigest()[:8]
+
+def layout_sheet(df):
+    """Drop, rename and reorder the sheet's columns as declared above.
+
+    The result is assembled once from the existing column arrays, without copying them.
+    """
+    expected = (*DROPPED_COLUMNS, *RENAMED_COLUMNS, *(name for name, _ in PINNED_COLUMNS))
+    for column in expected:
+        if column not in df.columns:
+            logger.warning("'%s' column not found", column)
+
+    pinned = [(name, position) for name, position in PINNED_COLUMNS if name in df.columns]
+    pinned_names = {name for name, _ in pinned}
+    order = [column for column in df.columns if column not in DROPPED_COLUMNS and column not in pinned_names]
+    for name, position in pinned:
+        order.insert(position, name)
+    return pd.DataFrame({RENAMED_COLUMNS.get(column, column): df[column] for column in order}, copy=False)
+
+def compact_column(col):
+    """The smallest dtype that holds a column without changing any of its values (or the column itself)."""
+    if isinstance(col.dtype, pd.api.extensions.ExtensionDtype):
+        return col
+    kind = col.dtype.kind
+    if kind in "iu":
+        return pd.to_numeric(col, downcast="integer" if kind == "i" else "unsigned")
+    if col.dtype == np.float64:
+        narrow = col.to_numpy().astype(np.float32)
+        # Only when every value survives the round trip, so the JSON output is unchanged
+        if np.array_equal(narrow.astype(np.float64), col.to_numpy(), equal_nan=True):
+            return pd.Series(narrow, index=col.index, name=col.name)
+    return col
+
+def compact_dtypes(df):
+    """Categoricals for CATEGORICAL_COLUMNS, nullable booleans for FLAG_COLUMNS, narrower numbers where lossless.
+
+    Columns are replaced one at a time, in place.
+    """
+    for column in df.columns:
+        col = df[column]
+        if column in CATEGORICAL_COLUMNS:
+            if not isinstance(col.dtype, pd.CategoricalDtype):
+                df[column] = col.astype("category")
+        elif column in FLAG_COLUMNS:
+            if col.dtype == bool or (col.dtype == object and pd.api.types.infer_dtype(col, skipna=True) == "boolean"):
+                df[column] = col.astype("boolean")
+        else:
+            compact = compact_column(col)
+            if compact is not col:
+                df[column] = compact
+    return df
+
+def wide_values(col):
+    """Column values as a NumPy array in the dtypes arithmetic expects: int64, float64, bool or object."""
+    dtype = col.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        return np.asarray(col, dtype=object)
+    if dtype == "boolean":
+        return col.to_numpy(dtype=object, na_value=np.nan) if col.hasnans else col.to_numpy(dtype=bool)
+    values = col.to_numpy()
+    if values.dtype.kind == "i" and values.dtype != np.int64:
+        return values.astype(np.int64)
+    if values.dtype.kind == "u":
+        return values.astype(np.int64)
+    if values.dtype == np.float32:
+        return values.astype(np.float64)
+    return values
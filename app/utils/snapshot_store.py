@@ -0,0 +1,152 @@
+# pylint: disable = missing-module-docstring, missing-final-newline, trailing-whitespace, line-too-long
+import os
+import re
+import time
+import logging
+import numpy as np
+import pandas as pd
+from .sheet_schema import FLAG_COLUMNS
+
+try:
+    from pyarrow import feather
+except ImportError:  # pragma: no cover - snapshots are not kept without pyarrow
+    feather = None
+
+logger = logging.getLogger(__name__)
+
+# Categorical columns tracked alongside the flags
+CATEGORY_COLUMNS = ("Dividend Category", "DGR_Volatility_Category")
+
+# Values carried into a snapshot for context, they do not count as changes
+CONTEXT_COLUMNS = ("Company", "Current Price", "Div Yield")
+
+HASH_COLUMN = "_row_hash"
+
+# Snapshots are named by the sheet's as-of date
+AS_OF_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+def row_hashes(df, columns):
+    # One uint64 per row over the tracked columns, equal hashes mean nothing to compare
+    return pd.util.hash_pandas_object(df[list(columns)], index=False).to_numpy()
+
+class SnapshotStore:
+    """Dated snapshots of screened sheets in <root>/snapshots/<as_of_date>.feather.
+
+    A snapshot keeps only the symbol, the tracked screening columns, a little context and
+    a per-row hash of the tracked columns, compressed Feather sorted by symbol.
+    """
+
+    def __init__(self, root):
+        self.root = os.path.join(root, "snapshots")
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, as_of_date):
+        if not AS_OF_PATTERN.match(as_of_date or ""):
+            raise ValueError(f"Invalid as-of date '{as_of_date}', expected YYYY-MM-DD.")
+        return os.path.join(self.root, f"{as_of_date}.feather")
+
+    def dates(self):
+        names = (os.path.splitext(name) for name in os.listdir(self.root))
+        return sorted(stem for stem, extension in names if extension == ".feather" and AS_OF_PATTERN.match(stem))
+
+    def previous_date(self, as_of_date):
+        earlier = [date for date in self.dates() if date < as_of_date]
+        return earlier[-1] if earlier else None
+
+    def save(self, as_of_date, df):
+        """Snapshot a screened frame, replacing an earlier screen of the same as-of date."""
+        if feather is None:
+            return False
+        path = self.path(as_of_date)
+        tracked = [column for column in FLAG_COLUMNS + CATEGORY_COLUMNS if column in df.columns]
+        context = [column for column in CONTEXT_COLUMNS if column in df.columns]
+        snapshot = df[["Symbol", *context, *tracked]].dropna(subset=["Symbol"]).drop_duplicates("Symbol")
+        snapshot = snapshot.sort_values("Symbol", kind="stable").reset_index(drop=True)
+        # Categories depend on the sheet, two snapshots' categoricals would not be comparable
+        for column in CATEGORY_COLUMNS:
+            if column in snapshot.columns:
+                snapshot[column] = snapshot[column].astype(object)
+        snapshot[HASH_COLUMN] = row_hashes(snapshot, tracked)
+
+        partial_path = f"{path}.{os.getpid()}.{time.time_ns()}.part"
+        try:
+            feather.write_feather(snapshot, partial_path, compression="zstd")
+            os.replace(partial_path, path)
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning("Could not save snapshot %s: %s", as_of_date, e)
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            return False
+        return True
+
+    def load(self, as_of_date):
+        path = self.path(as_of_date)
+        if feather is None or not os.path.exists(path):
+            raise FileNotFoundError(f"No snapshot for {as_of_date}.")
+        return feather.read_feather(path)
+
+    def diff(self, as_of_date, previous=None):
+        """Per-symbol changes between a snapshot and an earlier one (the one just before it by default)."""
+        previous = previous or self.previous_date(as_of_date)
+        current = self.load(as_of_date)
+        if previous is None:
+            return {"as_of_date": as_of_date, "previous": None, "summary": summarize([]), "changes": []}
+        return {"as_of_date": as_of_date, "previous": previous, **diff_snapshots(self.load(previous), current)}
+
+def diff_snapshots(old, new):
+    """Compare two snapshots by row hash, only rows whose hash changed are compared column by column."""
+    merged = old[["Symbol", HASH_COLUMN]].merge(new[["Symbol", HASH_COLUMN]], on="Symbol", how="outer", suffixes=("_old", "_new"), indicator=True)
+    added = merged.loc[merged["_merge"] == "right_only", "Symbol"].tolist()
+    removed = merged.loc[merged["_merge"] == "left_only", "Symbol"].tolist()
+    both = merged["_merge"] == "both"
+    changed_symbols = merged.loc[both & (merged[f"{HASH_COLUMN}_old"] != merged[f"{HASH_COLUMN}_new"]), "Symbol"]
+
+    tracked = [column for column in FLAG_COLUMNS + CATEGORY_COLUMNS if column in old.columns and column in new.columns]
+    # Compared as plain values, snapshots saved with categorical columns carry their own categories
+    before = old.set_index("Symbol").loc[changed_symbols, tracked].astype(object)
+    after = new.set_index("Symbol").loc[changed_symbols, tracked].astype(object)
+    # Missing categories compare equal to each other
+    differs = (before != after) & ~(before.isna() & after.isna())
+
+    changes = []
+    for symbol, row in zip(changed_symbols, differs.to_numpy()):
+        columns = [tracked[i] for i in np.flatnonzero(row)]
+        if not columns:
+            continue
+        flipped = {column: {"from": _plain(before.at[symbol, column]), "to": _plain(after.at[symbol, column])} for column in columns}
+        gained = [column for column in columns if column in FLAG_COLUMNS and flipped[column]["to"] is True]
+        lost = [column for column in columns if column in FLAG_COLUMNS and flipped[column]["to"] is False]
+        changes.append({
+            "Symbol": symbol,
+            "status": "changed",
+            "flipped": flipped,
+            "flags_gained": gained,
+            "flags_lost": lost,
+            "direction": "up" if len(gained) > len(lost) else "down" if len(lost) > len(gained) else "mixed",
+        })
+    changes += [{"Symbol": symbol, "status": "added"} for symbol in added]
+    changes += [{"Symbol": symbol, "status": "removed"} for symbol in removed]
+    return {"summary": summarize(changes), "changes": changes}
+
+def summarize(changes):
+    summary = {"changed": 0, "added": 0, "removed": 0, "up": 0, "down": 0}
+    for change in changes:
+        summary[change["status"]] += 1
+        if change.get("direction") in ("up", "down"):
+            summary[change["direction"]] += 1
+    return summary
+
+def _plain(value):
+    # numpy scalars and missing values as JSON-friendly Python values
+    if pd.isna(value):
+        return None
+    return value.item() if hasattr(value, "item") else value
+
+# One store per upload folder
+_stores = {}
+
+def get_snapshot_store(upload_folder):
+    store = _stores.get(upload_folder)
+    if store is None:
+        store = _stores[upload_folder] = SnapshotStore(upload_folder)
+    return store
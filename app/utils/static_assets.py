@@ -0,0 +1,122 @@
+# pylint: disable = missing-module-docstring, missing-final-newline, trailing-whitespace, line-too-long
+import os
+import hashlib
+import logging
+import mimetypes
+from dataclasses import dataclass, field
+from typing import Dict, Tuple
+from flask import request, send_file, Response
+
+logger = logging.getLogger(__name__)
+
+# Precompressed siblings by Content-Encoding, in order of preference, written by scripts/precompress_static.py
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+# Next.js puts content-hashed build output under _next/static, those names never change content
+IMMUTABLE_PREFIX = "_next/static/"
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# HTML and other unhashed files are revalidated with their ETag
+HTML_CACHE_CONTROL = "no-cache"
+DEFAULT_CACHE_CONTROL = "public, max-age=3600"
+
+@dataclass(frozen=True)
+class Asset:
+    path: str
+    mimetype: str
+    etag: str
+    cache_control: str
+    # Content-Encoding -> (path of the precompressed file, its ETag)
+    variants: Dict[str, Tuple[str, str]] = field(default_factory=dict)
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:32]
+
+def cache_control_for(relative_path, mimetype):
+    if relative_path.startswith(IMMUTABLE_PREFIX):
+        return IMMUTABLE_CACHE_CONTROL
+    if mimetype == "text/html":
+        return HTML_CACHE_CONTROL
+    return DEFAULT_CACHE_CONTROL
+
+def url_aliases(relative_path):
+    # "about/index.html" answers "about" and "about/" (trailingSlash export), "about.html" answers "about"
+    if relative_path == "index.html":
+        return [""]
+    if relative_path.endswith("/index.html"):
+        directory = relative_path[: -len("/index.html")]
+        return [directory, directory + "/"]
+    if relative_path.endswith(".html"):
+        return [relative_path[: -len(".html")]]
+    return []
+
+class StaticManifest:
+    """In-memory index of the exported frontend, built once when the app starts.
+
+    Each URL path maps straight to a file with its content type, ETag, Cache-Control and
+    any precompressed .br/.gz siblings, so serving an asset does no filesystem lookups and
+    unchanged assets are answered with 304.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.assets = {}
+        if root and os.path.isdir(root):
+            self._index()
+        else:
+            logger.warning("Static folder %s does not exist, the frontend is not served", root)
+
+    def _index(self):
+        aliases = {}
+        for directory, _, files in os.walk(self.root):
+            names = set(files)
+            for name in files:
+                if name.endswith(tuple(suffix for _, suffix in ENCODINGS)) and name[: name.rindex(".")] in names:
+                    continue
+                path = os.path.join(directory, name)
+                relative_path = os.path.relpath(path, self.root).replace(os.sep, "/")
+                mimetype = mimetypes.guess_type(name)[0] or "application/octet-stream"
+                etag = file_digest(path)
+                variants = {
+                    encoding: (path + suffix, f"{etag}-{suffix[1:]}")
+                    for encoding, suffix in ENCODINGS
+                    if name + suffix in names
+                }
+                self.assets[relative_path] = Asset(path, mimetype, etag, cache_control_for(relative_path, mimetype), variants)
+                for alias in url_aliases(relative_path):
+                    aliases[alias] = self.assets[relative_path]
+        # Real files win over the .html aliases
+        for alias, asset in aliases.items():
+            self.assets.setdefault(alias, asset)
+        logger.info("Indexed %d static paths under %s", len(self.assets), self.root)
+
+    def find(self, url_path):
+        return self.assets.get(url_path)
+
+    def send(self, asset, status=200):
+        """Response for an asset: 304 when the client's copy is current, else the best encoding it accepts."""
+        path, etag, encoding = asset.path, asset.etag, None
+        for candidate, (variant_path, variant_etag) in asset.variants.items():
+            if request.accept_encodings[candidate]:
+                path, etag, encoding = variant_path, variant_etag, candidate
+                break
+
+        headers = {"Cache-Control": asset.cache_control}
+        if asset.variants:
+            headers["Vary"] = "Accept-Encoding"
+        if status == 200 and request.if_none_match.contains(etag):
+            response = Response(status=304, headers=headers)
+            response.set_etag(etag)
+            return response
+
+        response = send_file(path, mimetype=asset.mimetype, etag=etag, conditional=status == 200)
+        if status != 200:
+            response.status_code = status
+        response.headers.update(headers)
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        return response
@@ -0,0 +1,178 @@
+# pylint: disable = missing-module-docstring, missing-final-newline, trailing-whitespace, line-too-long
+import logging
+from dataclasses import dataclass, asdict
+import numpy as np
+import pandas as pd
+from .sheet_schema import wide_values
+
+logger = logging.getLogger(__name__)
+
+# Years of the first DCF stage, growing at the symbol's own rate
+HIGH_GROWTH_YEARS = 5
+
+# Years over which growth fades linearly to the terminal rate
+FADE_YEARS = 5
+
+# Perpetual growth after the fade, as a fraction
+TERMINAL_GROWTH = 0.025
+
+# Growth inputs are clipped to +/- this fraction, a 60% DGR is not a 60% perpetuity
+MAX_GROWTH = 0.15
+
+# Shifts applied to growth and discount rate in the sensitivity grids, as fractions
+GRID_STEPS = (-0.02, -0.01, 0.0, 0.01, 0.02)
+MAX_GRID_STEPS = 21
+
+# Sheet columns the models read, growth columns are in percent
+DIVIDEND_COLUMN = "Annualized Dividend"
+DIVIDEND_GROWTH_COLUMN = "DGR 5Y"
+CASH_FLOW_COLUMN = "CF/Share"
+CASH_FLOW_GROWTH_COLUMN = "5-Year EPS CAGR"
+PRICE_COLUMN = "Current Price"
+
+# Free cash flow per share from the local fundamentals store, preferred over the sheet's CF/Share
+FUNDAMENTALS_CASH_FLOW = ("key_metrics_ttm", "freeCashFlowPerShareTTM")
+
+@dataclass(frozen=True)
+class ValuationParams:
+    high_growth_years: int = HIGH_GROWTH_YEARS
+    fade_years: int = FADE_YEARS
+    terminal_growth: float = TERMINAL_GROWTH
+    max_growth: float = MAX_GROWTH
+    # Multiplier on the market risk premium (a beta of 1 by default)
+    beta: float = 1.0
+
+    def __post_init__(self):
+        if not 0 <= self.high_growth_years <= 50 or not 0 <= self.fade_years <= 50:
+            raise ValueError("Stage lengths must be between 0 and 50 years.")
+        if not -0.5 < self.terminal_growth < 0.5 or not 0 <= self.max_growth < 1:
+            raise ValueError("Growth rates are fractions, e.g. terminal_growth=0.025.")
+
+def discount_rate(reference, beta=1.0):
+    """Cost of equity: the 30-year T-bond rate (percent) plus beta times the market risk premium (fraction)."""
+    return reference.tbond_rate / 100 + beta * reference.market_risk_premium
+
+def gordon_growth(dividend, growth, discount):
+    """Gordon-growth value D0 * (1 + g) / (r - g) for any broadcastable arrays, NaN where r <= g."""
+    dividend, growth, discount = np.broadcast_arrays(*(np.asarray(value, dtype=float) for value in (dividend, growth, discount)))
+    with np.errstate(all="ignore"):
+        value = dividend * (1 + growth) / (discount - growth)
+    return np.where(discount > growth, value, np.nan)
+
+def multi_stage_dcf(cash_flow, growth, discount, terminal_growth=TERMINAL_GROWTH, high_growth_years=HIGH_GROWTH_YEARS, fade_years=FADE_YEARS):
+    """Present value of a cash flow growing at g for high_growth_years, fading linearly to
+    terminal_growth over fade_years, then growing at terminal_growth forever.
+
+    Inputs broadcast against each other (a symbol axis against grid axes, say); the loop runs
+    over years only, so memory stays at a few arrays of the broadcast shape. NaN where r <= terminal growth.
+    """
+    cash_flow, growth, discount = np.broadcast_arrays(*(np.asarray(value, dtype=float) for value in (cash_flow, growth, discount)))
+    flow = cash_flow.copy()
+    factor = np.ones_like(flow)
+    present_value = np.zeros_like(flow)
+    step = 1 / (1 + discount)
+    for year in range(1, high_growth_years + fade_years + 1):
+        if year <= high_growth_years:
+            flow *= 1 + growth
+        else:
+            weight = (year - high_growth_years) / (fade_years + 1)
+            flow *= 1 + growth + (terminal_growth - growth) * weight
+        factor *= step
+        present_value += flow * factor
+    with np.errstate(all="ignore"):
+        terminal_value = flow * (1 + terminal_growth) / (discount - terminal_growth) * factor
+    return np.where(discount > terminal_growth, present_value + terminal_value, np.nan)
+
+def sensitivity_grid(model, value, growth, discount, growth_steps=GRID_STEPS, discount_steps=GRID_STEPS, **kwargs):
+    """model evaluated for every symbol at every (growth + step, discount + step) pair in one broadcast.
+
+    value and growth are per-symbol arrays, discount a scalar or per-symbol array; the result has
+    shape (symbols, len(growth_steps), len(discount_steps)).
+    """
+    growth_steps = np.asarray(growth_steps, dtype=float)
+    discount_steps = np.asarray(discount_steps, dtype=float)
+    value = np.asarray(value, dtype=float)[:, None, None]
+    growth = np.asarray(growth, dtype=float).reshape(-1, 1, 1) + growth_steps[None, :, None]
+    discount = np.asarray(discount, dtype=float).reshape(-1, 1, 1) + discount_steps[None, None, :]
+    return model(value, growth, discount, **kwargs)
+
+def parse_steps(value):
+    """Grid steps from "-0.02,0,0.02", the default steps when empty."""
+    if not value:
+        return GRID_STEPS
+    try:
+        steps = tuple(float(step) for step in value.split(",") if step.strip())
+    except ValueError as e:
+        raise ValueError(f"Invalid grid steps '{value}', expected comma-separated fractions.") from e
+    if not steps or len(steps) > MAX_GRID_STEPS:
+        raise ValueError(f"Expected between 1 and {MAX_GRID_STEPS} grid steps.")
+    return steps
+
+def column_values(df, column):
+    # Float values of a column, NaN when the sheet does not have it
+    if column not in df.columns:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(pd.Series(wide_values(df[column])), errors="coerce").to_numpy(dtype=float)
+
+def cash_flow_per_share(df, store=None):
+    """Free cash flow per share from the fundamentals store where it has a value, the sheet's CF/Share elsewhere."""
+    values = column_values(df, CASH_FLOW_COLUMN)
+    if store is None:
+        return values
+    table, column = FUNDAMENTALS_CASH_FLOW
+    try:
+        stored = store.read(table, df["Symbol"].dropna().astype(str).tolist(), columns=[column])
+    except (IOError, ValueError) as e:
+        logger.warning("Using the sheet's %s for the DCF: %s", CASH_FLOW_COLUMN, e)
+        return values
+    if stored.empty:
+        return values
+    lookup = pd.to_numeric(stored.drop_duplicates("symbol").set_index("symbol")[column], errors="coerce")
+    fundamentals = lookup.reindex(df["Symbol"].astype(object)).to_numpy(dtype=float)
+    return np.where(np.isnan(fundamentals), values, fundamentals)
+
+def value_frame(df, reference, params=None, store=None, growth_steps=None, discount_steps=None):
+    """DDM and DCF fair values (and upside to the current price) for every row of a screened frame.
+
+    Returns (frame, summary). With growth_steps and discount_steps the frame also holds
+    "DDM Grid" and "DCF Grid", one growth x discount matrix per symbol.
+    """
+    params = params or ValuationParams()
+    discount = discount_rate(reference, params.beta)
+    price = column_values(df, PRICE_COLUMN)
+    dividend = column_values(df, DIVIDEND_COLUMN)
+    dividend_growth = np.clip(column_values(df, DIVIDEND_GROWTH_COLUMN) / 100, -params.max_growth, params.max_growth)
+    cash_flow = cash_flow_per_share(df, store)
+    # Without a usable EPS CAGR the DCF grows at the dividend growth rate
+    cash_flow_growth = column_values(df, CASH_FLOW_GROWTH_COLUMN) / 100
+    cash_flow_growth = np.clip(np.where(np.isfinite(cash_flow_growth), cash_flow_growth, dividend_growth), -params.max_growth, params.max_growth)
+    stages = {"terminal_growth": params.terminal_growth, "high_growth_years": params.high_growth_years, "fade_years": params.fade_years}
+
+    # Companies without a dividend or with negative cash flow have no model value
+    dividend = np.where(dividend > 0, dividend, np.nan)
+    cash_flow = np.where(cash_flow > 0, cash_flow, np.nan)
+    ddm = gordon_growth(dividend, dividend_growth, discount)
+    dcf = multi_stage_dcf(cash_flow, cash_flow_growth, discount, **stages)
+    with np.errstate(all="ignore"):
+        frame = pd.DataFrame({
+            "Symbol": df["Symbol"].to_numpy(dtype=object),
+            PRICE_COLUMN: price,
+            "DDM Fair Value": ddm,
+            "DDM Upside %": (ddm / price - 1) * 100,
+            "DCF Fair Value": dcf,
+            "DCF Upside %": (dcf / price - 1) * 100,
+        })
+
+    if growth_steps is not None or discount_steps is not None:
+        steps = {"growth_steps": growth_steps or GRID_STEPS, "discount_steps": discount_steps or GRID_STEPS}
+        frame["DDM Grid"] = grid_column(sensitivity_grid(gordon_growth, dividend, dividend_growth, discount, **steps))
+        frame["DCF Grid"] = grid_column(sensitivity_grid(multi_stage_dcf, cash_flow, cash_flow_growth, discount, **steps, **stages))
+
+    summary = {**asdict(params), "discount_rate": discount}
+    if growth_steps is not None or discount_steps is not None:
+        summary.update(growth_steps=list(growth_steps or GRID_STEPS), discount_steps=list(discount_steps or GRID_STEPS))
+    return frame, summary
+
+def grid_column(grid):
+    # One nested list per symbol, missing values as None so they serialize as null
+    return pd.Series(np.where(np.isfinite(grid), grid, None).tolist(), dtype=object).to_numpy()
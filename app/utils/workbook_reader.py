@@ -0,0 +1,125 @@
+# pylint: disable = missing-module-docstring, missing-final-newline, trailing-whitespace, line-too-long
+import os
+import csv
+import logging
+import importlib.util
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+except ImportError:  # pragma: no cover - CSV uploads are read with pandas without pyarrow
+    pa = None
+    pa_csv = None
+
+logger = logging.getLogger(__name__)
+
+# "auto" uses calamine when python-calamine is installed, otherwise pandas' default (openpyxl / xlrd)
+EXCEL_ENGINE = os.getenv("EXCEL_ENGINE", "auto")
+
+# Text columns of the CCC "All" sheet, read as strings instead of being type-sniffed
+ALL_SHEET_DTYPES = {
+    "Symbol": str,
+    "Company": str,
+    "Sector": str,
+    "Industry": str,
+    "Streak Basis": str,
+    "New Member": str,
+}
+
+# Date and count columns of the "All" sheet
+ALL_SHEET_DATE_COLUMNS = ("Ex-Date", "Pay-Date")
+ALL_SHEET_INTEGER_COLUMNS = ("No Years", "Payouts/ Year")
+
+# Numeric columns of the "All" sheet, read as float64 like the Excel reader does
+ALL_SHEET_FLOAT_COLUMNS = (
+    "FV", "Price", "Div Yield", "5Y Avg Yield", "Current Div", "Annualized", "Previous Div", "Low", "High",
+    "DGR 1Y", "DGR 3Y", "DGR 5Y", "DGR 10Y", "TTR 1Y", "TTR 3Y", "Fair Value", "FV %", "Chowder Number",
+    "EPS 1Y", "Revenue 1Y", "NPM", "CF/Share", "ROE", "Current R", "Debt/Capital", "ROTC", "P/E", "P/BV", "PEG",
+)
+
+# Date formats accepted in CSV exports, besides ISO 8601
+CSV_DATE_FORMATS = ("%m/%d/%Y", "%m/%d/%Y %H:%M:%S")
+
+def resolve_engine(engine=None):
+    """Map the configured engine name to what pandas expects (None means pandas' default)."""
+    engine = engine or EXCEL_ENGINE
+    calamine_available = importlib.util.find_spec("python_calamine") is not None
+    if engine == "auto":
+        return "calamine" if calamine_available else None
+    if engine == "calamine" and not calamine_available:
+        logger.warning("EXCEL_ENGINE=calamine but python-calamine is not installed, using the default engine")
+        return None
+    return engine
+
+def read_workbook_sheet(file_path, sheet_name="All", engine=None, dtype=None):
+    """Open the workbook once and return (title, as-of cell, data frame) for one sheet.
+
+    The first two rows of the sheet hold the title and the as-of date, the third row
+    holds the column headers.
+    """
+    dtype = ALL_SHEET_DTYPES if dtype is None else dtype
+    with pd.ExcelFile(file_path, engine=resolve_engine(engine)) as xls:
+        if sheet_name not in xls.sheet_names:
+            raise ValueError(f"The Excel file does not contain a sheet named '{sheet_name}'.")
+
+        # Read metadata from first two rows
+        metadata = xls.parse(sheet_name, nrows=2, header=None)
+
+        # Read the main data, skipping the first two rows
+        df = xls.parse(sheet_name, header=2, dtype=dtype)
+
+    return metadata.iloc[0, 0], metadata.iloc[1, 0], df
+
+def csv_column_types(names):
+    """Arrow types of the known "All" sheet columns among names; other columns are inferred."""
+    types = {}
+    for name in names:
+        if name in ALL_SHEET_DTYPES:
+            types[name] = pa.string()
+        elif name in ALL_SHEET_DATE_COLUMNS:
+            types[name] = pa.timestamp("ns")
+        elif name in ALL_SHEET_INTEGER_COLUMNS:
+            types[name] = pa.int64()
+        elif name in ALL_SHEET_FLOAT_COLUMNS or name.startswith("Unnamed: "):
+            types[name] = pa.float64()
+    return types
+
+def read_csv_sheet(file_path):
+    """Read a CSV export laid out like the "All" sheet and return (title, as-of cell, data frame).
+
+    The title, as-of and header rows are read line by line, then the data is parsed from the
+    same file handle by pyarrow's multithreaded CSV reader with explicit column types.
+    """
+    with open(file_path, "rb") as f:
+        head = [f.readline().decode("utf-8-sig" if i == 0 else "utf-8") for i in range(3)]
+        title_row, as_of_row, header = (row or [""] for row in csv.reader(head))
+        # Blank headers are named like pandas names them ("Unnamed: 24")
+        names = [name.strip() or f"Unnamed: {i}" for i, name in enumerate(header)]
+        if not any(name.strip() for name in header):
+            raise ValueError("The CSV file has no header row below the title and as-of rows.")
+
+        if pa_csv is None:
+            df = pd.read_csv(
+                f, header=None, names=names, dtype={name: str for name in ALL_SHEET_DTYPES if name in names},
+                parse_dates=[name for name in ALL_SHEET_DATE_COLUMNS if name in names],
+            )
+        else:
+            try:
+                table = pa_csv.read_csv(
+                    f,
+                    read_options=pa_csv.ReadOptions(column_names=names, use_threads=True),
+                    convert_options=pa_csv.ConvertOptions(
+                        column_types=csv_column_types(names),
+                        strings_can_be_null=True,
+                        timestamp_parsers=[pa_csv.ISO8601, *CSV_DATE_FORMATS],
+                    ),
+                )
+            except pa.ArrowInvalid as e:
+                raise ValueError(f"Could not parse the CSV file: {e}") from e
+            df = table.to_pandas()
+
+    # The as-of cell is text in a CSV, dates are returned as timestamps like the Excel reader does
+    as_of = as_of_row[0].strip()
+    parsed = pd.to_datetime(as_of, errors="coerce")
+    return title_row[0].strip(), as_of if pd.isna(parsed) else parsed, df
\ No newline at end of file
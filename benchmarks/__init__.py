@@ -0,0 +1 @@
+# pylint: disable=missing-module-docstring, missing-final-newline
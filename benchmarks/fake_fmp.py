@@ -0,0 +1,55 @@
+# pylint: disable = missing-module-docstring, missing-final-newline, trailing-whitespace, line-too-long
+import re
+import zlib
+from app.utils import fmp_api_calls
+from app.utils.mappings import industry_mapping, sector_mapping
+
+EXCHANGES = ("NYSE", "NASDAQ")
+
+class FakeFMP:
+    """Answers the FMP endpoints the pipeline calls with deterministic local data, no network involved."""
+
+    def __init__(self, unknown_every=50):
+        # Every n-th symbol is unknown to the fake, like delisted tickers in a real sheet
+        self.unknown_every = unknown_every
+        self.requests = 0
+
+    def quotes(self, symbols):
+        quotes = []
+        for symbol in symbols:
+            digest = zlib.crc32(symbol.encode("utf-8"))
+            if self.unknown_every and digest % self.unknown_every == 0:
+                continue
+            quotes.append({"symbol": symbol, "exchange": EXCHANGES[digest % 2], "eps": round((digest % 1500) / 100 - 2, 2)})
+        return quotes
+
+    @staticmethod
+    def pe_table(kind, exchange):
+        names = sorted(set(industry_mapping.values() if kind == "industry" else sector_mapping.values()))
+        return [{"date": "2024-10-04", kind: name, "exchange": exchange, "pe": str(10 + (zlib.crc32(name.encode("utf-8")) % 300) / 10)} for name in names]
+
+    def get_json(self, url):
+        self.requests += 1
+        path = url.split("?", 1)[0]
+        if "/quote/" in path:
+            return self.quotes(path.rsplit("/", 1)[1].split(","))
+        if path.endswith("/treasury"):
+            return [{"date": "2024-10-04", "year10": 4.12, "year30": 4.41}]
+        match = re.search(r"/(industry|sector)_price_earning_ratio$", path)
+        if match:
+            return self.pe_table(match.group(1), re.search(r"exchange=(\w+)", url).group(1))
+        if path.endswith("/market_risk_premium"):
+            return [{"country": "United States", "totalEquityRiskPremium": 4.6}]
+        raise ValueError(f"FakeFMP has no answer for {path}")
+
+def install(fake=None, cache_path=None):
+    """Route every FMP call of the app through a FakeFMP and start from empty caches."""
+    from app.utils.market_data import market_data  # pylint: disable=import-outside-toplevel
+    fake = fake or FakeFMP()
+    fmp_api_calls.fmp_client.get_json = fake.get_json
+    fmp_api_calls.quote_cache.clear()
+    fmp_api_calls.quote_cache.sqlite_path = None
+    if cache_path is not None:
+        market_data.cache_path = cache_path
+    market_data.invalidate()
+    return fake
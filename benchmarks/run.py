@@ -0,0 +1,203 @@
+# pylint: disable = missing-module-docstring, missing-final-newline, trailing-whitespace, line-too-long
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import statistics
+from collections import OrderedDict
+import numpy as np
+from app.utils import clean_file_data
+from app.utils.market_data import market_data
+from app.utils.serialization import dataframe_to_custom_json, DateTimeEncoder
+from .workbooks import workbook_path
+from .fake_fmp import install
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+
+DEFAULT_SIZES = (500, 5000, 50000)
+
+STAGES = ("workbook_read", "csv_read", "eps_merge", "derived_columns", "to_custom_json", "json_dumps", "upload_total")
+
+# Baseline key of the machine the baselines were recorded on, and per-size key of its calibration time
+MACHINE_KEY = "machine"
+CALIBRATION_KEY = "calibration_seconds"
+
+class UploadFile:
+    """The slice of werkzeug's FileStorage the upload path uses."""
+
+    def __init__(self, path):
+        self.filename = os.path.basename(path)
+        self.path = path
+        self.stream = None
+
+    def __enter__(self):
+        self.stream = open(self.path, "rb")  # pylint: disable=consider-using-with
+        return self
+
+    def __exit__(self, *_):
+        self.stream.close()
+
+def time_stages(path, csv_path=None):
+    """One pass through the pipeline, returning seconds per stage."""
+    timings = OrderedDict()
+    started = time.perf_counter()
+    metadata, df = clean_file_data.normalize_sheet(path)
+    timings["workbook_read"] = time.perf_counter() - started
+
+    # The same sheet exported as CSV, only its read time is recorded
+    if csv_path:
+        started = time.perf_counter()
+        clean_file_data.normalize_sheet(csv_path)
+        timings["csv_read"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    df = clean_file_data.merge_quotes(df)
+    timings["eps_merge"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    df = clean_file_data.add_derived_columns(df, market_data.get())
+    timings["derived_columns"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    data = dataframe_to_custom_json(df)
+    timings["to_custom_json"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    json.dumps(OrderedDict([("metadata", metadata), ("data", data)]), separators=(",", ":"), cls=DateTimeEncoder)
+    timings["json_dumps"] = time.perf_counter() - started
+    return timings
+
+def time_upload(path, root):
+    """End to end clean_and_save_file into a new upload folder, so nothing is served from the result store."""
+    upload_folder = tempfile.mkdtemp(dir=root)
+    with UploadFile(path) as file:
+        started = time.perf_counter()
+        clean_file_data.clean_and_save_file(file, upload_folder)
+        return time.perf_counter() - started
+
+def peak_memory(path, root):
+    """Peak traced Python allocations (MB) of one end-to-end upload."""
+    tracemalloc.start()
+    try:
+        time_upload(path, root)
+        return tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    finally:
+        tracemalloc.stop()
+
+def calibrate(repeat=5):
+    """Median seconds of a fixed NumPy, JSON and pure-Python workload, the yardstick stage times are scaled by."""
+    values = np.random.default_rng(0).standard_normal(1_000_000)
+    records = [{"symbol": f"S{index}", "value": index / 7} for index in range(50_000)]
+
+    def once():
+        started = time.perf_counter()
+        np.sort(values)
+        json.dumps(records)
+        sum(index * index for index in range(300_000))
+        return time.perf_counter() - started
+
+    return statistics.median(once() for _ in range(repeat))
+
+def machine():
+    """What the baselines were recorded on, kept next to them for whoever compares against them."""
+    return OrderedDict([
+        ("platform", platform.platform()),
+        ("processor", platform.processor() or platform.machine()),
+        ("cpus", os.cpu_count()),
+        ("python", platform.python_version()),
+    ])
+
+def run(sizes, repeat):
+    fake = install(cache_path=os.path.join(tempfile.gettempdir(), "dividend_benchmark_market_data.json"))
+    root = tempfile.mkdtemp(prefix="dividend_benchmark_")
+    results = OrderedDict()
+    try:
+        for rows in sizes:
+            path = workbook_path(rows)
+            csv_path = workbook_path(rows, extension=".csv")
+            runs = []
+            for _ in range(repeat):
+                # Cold quote cache each time, the fake stands in for FMP's latency-free best case
+                install(fake)
+                timings = time_stages(path, csv_path)
+                install(fake)
+                timings["upload_total"] = time_upload(path, root)
+                # Timed alongside every run, so load on the machine moves it as much as the stages
+                timings[CALIBRATION_KEY] = calibrate()
+                runs.append(timings)
+            install(fake)
+            results[str(rows)] = OrderedDict(
+                [(stage, round(statistics.median(run[stage] for run in runs), 4)) for stage in STAGES]
+                + [("peak_memory_mb", round(peak_memory(path, root), 1))]
+                + [(CALIBRATION_KEY, round(statistics.median(run[CALIBRATION_KEY] for run in runs), 4))]
+            )
+            print(f"{rows:>6} rows  " + "  ".join(f"{name}={value}" for name, value in results[str(rows)].items()), flush=True)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    return results
+
+def compare(results, baselines, tolerance, min_seconds=0.05):
+    """Regressions of more than tolerance over the baseline; stages faster than min_seconds are too noisy to gate on.
+
+    Baseline times are scaled by the ratio of this machine's calibration time to the one
+    recorded with the baseline, so a slower or busier machine does not read as a regression.
+    """
+    regressions = []
+    for rows, measured in results.items():
+        baseline = baselines.get(rows)
+        if baseline is None:
+            continue
+        scale = 1.0
+        if baseline.get(CALIBRATION_KEY) and measured.get(CALIBRATION_KEY):
+            scale = measured[CALIBRATION_KEY] / baseline[CALIBRATION_KEY]
+        for metric, value in measured.items():
+            reference = baseline.get(metric)
+            if reference is None or metric == CALIBRATION_KEY:
+                continue
+            if metric == "peak_memory_mb":
+                limit, note = reference, ""
+            else:
+                limit, note = max(reference * scale, min_seconds), f" (x{scale:.2f} for this machine)"
+            if value > limit * (1 + tolerance):
+                regressions.append(f"{rows} rows {metric}: {value} vs baseline {reference}{note}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the upload-to-JSON pipeline on synthetic CCC workbooks.")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="comma-separated row counts")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per size, the median is reported")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown / memory growth before failing")
+    parser.add_argument("--update-baseline", action="store_true", help="write the results as the new baseline")
+    args = parser.parse_args(argv)
+
+    results = run([int(size) for size in args.sizes.split(",") if size], args.repeat)
+
+    if args.update_baseline:
+        baselines = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as f:
+                baselines = json.load(f)
+        baselines.update(results)
+        baselines[MACHINE_KEY] = machine()
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare against, run with --update-baseline first")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        regressions = compare(results, json.load(f), args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
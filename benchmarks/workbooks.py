@@ -0,0 +1,78 @@
+# pylint: disable = missing-module-docstring, missing-final-newline, trailing-whitespace, line-too-long
+import os
+import csv
+import tempfile
+from datetime import datetime
+import numpy as np
+from openpyxl import Workbook
+from app.utils.mappings import industry_mapping, sector_mapping
+
+# Column layout of the CCC "All" sheet as normalize_sheet expects it (the unnamed column is "Unnamed: 24")
+ALL_SHEET_COLUMNS = [
+    "Symbol", "Company", "FV", "Sector", "No Years", "Price", "Div Yield", "5Y Avg Yield", "Current Div",
+    "Payouts/ Year", "Annualized", "Previous Div", "Ex-Date", "Pay-Date", "Low", "High", "DGR 1Y", "DGR 3Y",
+    "DGR 5Y", "DGR 10Y", "TTR 1Y", "TTR 3Y", "Fair Value", "FV %", None, "Streak Basis", "Chowder Number",
+    "EPS 1Y", "Revenue 1Y", "NPM", "CF/Share", "ROE", "Current R", "Debt/Capital", "ROTC", "P/E", "P/BV",
+    "PEG", "New Member", "Industry",
+]
+
+TITLE = "Dividend Champions, Contenders, Challengers"
+AS_OF = datetime(2024, 10, 4)
+
+# Generated workbooks are reused between runs
+CACHE_DIR = os.getenv("BENCHMARK_WORKBOOK_DIR", os.path.join(tempfile.gettempdir(), "dividend_benchmarks"))
+
+def symbol(i):
+    return f"S{i:05d}"
+
+def sheet_rows(rows, seed=0):
+    """Rows of plausible values with gaps for a synthetic "All" sheet, in ALL_SHEET_COLUMNS order."""
+    rng = np.random.default_rng(seed)
+    industries = [name for name in industry_mapping if name != "Excel Industry Name"]
+    sectors = [name for name in sector_mapping if name != "Excel Sector Name"]
+
+    def value(low, high, missing=0.05):
+        return None if rng.random() < missing else round(float(rng.uniform(low, high)), 4)
+
+    for i in range(rows):
+        yield [
+            symbol(i), f"Company {i}", value(-30, 30), sectors[i % len(sectors)], int(rng.integers(0, 70)),
+            value(5, 500, 0), value(0, 9), value(0, 9), value(0, 2), 4, value(0, 8), value(0, 2),
+            datetime(2024, 9, int(rng.integers(1, 28))), None if i % 7 == 0 else datetime(2024, 10, int(rng.integers(1, 28))),
+            value(5, 300), value(5, 600), value(-10, 30), value(-10, 30), value(-10, 30), value(-10, 30),
+            value(-50, 50), value(-50, 50), value(5, 500), value(-50, 50), None, "Div",
+            None if i % 9 == 0 else value(0, 30, 0), value(-50, 80), value(-20, 40), value(-10, 40), value(-5, 30),
+            value(-20, 60), value(0, 4), value(0, 1), value(-5, 40), value(1, 60), value(0, 20), value(0, 5),
+            "Y" if i % 13 == 0 else None, industries[i % len(industries)],
+        ]
+
+def make_workbook(rows, path, seed=0):
+    """Write a synthetic "All" sheet: title and as-of rows, the header row, then the sheet rows."""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("All")
+    sheet.append([TITLE])
+    sheet.append([AS_OF])
+    sheet.append(ALL_SHEET_COLUMNS)
+    for row in sheet_rows(rows, seed):
+        sheet.append(row)
+    workbook.save(path)
+    return path
+
+def make_csv(rows, path, seed=0):
+    """Write the same sheet as make_workbook as a CSV export, dates in ISO format."""
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow([TITLE])
+        writer.writerow([AS_OF.date().isoformat()])
+        writer.writerow(ALL_SHEET_COLUMNS)
+        for row in sheet_rows(rows, seed):
+            writer.writerow(value.date().isoformat() if isinstance(value, datetime) else value for value in row)
+    return path
+
+def workbook_path(rows, seed=0, extension=".xlsx"):
+    """Path of a cached synthetic workbook (or CSV export) with the given number of rows, generated on first use."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = os.path.join(CACHE_DIR, f"all_{rows}_{seed}{extension}")
+    if not os.path.exists(path):
+        (make_csv if extension == ".csv" else make_workbook)(rows, path, seed)
+    return path
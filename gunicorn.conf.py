@@ -1,5 +1,6 @@
 # pylint: disable=missing-module-docstring, invalid-name, missing-final-newline
 # Gunicorn configuration file
+import os
 import multiprocessing
 
 # WSGI Application
@@ -13,6 +14,13 @@ workers = multiprocessing.cpu_count()
 worker_class = "gevent"
 
 # Logging Options
-loglevel = "debug"
+# Request latency and sampled request logs come from the app (/metrics), ACCESS_LOG=- restores the full access log
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
 errorlog = "-"  # Log to stderr
-accesslog = "-"  # Log to stdout
+accesslog = os.getenv("ACCESS_LOG")
+
+
+def on_starting(server):  # pylint: disable=unused-argument
+    # Stage metrics of a previous run would otherwise keep adding to the counters
+    from app.utils.instrumentation import metrics  # pylint: disable=import-outside-toplevel
+    metrics.reset()
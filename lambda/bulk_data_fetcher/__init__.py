@@ -0,0 +1,3 @@
+# pylint: disable = missing-module-docstring, missing-final-newline
+from .bulk_api_handler import BULK_DATASETS, fetch_dataset, latest_manifest
+from .s3_uploader import get_storage, LocalStorage, S3Storage
@@ -0,0 +1,59 @@
+# pylint: disable = missing-module-docstring, missing-final-newline, trailing-whitespace, line-too-long
+import re
+import logging
+from contextlib import contextmanager
+import requests
+from tenacity import Retrying, stop_after_attempt, retry_if_exception_type, wait_exponential_jitter
+
+logger = logging.getLogger(__name__)
+
+# Status codes worth retrying: rate limiting and transient upstream failures
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# (connect, read) timeouts, a read timeout applies between chunks and not to the whole download
+DEFAULT_TIMEOUT = (3.05, 60)
+
+def redact(url):
+    # Never let the API key end up in logs
+    return re.sub(r"(apikey=)[^&]+", r"\1***", url)
+
+class BulkDownloadError(IOError):
+    """Raised when a bulk file cannot be downloaded."""
+
+class RetryableDownloadError(BulkDownloadError):
+    """A 429/5xx response before any data was read, retried with backoff."""
+
+def _open(session, url, timeout):
+    response = session.get(url, stream=True, timeout=timeout)
+    if response.status_code in RETRYABLE_STATUS_CODES:
+        response.close()
+        raise RetryableDownloadError(f"HTTP {response.status_code} for {redact(url)}")
+    if response.status_code != 200:
+        response.close()
+        raise BulkDownloadError(f"HTTP {response.status_code} for {redact(url)}")
+    return response
+
+@contextmanager
+def open_bulk_stream(url, session=None, timeout=DEFAULT_TIMEOUT, max_attempts=4):
+    """Open a bulk CSV download as a binary file object that is read as it arrives.
+
+    Only the request itself is retried; once bytes are flowing the caller consumes the
+    body incrementally, so the whole file is never held in memory or written to /tmp.
+    """
+    session = session or requests.Session()
+    retrying = Retrying(
+        stop=stop_after_attempt(max_attempts),
+        wait=wait_exponential_jitter(initial=1, max=30),
+        retry=retry_if_exception_type((RetryableDownloadError, requests.ConnectionError, requests.Timeout)),
+        before_sleep=lambda state: logger.warning("Retrying %s: %s", redact(url), redact(str(state.outcome.exception()))),
+        reraise=True,
+    )
+    try:
+        response = retrying(_open, session, url, timeout)
+    except requests.RequestException as e:
+        raise BulkDownloadError(f"Request to {redact(url)} failed: {redact(str(e))}") from e
+
+    with response:
+        # Let urllib3 undo gzip/deflate transfer encoding while the parser reads
+        response.raw.decode_content = True
+        yield response.raw
@@ -0,0 +1,124 @@
+# pylint: disable = missing-module-docstring, missing-final-newline, trailing-whitespace, line-too-long
+import json
+import time
+import logging
+from datetime import date
+import pyarrow as pa
+from .auto_file_downloader import open_bulk_stream
+from .data_parser import iter_tables, SchemaConflictError, DEFAULT_BLOCK_SIZE
+from .s3_uploader import put_parquet
+
+logger = logging.getLogger(__name__)
+
+FMP_BASE_URL = "https://financialmodelingprep.com/api/v4"
+
+# FMP bulk CSV endpoints, datasets marked periodic take a year and a period
+BULK_DATASETS = {
+    "ratios": {"path": "ratios-bulk", "periodic": True},
+    "key_metrics": {"path": "key-metrics-bulk", "periodic": True},
+    "ratios_ttm": {"path": "ratios-ttm-bulk", "periodic": False},
+    "key_metrics_ttm": {"path": "key-metrics-ttm-bulk", "periodic": False},
+    "income_statement": {"path": "income-statement-bulk", "periodic": True},
+    "balance_sheet_statement": {"path": "balance-sheet-statement-bulk", "periodic": True},
+    "cash_flow_statement": {"path": "cash-flow-statement-bulk", "periodic": True},
+    "income_statement_growth": {"path": "income-statement-growth-bulk", "periodic": True},
+    "scores": {"path": "scores-bulk", "periodic": False},
+}
+
+PERIODS = ("annual", "quarter")
+
+# Rows collected before a Parquet part is written, bounds memory per part
+ROWS_PER_PART = 250_000
+
+# Downloads repeated with more text columns when a later block contradicts the inferred schema, the last attempt nulls and logs instead
+MAX_SCHEMA_RETRIES = 2
+
+def bulk_url(dataset, api_key, year=None, period="annual"):
+    if dataset not in BULK_DATASETS:
+        raise ValueError(f"Unknown bulk dataset '{dataset}', expected one of {', '.join(BULK_DATASETS)}.")
+    url = f"{FMP_BASE_URL}/{BULK_DATASETS[dataset]['path']}?"
+    if BULK_DATASETS[dataset]["periodic"]:
+        if year is None or period not in PERIODS:
+            raise ValueError(f"The '{dataset}' dataset needs a year and a period ({' or '.join(PERIODS)}).")
+        url += f"year={int(year)}&period={period}&"
+    return url + f"apikey={api_key}"
+
+def partition_prefix(dataset, as_of, year=None, period=None):
+    """Hive-style partition directory, e.g. ratios/year=2023/period=annual/as_of=2024-10-18."""
+    parts = [dataset]
+    if BULK_DATASETS[dataset]["periodic"]:
+        parts += [f"year={int(year)}", f"period={period}"]
+    parts.append(f"as_of={as_of}")
+    return "/".join(parts)
+
+def _latest_key(dataset, year=None, period=None):
+    return partition_prefix(dataset, "latest", year, period).rsplit("/", 1)[0] + "/_latest.json"
+
+def write_parts(storage, prefix, tables, rows_per_part=ROWS_PER_PART):
+    """Group parsed tables into parts of about rows_per_part rows and store each as Parquet."""
+    parts, pending, pending_rows = [], [], 0
+
+    def flush():
+        key = f"{prefix}/part-{len(parts):05d}.parquet"
+        table = pa.concat_tables(pending)
+        size = put_parquet(storage, key, table)
+        parts.append({"key": key, "rows": table.num_rows, "bytes": size})
+
+    schema = None
+    for table in tables:
+        schema = table.schema
+        pending.append(table)
+        pending_rows += table.num_rows
+        if pending_rows >= rows_per_part:
+            flush()
+            pending, pending_rows = [], 0
+    if pending:
+        flush()
+    return parts, schema
+
+def fetch_dataset(storage, dataset, api_key, year=None, period="annual", as_of=None, session=None, block_size=DEFAULT_BLOCK_SIZE, rows_per_part=ROWS_PER_PART):
+    """Stream one bulk CSV into partitioned Parquet and return its manifest.
+
+    The manifest is written after every part and the _latest.json pointer after the
+    manifest, so readers never see a partially written partition. Column types come from
+    the first block; when a later block holds text in a numeric column the file is fetched
+    again with that column as text, so no value is silently nulled.
+    """
+    as_of = as_of or date.today().isoformat()
+    prefix = partition_prefix(dataset, as_of, year, period)
+    started = time.perf_counter()
+
+    text_columns = set()
+    for attempt in range(MAX_SCHEMA_RETRIES + 1):
+        try:
+            with open_bulk_stream(bulk_url(dataset, api_key, year, period), session=session) as stream:
+                tables = iter_tables(stream, block_size, text_columns, strict=attempt < MAX_SCHEMA_RETRIES)
+                parts, schema = write_parts(storage, prefix, tables, rows_per_part)
+            break
+        except SchemaConflictError as e:
+            # Parts of this attempt are overwritten, the manifest only lists the final ones
+            text_columns.update(e.columns)
+            logger.warning("Fetching %s again with more text columns: %s", dataset, e)
+
+    manifest = {
+        "dataset": dataset,
+        "as_of": as_of,
+        "year": year if BULK_DATASETS[dataset]["periodic"] else None,
+        "period": period if BULK_DATASETS[dataset]["periodic"] else None,
+        "rows": sum(part["rows"] for part in parts),
+        "columns": {field.name: str(field.type) for field in schema} if schema is not None else {},
+        "parts": parts,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    storage.put_bytes(f"{prefix}/_manifest.json", json.dumps(manifest, indent=2).encode("utf-8"))
+    storage.put_bytes(_latest_key(dataset, year, period), json.dumps({"manifest": f"{prefix}/_manifest.json"}).encode("utf-8"))
+    logger.info("Fetched %s: %d rows in %d parts (%.1fs)", dataset, manifest["rows"], len(parts), manifest["seconds"])
+    return manifest
+
+def latest_manifest(storage, dataset, year=None, period="annual"):
+    """Manifest of the most recent complete fetch of a dataset, or None."""
+    key = _latest_key(dataset, year, period)
+    if not storage.exists(key):
+        return None
+    pointer = json.loads(storage.get_bytes(key))
+    return json.loads(storage.get_bytes(pointer["manifest"]))
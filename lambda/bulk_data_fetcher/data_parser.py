@@ -0,0 +1,118 @@
+# pylint: disable = missing-module-docstring, missing-final-newline, trailing-whitespace, line-too-long
+import io
+import csv
+import logging
+import pandas as pd
+import pyarrow as pa
+from pyarrow import csv as pa_csv
+
+logger = logging.getLogger(__name__)
+
+# Bytes of CSV parsed per block, bounds memory regardless of the file size
+DEFAULT_BLOCK_SIZE = 8 * 1024 * 1024
+
+# Columns kept as text in every bulk dataset, everything else is parsed as numbers when it can be
+TEXT_COLUMNS = {
+    "symbol", "date", "calendarYear", "period", "reportedCurrency", "cik",
+    "fillingDate", "acceptedDate", "link", "finalLink",
+}
+
+class _PrefixedStream(io.RawIOBase):
+    """Replays the bytes already read to find the header, then continues with the stream."""
+
+    def __init__(self, prefix, stream):
+        super().__init__()
+        self._prefix = prefix
+        self._stream = stream
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        if self._prefix:
+            n = min(len(b), len(self._prefix))
+            b[:n] = self._prefix[:n]
+            self._prefix = self._prefix[n:]
+            return n
+        data = self._stream.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+def read_header(stream, max_bytes=1024 * 1024):
+    """Return (column names, stream positioned at the start of the file again)."""
+    buffered = b""
+    while b"\n" not in buffered and len(buffered) < max_bytes:
+        chunk = stream.read(64 * 1024)
+        if not chunk:
+            break
+        buffered += chunk
+    first_line = buffered.split(b"\n", 1)[0].decode("utf-8-sig").rstrip("\r")
+    if not first_line:
+        raise ValueError("The bulk file is empty.")
+    columns = next(csv.reader([first_line]))
+    return columns, io.BufferedReader(_PrefixedStream(buffered, stream))
+
+class SchemaConflictError(ValueError):
+    """A later block holds text in columns the first block typed as numbers."""
+
+    def __init__(self, columns):
+        super().__init__(f"Non-numeric values in numeric columns: {', '.join(columns)}")
+        self.columns = columns
+
+def infer_schema(df, text_columns=()):
+    """Arrow schema for a dataset, decided once from its first block so every part matches."""
+    fields = []
+    for column in df.columns:
+        values = df[column].dropna()
+        # Columns with no values yet stay text, so nothing later in the file is lost to coercion
+        numeric = (
+            column not in TEXT_COLUMNS and column not in text_columns
+            and len(values) > 0 and pd.to_numeric(values, errors="coerce").notna().all()
+        )
+        fields.append(pa.field(column, pa.float64() if numeric else pa.string()))
+    return pa.schema(fields)
+
+def conform(df, schema, strict=False):
+    """Coerce a block to the dataset schema.
+
+    Values that do not parse as numbers raise SchemaConflictError when strict, otherwise
+    they become null and the count per column is logged.
+    """
+    nulled = {}
+    for field in schema:
+        if pa.types.is_floating(field.type):
+            values = pd.to_numeric(df[field.name], errors="coerce")
+            count = int((values.isna() & df[field.name].notna()).sum())
+            if count:
+                nulled[field.name] = count
+            df[field.name] = values
+    if nulled:
+        if strict:
+            raise SchemaConflictError(sorted(nulled))
+        logger.warning("Nulled non-numeric values in numeric columns: %s", ", ".join(f"{column} ({count})" for column, count in sorted(nulled.items())))
+    return pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+
+def iter_tables(stream, block_size=DEFAULT_BLOCK_SIZE, text_columns=(), strict=False):
+    """Parse a CSV stream block by block and yield Arrow tables that share one schema.
+
+    Every column is read as text first and converted per block. The schema comes from the
+    first block, with text_columns kept as text; a later block with text in a numeric
+    column raises SchemaConflictError when strict, else those values are nulled and logged.
+    """
+    columns, stream = read_header(stream)
+    reader = pa_csv.open_csv(
+        stream,
+        read_options=pa_csv.ReadOptions(block_size=block_size, use_threads=True),
+        convert_options=pa_csv.ConvertOptions(
+            column_types={column: pa.string() for column in columns},
+            strings_can_be_null=True,
+        ),
+    )
+    schema = None
+    for batch in reader:
+        if batch.num_rows == 0:
+            continue
+        df = batch.to_pandas()
+        if schema is None:
+            schema = infer_schema(df, text_columns)
+        yield conform(df, schema, strict)
@@ -0,0 +1,125 @@
+# pylint: disable = missing-module-docstring, missing-final-newline, trailing-whitespace, line-too-long
+import io
+import os
+import time
+import logging
+from abc import ABC, abstractmethod
+import pyarrow.parquet as pq
+
+try:
+    import boto3
+except ImportError:  # pragma: no cover - only the local backend is available without boto3
+    boto3 = None
+
+logger = logging.getLogger(__name__)
+
+# Compression for the Parquet parts, zstd keeps files small and is fast to decode
+PARQUET_COMPRESSION = os.getenv("BULK_PARQUET_COMPRESSION", "zstd")
+
+class Storage(ABC):
+    """Where pipeline output goes; keys are "/"-separated paths relative to the storage root."""
+
+    @abstractmethod
+    def put_bytes(self, key, data):
+        """Store data under key, replacing an earlier value."""
+
+    @abstractmethod
+    def get_bytes(self, key):
+        """The bytes stored under key."""
+
+    @abstractmethod
+    def exists(self, key):
+        """Whether anything is stored under key."""
+
+    @abstractmethod
+    def list(self, prefix=""):
+        """Keys under prefix."""
+
+class LocalStorage(Storage):
+    """Storage rooted in a local directory, files only appear once fully written."""
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+
+    def _path(self, key):
+        path = os.path.abspath(os.path.join(self.root, key))
+        if os.path.commonpath([path, self.root]) != self.root:
+            raise ValueError(f"Key '{key}' escapes the storage root.")
+        return path
+
+    def put_bytes(self, key, data):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        partial_path = f"{path}.{os.getpid()}.{time.time_ns()}.part"
+        with open(partial_path, "wb") as f:
+            f.write(data)
+        os.replace(partial_path, path)
+
+    def get_bytes(self, key):
+        with open(self._path(key), "rb") as f:
+            return f.read()
+
+    def exists(self, key):
+        return os.path.exists(self._path(key))
+
+    def list(self, prefix=""):
+        keys = []
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                if name.endswith(".part"):
+                    continue
+                key = os.path.relpath(os.path.join(directory, name), self.root).replace(os.sep, "/")
+                if key.startswith(prefix):
+                    keys.append(key)
+        return sorted(keys)
+
+class S3Storage(Storage):
+    """Storage in an S3 bucket under a key prefix.
+
+    endpoint_url (or S3_ENDPOINT_URL) points the client at an S3-compatible stand-in
+    such as MinIO or a moto server.
+    """
+
+    def __init__(self, bucket, prefix="", endpoint_url=None, client=None):
+        if client is None and boto3 is None:
+            raise ImportError("boto3 is required for S3 storage.")
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.client = client or boto3.client("s3", endpoint_url=endpoint_url or os.getenv("S3_ENDPOINT_URL") or None)
+
+    def _key(self, key):
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def put_bytes(self, key, data):
+        self.client.put_object(Bucket=self.bucket, Key=self._key(key), Body=data)
+
+    def get_bytes(self, key):
+        return self.client.get_object(Bucket=self.bucket, Key=self._key(key))["Body"].read()
+
+    def exists(self, key):
+        response = self.client.list_objects_v2(Bucket=self.bucket, Prefix=self._key(key), MaxKeys=1)
+        return any(item["Key"] == self._key(key) for item in response.get("Contents", []))
+
+    def list(self, prefix=""):
+        keys = []
+        strip = len(self.prefix) + 1 if self.prefix else 0
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._key(prefix)):
+            keys.extend(item["Key"][strip:] for item in page.get("Contents", []))
+        return sorted(keys)
+
+def get_storage(location):
+    """Build a storage from "s3://bucket/prefix" or a local directory path."""
+    if location.startswith("s3://"):
+        bucket, _, prefix = location[len("s3://"):].partition("/")
+        return S3Storage(bucket, prefix)
+    return LocalStorage(location)
+
+def put_parquet(storage, key, table, compression=PARQUET_COMPRESSION):
+    """Serialize one Arrow table to Parquet and store it, returns the size in bytes."""
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer, compression=compression)
+    data = buffer.getvalue()
+    storage.put_bytes(key, data)
+    logger.info("Stored %s (%d rows, %d bytes)", key, table.num_rows, len(data))
+    return len(data)
@@ -0,0 +1,48 @@
+# pylint: disable = missing-module-docstring, missing-final-newline, trailing-whitespace, line-too-long
+import os
+import logging
+from datetime import date
+import requests
+from bulk_data_fetcher import fetch_dataset, get_storage, BULK_DATASETS
+from bulk_data_fetcher.auto_file_downloader import BulkDownloadError
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Datasets fetched when the event does not name any
+DEFAULT_DATASETS = ["ratios_ttm", "key_metrics_ttm", "scores"]
+
+def lambda_handler(event, context):  # pylint: disable=unused-argument
+    """Fetch FMP bulk datasets into partitioned Parquet.
+
+    Event keys (all optional): datasets, year, period, as_of, output
+    ("s3://bucket/prefix" or a local path, defaults to BULK_OUTPUT).
+    """
+    event = event or {}
+    api_key = os.environ["FMP_API_KEY"]
+    storage = get_storage(event.get("output") or os.environ["BULK_OUTPUT"])
+    datasets = event.get("datasets") or DEFAULT_DATASETS
+    year = event.get("year") or date.today().year - 1
+    period = event.get("period", "annual")
+    as_of = event.get("as_of") or date.today().isoformat()
+
+    results, errors = {}, {}
+    # One session so every dataset reuses the same connection to FMP
+    with requests.Session() as session:
+        for dataset in datasets:
+            if dataset not in BULK_DATASETS:
+                errors[dataset] = "unknown dataset"
+                continue
+            try:
+                manifest = fetch_dataset(storage, dataset, api_key, year=year, period=period, as_of=as_of, session=session)
+                results[dataset] = {"rows": manifest["rows"], "parts": len(manifest["parts"])}
+            except (BulkDownloadError, ValueError) as e:
+                logger.error("Bulk fetch of %s failed: %s", dataset, e)
+                errors[dataset] = str(e)
+
+    return {
+        "statusCode": 500 if errors and not results else 200,
+        "as_of": as_of,
+        "datasets": results,
+        "errors": errors,
+    }
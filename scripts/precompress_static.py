@@ -0,0 +1,45 @@
+# pylint: disable = missing-module-docstring, missing-final-newline, trailing-whitespace, line-too-long
+# Writes the .gz/.br siblings app/utils/static_assets.py serves. Run after `next build`:
+#   python scripts/precompress_static.py frontend/automated-dividend-investing/out
+# Standalone on purpose: the image build runs it without importing the app package (Flask, routes, schemas).
+import os
+import sys
+import gzip
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - .br variants are only written when brotli is installed
+    brotli = None
+
+# Files worth precompressing
+COMPRESSIBLE_EXTENSIONS = (".html", ".js", ".mjs", ".css", ".json", ".map", ".svg", ".txt", ".xml", ".webmanifest", ".ico")
+MIN_COMPRESS_SIZE = 1024
+
+DEFAULT_EXPORT_ROOT = os.path.join("frontend", "automated-dividend-investing", "out")
+
+def precompress(root, min_size=MIN_COMPRESS_SIZE):
+    """Write .gz (and .br when brotli is installed) next to every compressible file, return how many were written."""
+    written = 0
+    for directory, _, files in os.walk(root):
+        for name in files:
+            if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+                continue
+            path = os.path.join(directory, name)
+            if os.path.getsize(path) < min_size:
+                continue
+            with open(path, "rb") as f:
+                data = f.read()
+            compressed = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                compressed[".br"] = brotli.compress(data, quality=11)
+            for suffix, payload in compressed.items():
+                # A variant that is not smaller is not worth a Content-Encoding
+                if len(payload) < len(data):
+                    with open(path + suffix, "wb") as f:
+                        f.write(payload)
+                    written += 1
+    return written
+
+if __name__ == "__main__":
+    export_root = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_EXPORT_ROOT
+    print(f"Wrote {precompress(export_root)} precompressed files under {export_root}")
@@ -0,0 +1,53 @@
+# pylint: disable = missing-module-docstring, missing-function-docstring, missing-final-newline, trailing-whitespace, line-too-long, redefined-outer-name
+import pytest
+from flask import Flask
+from app.routes.routes import register_routes
+from app.utils import fmp_api_calls
+from app.utils.market_data import market_data
+from benchmarks.fake_fmp import FakeFMP
+from benchmarks.workbooks import make_csv
+
+@pytest.fixture
+def fake_fmp(tmp_path, monkeypatch):
+    # Every FMP call answered offline, from empty quote and market data caches
+    fake = FakeFMP()
+    monkeypatch.setattr(fmp_api_calls.fmp_client, "get_json", fake.get_json)
+    monkeypatch.setattr(fmp_api_calls.quote_cache, "sqlite_path", None)
+    monkeypatch.setattr(market_data, "cache_path", str(tmp_path / "market_data.json"))
+    fmp_api_calls.quote_cache.clear()
+    market_data.invalidate()
+    yield fake
+    market_data.invalidate()
+
+@pytest.fixture
+def static_folder(tmp_path):
+    folder = tmp_path / "static"
+    folder.mkdir()
+    return folder
+
+@pytest.fixture
+def app(tmp_path, static_folder, fake_fmp):
+    # The app's routes over a temporary upload folder and frontend export
+    app = Flask(__name__, static_folder=str(static_folder))
+    app.config["UPLOAD_FOLDER"] = str(tmp_path / "uploads")
+    (tmp_path / "uploads").mkdir()
+    register_routes(app)
+    return app
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def sheet_csv(tmp_path):
+    path = tmp_path / "all.csv"
+    make_csv(40, str(path), seed=5)
+    return path
+
+@pytest.fixture
+def upload(client, sheet_csv):
+    # POST a sheet to /api/upload, the synthetic CSV export unless another file is given
+    def post(query="", path=sheet_csv):
+        with open(path, "rb") as f:
+            return client.post(f"/api/upload{query}", data={"file": (f, path.name)}, content_type="multipart/form-data")
+    return post
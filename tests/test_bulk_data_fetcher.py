@@ -0,0 +1,115 @@
+# pylint: disable = missing-module-docstring, missing-function-docstring, missing-final-newline, trailing-whitespace, line-too-long, redefined-outer-name, wrong-import-position
+import io
+import os
+import sys
+import json
+import logging
+from contextlib import contextmanager
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+# The Lambda package is deployed from lambda/, where bulk_data_fetcher is a top-level package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lambda"))
+from bulk_data_fetcher import bulk_api_handler, fetch_dataset, latest_manifest, LocalStorage, S3Storage
+from bulk_data_fetcher.data_parser import iter_tables, read_header, SchemaConflictError
+from bulk_data_fetcher.s3_uploader import put_parquet
+
+HEADER = "symbol,date,peRatio,dividendYield,note\n"
+
+def bulk_csv(rows=60, late_text_row=None):
+    # A ratios-ttm style export, optionally with text deep in the numeric peRatio column
+    lines = [HEADER]
+    for index in range(rows):
+        pe = "n/m" if index == late_text_row else f"{10 + index * 0.5}"
+        lines.append(f"SYM{index},2024-10-04,{pe},{index / 100},\n")
+    return "".join(lines).encode("utf-8")
+
+def tables(data, **kwargs):
+    return list(iter_tables(io.BytesIO(data), block_size=256, **kwargs))
+
+@pytest.fixture
+def storage(tmp_path):
+    return LocalStorage(str(tmp_path / "bulk"))
+
+def test_header_is_replayed():
+    columns, stream = read_header(io.BytesIO(b"\xef\xbb\xbfa,b\r\n1,2\n"))
+    assert columns == ["a", "b"]
+    assert stream.read() == b"\xef\xbb\xbfa,b\r\n1,2\n"
+    with pytest.raises(ValueError):
+        read_header(io.BytesIO(b""))
+
+def test_blocks_share_one_schema():
+    parsed = tables(bulk_csv())
+    assert len(parsed) > 1
+    assert all(table.schema == parsed[0].schema for table in parsed)
+    schema = parsed[0].schema
+    assert schema.field("peRatio").type == pa.float64() and schema.field("symbol").type == pa.string()
+    # Empty in the first block, kept as text
+    assert schema.field("note").type == pa.string()
+    assert sum(table.num_rows for table in parsed) == 60
+
+def test_late_text_in_a_numeric_column(caplog):
+    data = bulk_csv(late_text_row=50)
+    with pytest.raises(SchemaConflictError) as error:
+        tables(data, strict=True)
+    assert error.value.columns == ["peRatio"]
+    # Kept as text when named, nothing is lost
+    values = pa.concat_tables(tables(data, text_columns={"peRatio"}, strict=True)).column("peRatio").to_pylist()
+    assert values[50] == "n/m"
+    # Otherwise nulled, and the nulls are logged
+    with caplog.at_level(logging.WARNING):
+        values = pa.concat_tables(tables(data)).column("peRatio").to_pylist()
+    assert values[50] is None and values[49] == pytest.approx(34.5)
+    assert "peRatio (1)" in caplog.text
+
+@contextmanager
+def serve(data, opened):
+    opened.append(1)
+    yield io.BytesIO(data)
+
+def test_fetch_dataset_retries_with_text_columns(storage, monkeypatch):
+    opened = []
+    monkeypatch.setattr(bulk_api_handler, "open_bulk_stream", lambda url, session=None: serve(bulk_csv(late_text_row=50), opened))
+    manifest = fetch_dataset(storage, "ratios_ttm", "key", as_of="2024-10-04", block_size=256, rows_per_part=25)
+    assert len(opened) == 2
+    assert manifest["columns"]["peRatio"] == "string" and manifest["columns"]["dividendYield"] == "double"
+    assert manifest["rows"] == 60 and len(manifest["parts"]) > 1
+    assert all(part["rows"] >= 25 for part in manifest["parts"][:-1])
+    table = pa.concat_tables(pq.read_table(io.BytesIO(storage.get_bytes(part["key"]))) for part in manifest["parts"])
+    assert table.num_rows == 60 and table.column("peRatio").to_pylist()[50] == "n/m"
+    assert latest_manifest(storage, "ratios_ttm") == manifest
+    assert latest_manifest(storage, "scores") is None
+
+def test_put_parquet_round_trip(storage):
+    table = pa.table({"symbol": ["KO", "PEP"], "peRatio": [25.1, None]})
+    size = put_parquet(storage, "ratios_ttm/as_of=2024-10-04/part-00000.parquet", table)
+    data = storage.get_bytes("ratios_ttm/as_of=2024-10-04/part-00000.parquet")
+    assert size == len(data)
+    assert pq.read_table(io.BytesIO(data)).equals(table)
+
+def test_local_storage(storage, tmp_path):
+    storage.put_bytes("a/b.json", b"{}")
+    storage.put_bytes("a/b.json", b"[]")
+    storage.put_bytes("c.json", b"1")
+    (tmp_path / "bulk" / "a" / "d.json.123.part").write_bytes(b"partial")
+    assert storage.get_bytes("a/b.json") == b"[]"
+    assert storage.exists("c.json") and not storage.exists("a/missing.json")
+    assert storage.list() == ["a/b.json", "c.json"]
+    assert storage.list("a/") == ["a/b.json"]
+    with pytest.raises(ValueError):
+        storage.put_bytes("../outside.json", b"x")
+
+def test_s3_storage():
+    moto = pytest.importorskip("moto")
+    boto3 = pytest.importorskip("boto3")
+    with moto.mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket="bulk")
+        storage = S3Storage("bulk", prefix="fmp/", client=client)
+        storage.put_bytes("a/b.json", json.dumps({"rows": 1}).encode("utf-8"))
+        storage.put_bytes("a/bc.json", b"{}")
+        assert json.loads(storage.get_bytes("a/b.json")) == {"rows": 1}
+        assert storage.exists("a/b.json") and not storage.exists("a/b")
+        assert storage.list("a/") == ["a/b.json", "a/bc.json"]
+        assert client.list_objects_v2(Bucket="bulk")["Contents"][0]["Key"].startswith("fmp/a/")
@@ -0,0 +1,120 @@
+# pylint: disable = missing-module-docstring, missing-function-docstring, missing-final-newline, trailing-whitespace, line-too-long
+import numpy as np
+import pandas as pd
+import pytest
+from app.utils.clean_file_data import add_derived_columns
+from app.utils.fmp_api_calls import ReferenceData
+from app.utils.mappings import dividend_category_mapping
+
+REFERENCE = ReferenceData(
+    tbill_rate=4.08, tbond_rate=4.38, market_risk_premium=4.6,
+    industry_pe_dict={("NYSE", "Beverages"): 21.5, ("NASDAQ", "Software"): 30.0},
+    sector_pe_dict={("NYSE", "Consumer Staples"): 19.0},
+    business_day="2024-10-04",
+)
+
+def parse_range(range_str):
+    if range_str.endswith('+'):
+        return (int(range_str[:-1]), float('inf'))
+    return tuple(map(int, range_str.split('-')))
+
+def categorize_dividend(years):
+    for category, range_str in dividend_category_mapping.items():
+        start, end = parse_range(range_str)
+        if start <= years <= end:
+            return category
+    return "N/A"
+
+def calculate_dgr_cv(dgr_1y, dgr_3y, dgr_5y):
+    estimated_series = [dgr_1y, dgr_3y, dgr_3y, dgr_5y, dgr_5y]
+    std_dev = np.std(estimated_series)
+    mean = np.mean(estimated_series)
+    return (std_dev / mean) * 100 if mean != 0 else float('inf')
+
+def categorize_dgr_volatility(cv):
+    if cv < 20:
+        return "Low Volatility"
+    if 20 <= cv < 50:
+        return "Medium Volatility"
+    return "High Volatility"
+
+def meets_chowder_criteria(row):
+    if row['Div Yield'] >= 3.0:
+        return row['Chowder Number'] >= 12
+    return row['Chowder Number'] >= 15
+
+def row_wise(df, reference):
+    # The per-row apply formulas of the original clean_and_save_file, in their original order
+    tbill_rate, tbond_rate, market_risk_premium = reference.tbill_rate, reference.tbond_rate, reference.market_risk_premium
+    df = df.copy()
+    df['Meets Chowder Criteria'] = df.apply(meets_chowder_criteria, axis=1)
+    df["Greater Than 10 Year T-Bill"] = np.nan
+    df["Greater Than 10 Year T-Bill"] = df.apply(lambda row: (np.nan_to_num(row["Greater Than 10 Year T-Bill"], nan=tbill_rate) + 1) < row["Div Yield"], axis=1)
+    df['IRR'] = (df['EPS'] / df['Current Price']) * 100
+    df['IRR Greater than T-Bond'] = df['IRR'] > tbond_rate
+    df['PE Less Half EPS Growth Rate'] = df['P/E'] < (df['EPS 1Y'] / 2)
+    df['Growth Plus Yield By PE Less Than 2'] = ((df['EPS 1Y'] + df['Div Yield']) / df['P/E']) > 2
+    df['Price to Cash Flow'] = df['Current Price'] / df['CF/Share']
+    df['PCF Ratio Less Than 10'] = df['Price to Cash Flow'] < 10
+    df['Industry PE'] = df.apply(lambda row: reference.industry_pe_dict.get((row['Exchange'], row['Industry']), np.nan), axis=1)
+    df['Sector PE'] = df.apply(lambda row: reference.sector_pe_dict.get((row['Exchange'], row['Sector']), np.nan), axis=1)
+    df['PE Less Than Industry PE'] = df['P/E'] < df['Industry PE']
+    df['PE Less Than Sector PE'] = df['P/E'] < df['Sector PE']
+    df['Weighted DGR'] = (df['DGR 10Y'] * 0.2) + (df['DGR 5Y'] * 0.4) + (df['DGR 3Y'] * 0.3) + (df['DGR 1Y'] * 0.5)
+    df['3Y DGR Greater Than 10Y DGR'] = df['DGR 3Y'] > df['DGR 10Y']
+    df['1Y DGR Less Than 1Y ESP Growth Rate'] = df['DGR 1Y'] < df['EPS 1Y']
+    df['Div Yield + Weighted DGR Greater Than Market Risk Rate + 10 Year T-Bill'] = (df['Div Yield'] + df['Weighted DGR']) > (market_risk_premium + tbill_rate)
+    df['1Y EPS Growth Greater Than Weighted DGR'] = df['EPS 1Y'] > df['Weighted DGR']
+    df['Div Yield + 1Y EPS Growth Greater Than Market Risk Rate + 10 Year T-Bill'] = (df['Div Yield'] + df['EPS 1Y']) > (market_risk_premium + tbill_rate)
+    df.rename(columns={"Annualized": "Annualized Dividend"}, inplace=True)
+    df['Payout Ratio'] = (df['Annualized Dividend'] / df['EPS']) * 100
+    df['FCF Payout Ratio'] = (df['Annualized Dividend'] / df['CF/Share']) * 100
+    df['Dividend Coverage Ratio'] = df['EPS'] / df['Annualized Dividend']
+    df['Dividend Growth Acceleration'] = df['DGR 3Y'] - df['DGR 10Y']
+    df['Projected Yield on Cost'] = (df['Div Yield']/100) * ((1 + (df['DGR 5Y']/100)) ** 5)
+    df['Dividend Category'] = df['No Years'].apply(categorize_dividend)
+    df['5-Year EPS CAGR'] = df['P/E'] / df['PEG']
+    df['DGR_CV'] = df.apply(lambda row: calculate_dgr_cv(row['DGR 1Y'], row['DGR 3Y'], row['DGR 5Y']), axis=1)
+    df['DGR_Volatility_Category'] = df['DGR_CV'].apply(categorize_dgr_volatility)
+    return df
+
+@pytest.fixture
+def sheet():
+    # A normal row, then rows of NaN, zero and negative inputs
+    nan = np.nan
+    return pd.DataFrame({
+        "Symbol": ["KO", "GAP", "ZERO", "NEG", "TECH"],
+        "Exchange": ["NYSE", None, "NYSE", "NASDAQ", "NASDAQ"],
+        "Industry": ["Beverages", None, "Beverages", "Software", "Software"],
+        "Sector": ["Consumer Staples", None, "Consumer Staples", "Technology", "Technology"],
+        "No Years": [62, nan, 0, 9, 25],
+        "Current Price": [60.0, nan, 0.0, 12.0, 300.0],
+        "Div Yield": [3.1, nan, 0.0, 8.5, 0.9],
+        "Chowder Number": [12.5, 0.0, 0.0, -4.0, 15.0],
+        "EPS": [2.4, nan, 0.0, -1.5, 9.0],
+        "P/E": [25.0, nan, 0.0, -8.0, 33.0],
+        "PEG": [3.1, nan, 0.0, -0.5, 1.6],
+        "EPS 1Y": [6.0, nan, 0.0, -40.0, 80.0],
+        "CF/Share": [2.5, nan, 0.0, -0.7, 12.0],
+        "Annualized": [1.94, nan, 0.0, 1.02, 2.6],
+        "DGR 1Y": [5.4, nan, 0.0, -50.0, 10.0],
+        "DGR 3Y": [4.6, nan, 0.0, -20.0, 10.0],
+        "DGR 5Y": [4.0, nan, 0.0, 5.0, 12.0],
+        "DGR 10Y": [4.5, nan, 0.0, 2.0, nan],
+    })
+
+def as_values(series):
+    # Compare values, not dtypes: compact_dtypes narrows floats and makes flags nullable booleans
+    return [None if pd.isna(value) else value for value in series.astype(object)]
+
+def test_every_derived_column_matches_the_row_wise_formulas(sheet):
+    expected = row_wise(sheet, REFERENCE)
+    derived = add_derived_columns(sheet.copy(), REFERENCE)
+
+    assert set(derived.columns) == set(expected.columns)
+    for column in expected.columns.difference(sheet.columns):
+        actual, wanted = as_values(derived[column]), as_values(expected[column])
+        if pd.api.types.is_float_dtype(expected[column]):
+            np.testing.assert_allclose(np.array(actual, dtype=float), np.array(wanted, dtype=float), rtol=1e-6, err_msg=column)
+        else:
+            assert actual == wanted, column
@@ -0,0 +1,59 @@
+# pylint: disable = missing-module-docstring, missing-function-docstring, missing-final-newline, trailing-whitespace, line-too-long, redefined-outer-name
+import pandas as pd
+import pytest
+from app.utils import fundamentals_store as fundamentals_module
+from app.utils.fundamentals_store import FundamentalsStore, parse_column_spec, join_fundamentals
+
+@pytest.fixture
+def store(tmp_path):
+    return FundamentalsStore(f"sqlite:///{tmp_path / 'fundamentals.db'}")
+
+def ratios(rows):
+    return pd.DataFrame(rows, columns=["symbol", "period", "date", "currentRatio", "unknownColumn"])
+
+def test_upsert_replaces_rows_by_key(store):
+    assert store.upsert("ratios", ratios([("KO", "FY", "2023-12-31", 1.1, "x"), ("KO", "FY", "2022-12-31", 0.9, "x"), (None, "FY", "2023-12-31", 5.0, "x")])) == 2
+    store.upsert("ratios", ratios([("KO", "FY", "2023-12-31", 1.2, "x")]))
+    rows = store.read("ratios", ["KO"], columns=["date", "currentRatio"], latest=False).sort_values("date")
+    assert rows.values.tolist() == [["KO", "2022-12-31", 0.9], ["KO", "2023-12-31", 1.2]]
+
+def test_latest_row_per_symbol(store):
+    store.upsert("ratios", ratios([
+        ("KO", "FY", "2022-12-31", 0.9, None), ("KO", "FY", "2023-12-31", 1.1, None),
+        ("PEP", "FY", "2023-12-30", 0.8, None), ("PEP", "Q3", "2024-09-07", None, None),
+    ]))
+    latest = store.read("ratios", ["KO", "PEP", "MISSING"], columns=["date", "currentRatio"]).set_index("symbol")
+    assert latest.loc["KO", "date"] == "2023-12-31"
+    assert latest.loc["PEP", "date"] == "2024-09-07" and pd.isna(latest.loc["PEP", "currentRatio"])
+    assert store.read("ratios", ["PEP"], columns=["date"], period="FY")["date"].tolist() == ["2023-12-30"]
+
+def test_reads_are_chunked(store, monkeypatch):
+    monkeypatch.setattr(fundamentals_module, "MAX_SYMBOLS_PER_QUERY", 2)
+    symbols = [f"S{index}" for index in range(5)]
+    store.upsert("ratios_ttm", pd.DataFrame({"symbol": symbols, "payoutRatioTTM": range(5)}))
+    rows = store.read("ratios_ttm", symbols + ["S0", ""], columns=["payoutRatioTTM"])
+    assert sorted(rows["symbol"]) == symbols
+    assert store.read("ratios_ttm", [], columns=["payoutRatioTTM"]).columns.tolist() == ["symbol", "payoutRatioTTM"]
+
+def test_unknown_tables_and_columns():
+    assert parse_column_spec("ratios_ttm.payoutRatioTTM, financial_scores.piotroskiScore,ratios_ttm.peRatioTTM") == {
+        "ratios_ttm": ["payoutRatioTTM", "peRatioTTM"], "financial_scores": ["piotroskiScore"],
+    }
+    for spec in ("nope.payoutRatioTTM", "ratios_ttm.nope", "ratios_ttm"):
+        with pytest.raises(ValueError):
+            parse_column_spec(spec)
+
+def test_join_fundamentals(store):
+    store.upsert("ratios_ttm", pd.DataFrame({"symbol": ["KO", "PEP"], "payoutRatioTTM": [0.74, 0.69]}))
+    df = pd.DataFrame({"Symbol": ["PEP", "KO", "T", None], "Div Yield": [3.1, 2.9, 5.6, 0.0]})
+    joined = join_fundamentals(df, "ratios_ttm.payoutRatioTTM,financial_scores.piotroskiScore", store=store)
+    assert joined["Symbol"].tolist() == ["PEP", "KO", "T", None]
+    assert joined["payoutRatioTTM"].tolist()[:2] == [0.69, 0.74] and joined["payoutRatioTTM"].isna().tolist()[2:] == [True, True]
+    assert joined["piotroskiScore"].isna().all()
+
+def test_join_without_a_store_keeps_the_shape(tmp_path):
+    unreadable = FundamentalsStore(f"sqlite:///{tmp_path / 'missing' / 'fundamentals.db'}")
+    df = pd.DataFrame({"Symbol": ["KO"]})
+    with pytest.raises(IOError):
+        unreadable.read("ratios_ttm", ["KO"])
+    assert join_fundamentals(df, "ratios_ttm.payoutRatioTTM", store=unreadable).columns.tolist() == ["Symbol", "payoutRatioTTM"]
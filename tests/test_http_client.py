@@ -0,0 +1,88 @@
+# pylint: disable = missing-module-docstring, missing-function-docstring, missing-final-newline, trailing-whitespace, line-too-long, redefined-outer-name
+import os
+from types import SimpleNamespace
+import pytest
+import requests
+import tenacity.nap
+from app.utils import fmp_api_calls
+from app.utils.http_client import HTTPClient, FMPRequestError
+
+URL = "https://financialmodelingprep.com/api/v3/quote/KO?apikey=secret"
+
+class Response:
+    def __init__(self, status_code=200, payload=None, headers=None):
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.reason = "Reason"
+        self.headers = headers or {}
+        self.payload = payload
+
+    def json(self):
+        if isinstance(self.payload, Exception):
+            raise self.payload
+        return self.payload
+
+class Session:
+    # Answers GETs from a script of responses (or exceptions to raise)
+    def __init__(self, *script):
+        self.script = list(script)
+        self.calls = 0
+
+    def get(self, url, timeout):
+        self.calls += 1
+        outcome = self.script.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    # The backoff waits, recorded instead of slept
+    waits = []
+    monkeypatch.setattr(tenacity.nap, "time", SimpleNamespace(sleep=waits.append))
+    return waits
+
+def client_with(*script, **kwargs):
+    client = HTTPClient(**kwargs)
+    client._session = Session(*script)  # pylint: disable=protected-access
+    client._session_pid = os.getpid()  # pylint: disable=protected-access
+    return client
+
+def test_transient_failures_are_retried_with_backoff(sleeps):
+    client = client_with(Response(503), requests.ConnectionError("reset"), Response(200, [{"symbol": "KO"}]), backoff=0.5, max_backoff=30)
+    assert client.get_json(URL) == [{"symbol": "KO"}]
+    assert client.session.calls == 3
+    assert len(sleeps) == 2
+    assert all(0.5 <= wait <= 30 for wait in sleeps)
+
+def test_retry_after_is_honoured_up_to_the_cap(sleeps):
+    client = client_with(Response(429, headers={"Retry-After": "7"}), Response(429, headers={"Retry-After": "120"}), Response(200, []), max_backoff=30)
+    assert client.get_json(URL) == []
+    assert sleeps == [7.0, 30]
+
+def test_gives_up_after_max_attempts(sleeps):
+    client = client_with(*[Response(502)] * 3, max_attempts=3)
+    with pytest.raises(FMPRequestError) as error:
+        client.get_json(URL)
+    assert error.value.status_code == 502
+    assert client.session.calls == 3 and len(sleeps) == 2
+
+def test_connection_errors_become_fmp_errors_without_the_key(sleeps):
+    client = client_with(*[requests.Timeout(f"timed out: {URL}")] * 2, max_attempts=2)
+    with pytest.raises(FMPRequestError) as error:
+        client.get_json(URL)
+    assert "secret" not in str(error.value)
+
+@pytest.mark.parametrize("response", [Response(404), Response(200, ValueError("not json")), Response(200, {"Error Message": "Invalid API KEY"})])
+def test_client_errors_are_not_retried(sleeps, response):
+    client = client_with(response)
+    with pytest.raises(FMPRequestError):
+        client.get_json(URL)
+    assert client.session.calls == 1 and not sleeps
+
+def test_symbol_batches_respect_both_limits():
+    symbols = [f"SYM{index:04d}" for index in range(400)]
+    batches = fmp_api_calls.batch_symbols(symbols, max_symbols=150, max_url_length=600)
+    assert [symbol for batch in batches for symbol in batch] == symbols
+    assert all(len(batch) <= 150 and len(fmp_api_calls.quote_url(batch)) <= 600 for batch in batches)
+    assert fmp_api_calls.batch_symbols(symbols, max_symbols=150, max_url_length=10_000) == [symbols[:150], symbols[150:300], symbols[300:]]
@@ -0,0 +1,57 @@
+# pylint: disable = missing-module-docstring, missing-function-docstring, missing-final-newline, trailing-whitespace, line-too-long, redefined-outer-name
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from app.utils import jobs
+from app.utils.jobs import LocalJobQueue, QueueFullError
+
+@pytest.fixture
+def pool(monkeypatch):
+    # Jobs run on a thread in this process, so they see the offline FMP and finish on shutdown()
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(jobs, "get_process_pool", lambda: executor)
+    monkeypatch.setattr(jobs, "_job_queue", LocalJobQueue())
+    yield executor
+    executor.shutdown()
+
+def test_submit_and_poll(client, upload, pool):
+    queued = upload("?async=1")
+    assert queued.status_code == 202
+    job = queued.get_json()
+    assert job["status"] == "queued" and job["status_url"] == f"/api/jobs/{job['job_id']}"
+    pool.shutdown(wait=True)
+
+    done = client.get(job["status_url"])
+    assert done.status_code == 200
+    record = done.get_json()
+    assert record["status"] == "done" and record["upload_id"] == job["upload_id"]
+    assert "result_key" not in record
+    assert record["result"] == upload().get_json()
+
+def test_failed_job(app, client, pool):
+    job_id = jobs.get_job_queue().submit(app.config["UPLOAD_FOLDER"], "0" * 64)
+    pool.shutdown(wait=True)
+    record = client.get(f"/api/jobs/{job_id}").get_json()
+    assert record["status"] == "failed"
+    assert record["error"]
+
+@pytest.mark.parametrize("job_id", ["0" * 32, "not-a-job", "../../etc/passwd"])
+def test_unknown_job_is_404(client, job_id):
+    assert client.get(f"/api/jobs/{job_id}").status_code == 404
+
+def test_full_queue_pushes_back(app, upload, pool, monkeypatch):
+    monkeypatch.setattr(jobs, "_job_queue", LocalJobQueue(max_pending=0))
+    response = upload("?async=1")
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == str(jobs.RETRY_AFTER)
+    with pytest.raises(QueueFullError):
+        jobs.get_job_queue().submit(app.config["UPLOAD_FOLDER"], "0" * 64)
+
+def test_unknown_orientation_is_rejected_before_queuing(app, client, upload, pool):
+    assert upload("?async=1&orient=split").status_code == 400
+    with pytest.raises(ValueError):
+        jobs.get_job_queue().submit(app.config["UPLOAD_FOLDER"], "0" * 64, orient="split")
+    upload_id = upload().headers["X-Upload-Id"]
+    response = client.get(f"/api/rescreen/{upload_id}?orient=split")
+    assert response.status_code == 400
+    assert "split" in response.get_json()["error"]
+    assert client.get(f"/api/rescreen/{upload_id}?orient=columns").status_code == 200
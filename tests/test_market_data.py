@@ -0,0 +1,77 @@
+# pylint: disable = missing-module-docstring, missing-function-docstring, missing-final-newline, trailing-whitespace, line-too-long, redefined-outer-name
+import pytest
+from app.utils import market_data as market_data_module
+from app.utils.market_data import MarketDataProvider, snapshot_version
+from app.utils.fmp_api_calls import ReferenceData
+
+BUSINESS_DAY = "2024-10-04"
+
+class Fetch:
+    # Counts calls, hands out a snapshot of the current business day or raises
+    def __init__(self):
+        self.calls = 0
+        self.error = None
+
+    def __call__(self):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return ReferenceData(
+            tbill_rate=4.0 + self.calls, tbond_rate=4.38, market_risk_premium=4.6,
+            industry_pe_dict={("NYSE", "Beverages"): 21.5}, sector_pe_dict={}, business_day=BUSINESS_DAY,
+        )
+
+@pytest.fixture
+def fetch(monkeypatch):
+    monkeypatch.setattr(market_data_module, "get_most_recent_business_day", lambda: BUSINESS_DAY)
+    return Fetch()
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "market_data.json")
+
+def test_nothing_is_fetched_before_the_first_get(fetch, cache_path):
+    provider = MarketDataProvider(fetch, cache_path=cache_path)
+    assert fetch.calls == 0
+    assert provider.get().tbill_rate == 5.0
+    assert provider.get() is provider.get()
+    assert fetch.calls == 1
+
+def test_workers_share_the_cache_file(fetch, cache_path):
+    first = MarketDataProvider(fetch, cache_path=cache_path).get()
+    second = MarketDataProvider(fetch, cache_path=cache_path).get()
+    assert fetch.calls == 1
+    assert second == first and snapshot_version(second) == snapshot_version(first)
+
+def test_expired_snapshots_are_refetched(fetch, cache_path):
+    provider = MarketDataProvider(fetch, ttl=0, cache_path=cache_path)
+    assert provider.get().tbill_rate == 5.0
+    assert provider.get().tbill_rate == 6.0
+
+def test_a_new_business_day_is_refetched(fetch, cache_path, monkeypatch):
+    provider = MarketDataProvider(fetch, cache_path=cache_path)
+    version = provider.version()
+    monkeypatch.setattr(market_data_module, "get_most_recent_business_day", lambda: "2024-10-07")
+    assert provider.version() != version
+    assert fetch.calls == 2
+
+def test_failed_refresh_serves_the_stale_snapshot(fetch, cache_path):
+    provider = MarketDataProvider(fetch, ttl=0, cache_path=cache_path)
+    stale = provider.get()
+    fetch.error = OSError("connection reset")
+    assert provider.get() is stale
+    # Retried after RETRY_INTERVAL, not on every call
+    assert provider.get() is stale
+    assert fetch.calls == 2
+
+def test_failed_first_fetch_raises(fetch, cache_path):
+    fetch.error = KeyError("tbill")
+    with pytest.raises(ValueError):
+        MarketDataProvider(fetch, cache_path=cache_path).get()
+
+def test_invalidate(fetch, cache_path, tmp_path):
+    provider = MarketDataProvider(fetch, cache_path=cache_path)
+    provider.get()
+    (tmp_path / "market_data.json").unlink()
+    provider.invalidate()
+    assert provider.get().tbill_rate == 6.0
@@ -0,0 +1,95 @@
+# pylint: disable = missing-module-docstring, missing-function-docstring, missing-final-newline, trailing-whitespace, line-too-long, redefined-outer-name
+import os
+import json
+import time
+import multiprocessing
+import pytest
+from app.utils.instrumentation import MetricsRegistry, stage
+
+COUNTER = "dividend_pipeline_stage_rows_total"
+GAUGE = "dividend_http_requests_in_flight"
+HISTOGRAM = "dividend_pipeline_stage_duration_seconds"
+
+@pytest.fixture
+def directory(tmp_path):
+    return str(tmp_path / "metrics")
+
+def files(directory):
+    return sorted(os.listdir(directory)) if os.path.isdir(directory) else []
+
+def in_child(registry, *updates):
+    # Forked worker: apply updates, flush and exit, like a gunicorn worker or job process
+    def target():
+        for name, amount in updates:
+            registry.inc(name, amount, stage="read")
+        registry.flush()
+    process = multiprocessing.get_context("fork").Process(target=target)
+    process.start()
+    process.join()
+    return process.pid
+
+def test_updates_stay_in_memory_until_flushed(directory):
+    registry = MetricsRegistry(directory, flush_seconds=3600)
+    registry.inc(COUNTER, 5, stage="read")
+    assert files(directory) == []
+    registry.flush()
+    assert files(directory) == [f"{os.getpid()}.json"]
+    with open(os.path.join(directory, f"{os.getpid()}.json"), encoding="utf-8") as f:
+        assert json.load(f) == {COUNTER: {'stage="read"': 5}}
+
+def test_timer_flushes_changed_values(directory):
+    registry = MetricsRegistry(directory, flush_seconds=0.05)
+    registry.inc(COUNTER, 2, stage="read")
+    deadline = time.time() + 5
+    while not files(directory) and time.time() < deadline:
+        time.sleep(0.01)
+    assert files(directory) == [f"{os.getpid()}.json"]
+
+def test_zero_interval_flushes_every_update(directory):
+    registry = MetricsRegistry(directory, flush_seconds=0)
+    registry.inc(COUNTER, 1, stage="read")
+    assert registry.collect() == {COUNTER: {'stage="read"': 1}}
+
+def test_processes_are_summed(directory):
+    registry = MetricsRegistry(directory, flush_seconds=3600)
+    registry.inc(COUNTER, 1, stage="read")
+    registry.inc(GAUGE, 1, route="/api/upload")
+    # The child starts from zero instead of carrying its parent's values
+    child = in_child(registry, (COUNTER, 10), (GAUGE, 3))
+    assert f"{child}.json" in files(directory)
+
+    text = registry.render()
+    assert f'{COUNTER}{{stage="read"}} 11.0' in text
+    # Gauges of exited processes are left out
+    assert f'{GAUGE}{{route="/api/upload"}} 1.0' in text
+
+def test_reset_clears_every_process(directory):
+    registry = MetricsRegistry(directory, flush_seconds=3600)
+    in_child(registry, (COUNTER, 10))
+    registry.inc(COUNTER, 1, stage="read")
+    registry.reset()
+    assert files(directory) == []
+    assert registry.collect() == {}
+    assert f"{COUNTER}{{" not in registry.render()
+
+def test_histograms_render_cumulative_buckets(directory):
+    registry = MetricsRegistry(directory, flush_seconds=3600)
+    for seconds in (0.003, 0.2, 100.0):
+        registry.observe(HISTOGRAM, seconds, stage="read")
+    text = registry.render()
+    assert f'{HISTOGRAM}_bucket{{stage="read",le="0.005"}} 1' in text
+    assert f'{HISTOGRAM}_bucket{{stage="read",le="0.25"}} 2' in text
+    assert f'{HISTOGRAM}_bucket{{stage="read",le="+Inf"}} 3' in text
+    assert f'{HISTOGRAM}_count{{stage="read"}} 3' in text
+
+def test_stage_records_failures(directory):
+    registry = MetricsRegistry(directory, flush_seconds=3600)
+    with stage("parse", rows=7, registry=registry):
+        pass
+    with pytest.raises(ValueError):
+        with stage("parse", registry=registry):
+            raise ValueError("bad sheet")
+    values = registry.collect()
+    assert values["dividend_pipeline_stage_rows_total"] == {'stage="parse"': 7}
+    assert values["dividend_pipeline_stage_failures_total"] == {'stage="parse"': 1}
+    assert values[HISTOGRAM]['stage="parse"']["count"] == 2
@@ -0,0 +1,68 @@
+# pylint: disable = missing-module-docstring, missing-function-docstring, missing-final-newline, trailing-whitespace, line-too-long
+import numpy as np
+import pandas as pd
+import pytest
+from app.utils.projection import simulate_growth_bands, growth_distribution, parse_percentiles, project_frame
+
+MEAN = np.array([0.06, 0.02, -0.01, 0.10])
+STD = np.array([0.03, 0.0, 0.05, 0.08])
+
+def test_bands_without_spread_compound_the_mean():
+    bands = simulate_growth_bands([0.05], [0.0], years=4, paths=100, percentiles=(5, 50, 95), seed=1)
+    expected = 1.05 ** np.arange(1, 5)
+    for index in range(3):
+        np.testing.assert_allclose(bands[0, index], expected, rtol=1e-6)
+
+def test_bands_match_np_percentile():
+    years, paths, percentiles, seed = 6, 2_000, (5, 25, 50, 75, 95), 7
+    bands = simulate_growth_bands(MEAN, STD, years, paths, percentiles, seed)
+    # The same draws, compounded path by path in float64
+    draws = np.random.default_rng(seed).standard_normal((years, paths), dtype=np.float32).astype(float)
+    growth = np.clip(MEAN[:, None, None] + STD[:, None, None] * draws, -1.0, 1.0) + 1
+    expected = np.moveaxis(np.percentile(np.cumprod(growth, axis=1), percentiles, axis=2), 0, 1)
+    np.testing.assert_allclose(bands, expected, rtol=1e-4)
+
+def test_bands_do_not_depend_on_chunking_or_other_symbols():
+    bands = simulate_growth_bands(MEAN, STD, 5, 1_000, seed=3)
+    np.testing.assert_array_equal(simulate_growth_bands(MEAN, STD, 5, 1_000, seed=3, chunk_bytes=1), bands)
+    np.testing.assert_array_equal(simulate_growth_bands(MEAN[2:3], STD[2:3], 5, 1_000, seed=3)[0], bands[2])
+
+def test_bands_are_ordered():
+    bands = simulate_growth_bands(MEAN, STD, 10, 1_000, percentiles=(5, 50, 95), seed=5)
+    assert np.all(np.diff(bands, axis=1) >= 0)
+    assert np.all(bands >= 0)
+
+def test_growth_distribution_skips_missing_rates():
+    df = pd.DataFrame({
+        "DGR 1Y": [5.0, np.nan, 4.0], "DGR 3Y": [7.0, np.nan, np.nan],
+        "DGR 5Y": [9.0, np.nan, 6.0], "DGR 10Y": [3.0, np.nan, 8.0],
+    })
+    mean, std = growth_distribution(df)
+    # Each distinct DGR counts once
+    rates = np.array([5.0, 7.0, 9.0, 3.0]) / 100
+    assert mean[0] == pytest.approx(rates.mean()) and std[0] == pytest.approx(rates.std())
+    assert np.isnan(mean[1]) and np.isnan(std[1])
+    assert mean[2] == pytest.approx(0.06) and std[2] == pytest.approx(np.std([0.04, 0.06, 0.08]))
+
+def test_parse_percentiles():
+    assert parse_percentiles("5, 50,95") == (5.0, 50.0, 95.0)
+    for value in ("x", "101", ",".join(["50"] * 22)):
+        with pytest.raises(ValueError):
+            parse_percentiles(value)
+
+def test_project_frame():
+    df = pd.DataFrame({
+        "Symbol": ["KO", "NEW"],
+        "Annualized Dividend": [2.0, 1.0],
+        "Div Yield": [3.0, 2.0],
+        "DGR 1Y": [5.0, np.nan], "DGR 3Y": [5.0, np.nan], "DGR 5Y": [5.0, np.nan],
+    })
+    frame, summary = project_frame(df, years=3, paths=50, percentiles=(50,), seed=11)
+    assert summary == {"years": 3, "paths": 50, "percentiles": [50], "seed": 11}
+    assert frame.loc[0, "Dividend P50"] == pytest.approx([2.1, 2.205, 2.31525], rel=1e-4)
+    assert frame.loc[0, "Yield on Cost P50"] == pytest.approx([3.15, 3.3075, 3.472875], rel=1e-4)
+    assert frame.loc[1, "Dividend P50"] == [None, None, None]
+    # A seed reproduces the projection
+    assert project_frame(df, years=3, paths=50, seed=11)[0].equals(project_frame(df, years=3, paths=50, seed=11)[0])
+    with pytest.raises(ValueError):
+        project_frame(df, years=0)
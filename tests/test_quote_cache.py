@@ -0,0 +1,56 @@
+# pylint: disable = missing-module-docstring, missing-function-docstring, missing-final-newline, trailing-whitespace, line-too-long
+import pandas as pd
+from app.utils.quote_cache import QuoteCache
+
+QUOTES = {"KO": ("NYSE", 2.47), "PEP": ("NASDAQ", 6.95), "T": ("NYSE", 1.58)}
+
+class Fetch:
+    # Records the symbols asked for, FMP only knows the symbols in QUOTES
+    def __init__(self):
+        self.requests = []
+
+    def __call__(self, symbols):
+        self.requests.append(list(symbols))
+        return pd.DataFrame([(symbol, *QUOTES[symbol]) for symbol in symbols if symbol in QUOTES], columns=["Symbol", "Exchange", "EPS"])
+
+def test_only_misses_are_fetched():
+    cache, fetch = QuoteCache(sqlite_path=None), Fetch()
+    first = cache.get_quotes(["KO", "PEP", "KO"], fetch)
+    second = cache.get_quotes(["T", "PEP", "KO"], fetch)
+    assert fetch.requests == [["KO", "PEP"], ["T"]]
+    assert first["Symbol"].tolist() == ["KO", "PEP"]
+    assert second.values.tolist() == [["T", "NYSE", 1.58], ["PEP", "NASDAQ", 6.95], ["KO", "NYSE", 2.47]]
+
+def test_unknown_symbols_are_cached_but_not_returned():
+    cache, fetch = QuoteCache(sqlite_path=None), Fetch()
+    assert cache.get_quotes(["KO", "NOPE"], fetch)["Symbol"].tolist() == ["KO"]
+    assert cache.get_quotes(["NOPE"], fetch).empty
+    assert fetch.requests == [["KO", "NOPE"]]
+
+def test_stale_quotes_are_refetched():
+    cache, fetch = QuoteCache(staleness=60, sqlite_path=None), Fetch()
+    cache.get_quotes(["KO"], fetch)
+    # Age the in-process entry past the staleness window
+    fetched_at, *quote = cache._entries["KO"]  # pylint: disable=protected-access
+    cache._entries["KO"] = (fetched_at - 120, *quote)  # pylint: disable=protected-access
+    cache.get_quotes(["KO"], fetch)
+    assert fetch.requests == [["KO"], ["KO"]]
+
+def test_lru_keeps_the_most_recent_symbols():
+    cache, fetch = QuoteCache(max_entries=2, sqlite_path=None), Fetch()
+    cache.get_quotes(["KO", "PEP"], fetch)
+    cache.get_quotes(["KO"], fetch)
+    cache.get_quotes(["T"], fetch)
+    cache.get_quotes(["KO", "PEP"], fetch)
+    assert fetch.requests == [["KO", "PEP"], ["T"], ["PEP"]]
+
+def test_sqlite_tier_is_shared_between_workers(tmp_path):
+    path = str(tmp_path / "quotes.db")
+    fetch = Fetch()
+    QuoteCache(sqlite_path=path).get_quotes(["KO", "NOPE"], fetch)
+    other_worker = QuoteCache(sqlite_path=path)
+    assert other_worker.get_quotes(["KO", "NOPE"], fetch).values.tolist() == [["KO", "NYSE", 2.47]]
+    assert fetch.requests == [["KO", "NOPE"]]
+    # Rows past the staleness window are ignored
+    assert QuoteCache(staleness=0, sqlite_path=path).get_quotes(["KO"], fetch)["Symbol"].tolist() == ["KO"]
+    assert len(fetch.requests) == 2
@@ -0,0 +1,68 @@
+# pylint: disable = missing-module-docstring, missing-function-docstring, missing-final-newline, trailing-whitespace, line-too-long, redefined-outer-name
+import numpy as np
+import pandas as pd
+import pytest
+from app.utils.result_query import save_result_frame, load_result_frame, query_frame, filter_mask, parse_sort, parse_columns, MAX_PAGE_SIZE
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({
+        "Symbol": ["KO", "PEP", "T", "MO", "XOM"],
+        "Div Yield": [3.1, np.nan, 6.4, 8.2, 3.1],
+        "Sector": ["Staples", "Staples", "Telecom", "Staples", "Energy"],
+        "Meets Chowder Criteria": pd.array([True, False, True, None, False], dtype="boolean"),
+    })
+
+def expected_order(df, column, ascending):
+    return df.sort_values(column, ascending=ascending, kind="stable", na_position="last")["Symbol"].tolist()
+
+@pytest.mark.parametrize("sort, column, ascending", [("Div Yield", "Div Yield", True), ("-Div Yield", "Div Yield", False), ("Symbol", "Symbol", True)])
+def test_sort_matches_pandas(df, sort, column, ascending):
+    _, page = query_frame(df, sort=sort)
+    assert page["Symbol"].tolist() == expected_order(df, column, ascending)
+
+def test_stored_orders_match_sorting(df, tmp_path):
+    path = str(tmp_path / "result.feather")
+    assert save_result_frame(path, {"title": "t"}, df)
+    metadata, loaded, orders = load_result_frame(path)
+    assert metadata == {"title": "t"} and list(loaded.columns) == list(df.columns)
+    for sort in ("Div Yield", "-Div Yield"):
+        assert query_frame(loaded, orders, sort=sort)[1].equals(query_frame(df, sort=sort)[1])
+
+def test_multi_key_sort(df):
+    _, page = query_frame(df, sort="-Div Yield, Symbol")
+    assert page["Symbol"].tolist() == ["MO", "T", "KO", "XOM", "PEP"]
+    assert parse_sort("-Div Yield, +Symbol") == [("Div Yield", False), ("Symbol", True)]
+
+def test_filter_then_page(df):
+    mask = filter_mask(df, "`Div Yield` > 3 and `Sector` == 'Staples'")
+    total, page = query_frame(df, mask=mask, sort="-Div Yield", columns=["Symbol"], page=1, page_size=1)
+    assert total == 2
+    assert page.to_dict("list") == {"Symbol": ["MO"]}
+    assert query_frame(df, mask=mask, sort="-Div Yield", columns=["Symbol"], page=2, page_size=1)[1]["Symbol"].tolist() == ["KO"]
+    assert query_frame(df, mask=mask, page=3, page_size=1)[1].empty
+
+def test_nullable_flags_filter_as_false(df):
+    total, page = query_frame(df, mask=filter_mask(df, "`Meets Chowder Criteria`"))
+    assert total == 2 and page["Symbol"].tolist() == ["KO", "T"]
+
+def test_invalid_queries(df):
+    with pytest.raises(ValueError):
+        query_frame(df, sort="Nope")
+    for page, page_size in ((0, 10), (1, 0), (1, MAX_PAGE_SIZE + 1)):
+        with pytest.raises(ValueError):
+            query_frame(df, page=page, page_size=page_size)
+    with pytest.raises(ValueError):
+        parse_columns("Symbol,Nope", df.columns)
+    assert parse_columns("", df.columns) == list(df.columns)
+
+def test_results_route(client, upload):
+    upload_id = upload().headers["X-Upload-Id"]
+    response = client.get(f"/api/results/{upload_id}", query_string={"filter": "`Div Yield` > 3", "sort": "-Div Yield", "columns": "Symbol,Div Yield", "page_size": 5})
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert payload["columns"] == ["Symbol", "Div Yield"] and len(payload["data"]) <= 5
+    yields = [row["Div Yield"] for row in payload["data"]]
+    assert yields == sorted(yields, reverse=True) and all(value > 3 for value in yields)
+    assert client.get(f"/api/results/{upload_id}", query_string={"columns": "Nope"}).status_code == 400
+    assert client.get(f"/api/results/{'0' * 64}").status_code == 404
@@ -0,0 +1,83 @@
+# pylint: disable = missing-module-docstring, missing-function-docstring, missing-final-newline, trailing-whitespace, line-too-long
+import io
+import os
+import time
+import hashlib
+import dataclasses
+import pytest
+from app.utils.result_store import ResultStore
+from app.utils import sheet_schema
+from app.utils.clean_file_data import sheet_result_key
+from app.utils.fmp_api_calls import ReferenceData
+
+@pytest.fixture
+def store(tmp_path):
+    return ResultStore(str(tmp_path), max_bytes=10_000, max_age=60)
+
+@pytest.fixture
+def reference():
+    return ReferenceData(
+        tbill_rate=4.08, tbond_rate=4.38, market_risk_premium=0.046,
+        industry_pe_dict={("NYSE", "Beverages"): 21.5}, sector_pe_dict={("NYSE", "Consumer Staples"): 19.0},
+        business_day="2024-10-04",
+    )
+
+def test_uploads_are_content_addressed(store):
+    sha, path = store.save_upload(io.BytesIO(b"same bytes"), ".xlsx")
+    assert sha == hashlib.sha256(b"same bytes").hexdigest()
+    assert path.endswith(sha + ".xlsx")
+    assert store.save_upload(io.BytesIO(b"same bytes"), ".xlsx") == (sha, path)
+    assert store.find_upload(sha) == path
+    assert store.find_upload("0" * 64) is None
+
+def test_result_key_covers_every_input():
+    key = ResultStore.result_key("a" * 64, "v1", "records:0")
+    assert key == ResultStore.result_key("a" * 64, "v1", "records:0")
+    assert len({key, ResultStore.result_key("b" * 64, "v1", "records:0"), ResultStore.result_key("a" * 64, "v2", "records:0"), ResultStore.result_key("a" * 64, "v1", "columns:0")}) == 4
+
+def test_sheet_result_keys(store, reference):
+    content_hash = "a" * 64
+    keys = {
+        sheet_result_key(store, content_hash, reference),
+        sheet_result_key(store, content_hash, reference, orient="columns"),
+        sheet_result_key(store, content_hash, reference, pretty=True),
+        sheet_result_key(store, content_hash, reference, sheet_name="Champions"),
+        sheet_result_key(store, content_hash, dataclasses.replace(reference, tbond_rate=4.5)),
+    }
+    assert len(keys) == 5
+    assert sheet_result_key(store, content_hash, reference, sheet_name="All") == sheet_result_key(store, content_hash, reference)
+
+def test_sheet_paths(store):
+    assert store.sheet_path("a" * 64) == os.path.join(store.files_dir, f"{'a' * 64}.{sheet_schema.SHEET_SCHEMA_VERSION}.feather")
+    assert store.sheet_path("a" * 64, "Champions") != store.sheet_path("a" * 64, "Contenders")
+    # Sheet names never end up in file names
+    assert "../" not in store.sheet_path("a" * 64, "../../etc")
+
+def test_sheet_paths_follow_the_schema(store, monkeypatch):
+    # A cached sheet written under another layout or dtype declaration is never read back
+    paths = {store.sheet_path("a" * 64), store.sheet_path("a" * 64, "Champions")}
+    monkeypatch.setattr("app.utils.result_store.SHEET_SCHEMA_VERSION", "0" * 8)
+    assert paths.isdisjoint({store.sheet_path("a" * 64), store.sheet_path("a" * 64, "Champions")})
+
+def test_result_keys_follow_the_format_version(monkeypatch):
+    key = ResultStore.result_key("a" * 64, "v1", "records:0")
+    monkeypatch.setattr("app.utils.result_store.RESULT_FORMAT_VERSION", "1")
+    assert ResultStore.result_key("a" * 64, "v1", "records:0") != key
+
+def test_results_expire(store):
+    with store.write_result("k") as f:
+        f.write("{}")
+    assert store.read_result("k") == "{}"
+    written = time.time() - 120
+    os.utime(store.result_path("k"), (written, written))
+    assert store.read_result("k") is None
+
+def test_eviction_keeps_recent_results(store):
+    for name in ("old", "new"):
+        with store.write_result(name) as f:
+            f.write("x" * 6_000)
+        if name == "old":
+            past = time.time() - 30
+            os.utime(store.result_path(name), (past, past))
+    assert store.read_result("old") is None
+    assert store.read_result("new") == "x" * 6_000
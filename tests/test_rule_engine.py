@@ -0,0 +1,69 @@
+# pylint: disable = missing-module-docstring, missing-function-docstring, missing-final-newline, trailing-whitespace, line-too-long
+import numpy as np
+import pandas as pd
+import pytest
+from app.utils.rule_engine import compile_rule_set, evaluate_rule_sets, RuleSetError
+from app.utils.result_query import filter_mask
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({
+        "Symbol": ["KO", "PEP", "T"],
+        "Div Yield": [3.1, 2.7, 6.4],
+        "No Years": [62, 52, 0],
+        "Dividend Category": pd.Categorical(["Champion", "Champion", "Challenger"]),
+    })
+
+def evaluate(df, expression, params=None):
+    rule_set = compile_rule_set({"rules": [{"column": "out", "expr": expression}], "params": params or {}})
+    outputs, _ = evaluate_rule_sets(df, [rule_set])[0]
+    return outputs["out"]
+
+@pytest.mark.parametrize("expression", [
+    "[1] * 1000000000",
+    "[`Div Yield`] * 100000000",
+    "`Div Yield` * [1, 2, 3]",
+    "(1, 2)",
+    "select([`Div Yield` > 3] * 1000, ['high'], 'low')",
+    "select([[`Div Yield` > 3]], ['high'], 'low')",
+    "'x' * `Div Yield`",
+    "`Div Yield` + 'x'",
+    "9 ** 9 ** 9",
+    "'x' * 10 ** 9",
+    "__import__('os')",
+    "`Div Yield`.real",
+    "[x for x in `Symbol`]",
+    "dcf(`Div Yield`, 0.05, 0.08, 0.02, 100000000)",
+    "ddm(`Div Yield`, 0.05)",
+])
+def test_rejected_at_compile_time(expression):
+    with pytest.raises(RuleSetError):
+        compile_rule_set({"rules": [{"column": "out", "expr": expression}]})
+
+@pytest.mark.parametrize("expression", [
+    "`Symbol` * 100000000",
+    "`Dividend Category` * 100000000",
+    "`Symbol` + `Symbol`",
+    "text * `Div Yield`",
+    "dividend_category(`No Years`) * 1000",
+])
+def test_text_arithmetic_rejected_at_evaluation(df, expression):
+    with pytest.raises(RuleSetError, match="numbers"):
+        evaluate(df, expression, params={"text": "x"})
+
+def test_output_must_have_one_value_per_row(df):
+    with pytest.raises(RuleSetError, match="one value per row"):
+        evaluate(df, "dividend_category(30)")
+
+def test_filter_rejections(df):
+    with pytest.raises(RuleSetError):
+        filter_mask(df, "[1] * 1000000000")
+    with pytest.raises(RuleSetError):
+        filter_mask(df, "`Symbol` * 100000000")
+
+def test_allowed_expressions(df):
+    np.testing.assert_allclose(evaluate(df, "`Div Yield` * 2 + 1"), [7.2, 6.4, 13.8])
+    assert evaluate(df, "select([`Div Yield` > 5, `Div Yield` > 3], ['high', 'mid'], 'low')").tolist() == ["mid", "low", "high"]
+    assert evaluate(df, "where(`Dividend Category` == 'Champion', 'yes', 'no')").tolist() == ["yes", "yes", "no"]
+    assert evaluate(df, "dividend_category(`No Years`)").tolist() == ["Dividend Kings", "Dividend Kings", "N/A"]
+    assert filter_mask(df, "`Div Yield` > 3 and `Symbol` != 'T'").tolist() == [True, False, False]
@@ -0,0 +1,65 @@
+# pylint: disable = missing-module-docstring, missing-function-docstring, missing-final-newline, trailing-whitespace, line-too-long
+import json
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import pytest
+from app.utils.serialization import dataframe_to_custom_json, serialize_result, DateTimeEncoder
+from app.utils.sheet_schema import compact_dtypes
+
+METADATA = {"title": "Dividend Champions, Contenders, Challengers", "as_of_date": "2024-10-04"}
+
+def row_by_row(df):
+    # The original iterrows serializer the columnar one replaced
+    column_order = df.columns.tolist()
+    df_reset = df.reset_index(drop=True)
+    for col in df_reset.select_dtypes(include=["datetime64", "datetime64[ns]"]).columns:
+        df_reset[col] = df_reset[col].dt.date.astype(str)
+    result = []
+    for _, row in df_reset.iterrows():
+        ordered_row = OrderedDict()
+        for col in column_order:
+            value = row[col]
+            if pd.isna(value):
+                ordered_row[col] = None
+            elif isinstance(value, str) and len(value) == 19 and value[10] == " ":
+                ordered_row[col] = value[:10]
+            else:
+                ordered_row[col] = value
+        result.append(ordered_row)
+    return result
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({
+        "Symbol": ["KO", "PEP", "T", None],
+        "Sector": ["Consumer Staples", "Consumer Staples", "Communication Services", None],
+        "No Years": [62, 52, 0, 3],
+        "Div Yield": [3.1, np.nan, 6.4, 0.0],
+        "Ex-Date": pd.to_datetime(["2024-09-13", "2024-09-06", "2024-10-10", "2024-01-02"]),
+        "Updated": ["2024-09-13 00:00:00", "n/a", None, "2024-01-02 12:30:00"],
+        "Meets Chowder Criteria": [True, False, True, False],
+    })
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_records_match_row_by_row(df, compact):
+    expected = json.dumps(row_by_row(df), cls=DateTimeEncoder, default=lambda value: value.item())
+    frame = compact_dtypes(df.copy()) if compact else df
+    assert json.dumps(dataframe_to_custom_json(frame), cls=DateTimeEncoder) == expected
+
+def test_columns_orientation(df):
+    columns = dataframe_to_custom_json(df, orient="columns")
+    records = dataframe_to_custom_json(df)
+    assert list(columns) == list(df.columns)
+    assert [dict(zip(columns, values)) for values in zip(*columns.values())] == records
+
+def test_missing_dates_are_null(df):
+    df.loc[1, "Ex-Date"] = pd.NaT
+    assert dataframe_to_custom_json(df, orient="columns")["Ex-Date"] == ["2024-09-13", None, "2024-10-10", "2024-01-02"]
+
+def test_unknown_orientation(df):
+    with pytest.raises(ValueError):
+        dataframe_to_custom_json(df, orient="split")
+
+def test_pretty_is_the_same_document(df):
+    assert json.loads(serialize_result(METADATA, df, pretty=True)) == json.loads(serialize_result(METADATA, df))
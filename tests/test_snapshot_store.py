@@ -0,0 +1,105 @@
+# pylint: disable = missing-module-docstring, missing-function-docstring, missing-final-newline, trailing-whitespace, line-too-long
+import pandas as pd
+import pytest
+from app.utils.snapshot_store import SnapshotStore, diff_snapshots
+from app.utils.sheet_schema import compact_dtypes
+
+pytest.importorskip("pyarrow")
+
+def screened(symbols, chowder, category, volatility):
+    # A screened frame with the dtypes compact_dtypes gives the real sheet
+    return compact_dtypes(pd.DataFrame({
+        "Symbol": symbols,
+        "Company": [f"{symbol} Inc" for symbol in symbols],
+        "Meets Chowder Criteria": pd.array(chowder, dtype="boolean"),
+        "Dividend Category": pd.Categorical(category),
+        "DGR_Volatility_Category": pd.Categorical(volatility),
+    }))
+
+@pytest.fixture
+def store(tmp_path):
+    return SnapshotStore(str(tmp_path))
+
+def test_diff_with_different_category_sets(store):
+    # Each sheet only holds the categories it uses, the two snapshots share none of the changed ones
+    store.save("2024-01-05", screened(["KO", "PEP", "T"], [True, None, False], ["Champion", "Contender", "Challenger"], ["Low", "Low", "High"]))
+    store.save("2024-02-02", screened(["KO", "PEP", "T"], [False, True, False], ["King", "Contender", "Challenger"], ["Low", "Medium", "High"]))
+
+    diff = store.diff("2024-02-02")
+
+    assert diff["previous"] == "2024-01-05"
+    assert diff["summary"] == {"changed": 2, "added": 0, "removed": 0, "up": 1, "down": 1}
+    changes = {change["Symbol"]: change for change in diff["changes"]}
+    assert changes["KO"]["flipped"] == {
+        "Meets Chowder Criteria": {"from": True, "to": False},
+        "Dividend Category": {"from": "Champion", "to": "King"},
+    }
+    assert changes["KO"]["direction"] == "down"
+    assert changes["PEP"]["flipped"] == {
+        "Meets Chowder Criteria": {"from": None, "to": True},
+        "DGR_Volatility_Category": {"from": "Low", "to": "Medium"},
+    }
+    assert changes["PEP"]["flags_gained"] == ["Meets Chowder Criteria"]
+
+def test_diff_of_categorical_snapshots(store):
+    # Snapshots written before categories were stored as plain values
+    old = screened(["KO", "PEP"], [True, True], ["Champion", "Contender"], ["Low", "Low"])
+    new = screened(["KO", "PEP"], [True, True], ["Champion", "Champion"], ["Low", "Low"])
+    store.save("2024-01-05", old)
+    store.save("2024-02-02", new)
+    before, after = store.load("2024-01-05"), store.load("2024-02-02")
+    before["Dividend Category"] = before["Dividend Category"].astype("category")
+    after["Dividend Category"] = after["Dividend Category"].astype("category")
+
+    diff = diff_snapshots(before, after)
+
+    assert [change["Symbol"] for change in diff["changes"]] == ["PEP"]
+    assert diff["changes"][0]["flipped"] == {"Dividend Category": {"from": "Contender", "to": "Champion"}}
+
+def test_unchanged_rows_added_and_removed(store):
+    store.save("2024-01-05", screened(["KO", "MMM"], [True, False], ["Champion", "Champion"], ["Low", "High"]))
+    store.save("2024-02-02", screened(["KO", "PEP"], [True, True], ["Champion", "Contender"], ["Low", "Low"]))
+
+    diff = store.diff("2024-02-02")
+
+    assert diff["summary"] == {"changed": 0, "added": 1, "removed": 1, "up": 0, "down": 0}
+    assert {change["Symbol"]: change["status"] for change in diff["changes"]} == {"PEP": "added", "MMM": "removed"}
+
+def test_first_snapshot_has_no_previous(store):
+    store.save("2024-01-05", screened(["KO"], [True], ["Champion"], ["Low"]))
+    diff = store.diff("2024-01-05")
+    assert diff["previous"] is None
+    assert diff["changes"] == []
+    with pytest.raises(FileNotFoundError):
+        store.diff("2024-03-01")
+
+def test_same_date_is_replaced_and_symbols_are_unique(store):
+    store.save("2024-01-05", screened(["KO", "KO", None], [True, False, True], ["Champion", "King", "King"], ["Low", "Low", "Low"]))
+    store.save("2024-01-05", screened(["PEP", "KO"], [True, True], ["Contender", "Champion"], ["Low", "Low"]))
+    assert store.dates() == ["2024-01-05"]
+    assert store.load("2024-01-05")["Symbol"].tolist() == ["KO", "PEP"]
+
+def test_diff_against_an_explicit_previous(store):
+    store.save("2024-01-05", screened(["KO"], [False], ["Champion"], ["Low"]))
+    store.save("2024-02-02", screened(["KO"], [True], ["Champion"], ["Low"]))
+    store.save("2024-03-01", screened(["KO"], [True], ["Champion"], ["Low"]))
+    assert store.diff("2024-03-01")["changes"] == []
+    diff = store.diff("2024-03-01", previous="2024-01-05")
+    assert diff["previous"] == "2024-01-05"
+    assert diff["summary"]["up"] == 1
+
+def test_only_dated_snapshots_are_listed(store, tmp_path):
+    store.save("2024-01-05", screened(["KO"], [True], ["Champion"], ["Low"]))
+    (tmp_path / "snapshots" / "2024-02-02.feather.1.2.part").write_bytes(b"partial")
+    (tmp_path / "snapshots" / "latest.feather").write_bytes(b"other")
+    assert store.dates() == ["2024-01-05"]
+    for as_of_date in ("latest", "2024-1-5", "../2024-01-05"):
+        with pytest.raises(ValueError):
+            store.path(as_of_date)
+
+def test_snapshot_routes(client, upload):
+    assert upload().status_code == 200
+    dates = client.get("/api/snapshots").get_json()["snapshots"]
+    assert dates == ["2024-10-04"]
+    assert client.get("/api/snapshots/2024-10-04/diff").get_json()["previous"] is None
+    assert client.get("/api/snapshots/2023-01-02/diff").status_code == 404
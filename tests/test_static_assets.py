@@ -0,0 +1,68 @@
+# pylint: disable = missing-module-docstring, missing-function-docstring, missing-final-newline, trailing-whitespace, line-too-long, redefined-outer-name
+import os
+import sys
+import gzip
+import pytest
+from app.utils.static_assets import IMMUTABLE_CACHE_CONTROL, HTML_CACHE_CONTROL
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+from precompress_static import precompress  # pylint: disable=wrong-import-position
+
+SCRIPT = b"console.log('dividends');\n" * 200
+
+@pytest.fixture
+def static_folder(tmp_path):
+    # An exported frontend with precompressed siblings, written before the app indexes it
+    folder = tmp_path / "static"
+    (folder / "_next" / "static").mkdir(parents=True)
+    (folder / "index.html").write_bytes(b"<html>index</html>")
+    (folder / "404.html").write_bytes(b"<html>missing</html>")
+    (folder / "_next" / "static" / "app.js").write_bytes(SCRIPT)
+    (folder / "_next" / "static" / "app.js.br").write_bytes(b"brotli bytes")
+    (folder / "_next" / "static" / "app.js.gz").write_bytes(gzip.compress(SCRIPT))
+    return folder
+
+@pytest.mark.parametrize("accept, encoding, body", [
+    ("br, gzip", "br", b"brotli bytes"),
+    ("gzip", "gzip", None),
+    ("", None, SCRIPT),
+])
+def test_best_accepted_encoding_is_served(client, accept, encoding, body):
+    response = client.get("/_next/static/app.js", headers={"Accept-Encoding": accept})
+    assert response.status_code == 200
+    assert response.headers.get("Content-Encoding") == encoding
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert response.headers["Cache-Control"] == IMMUTABLE_CACHE_CONTROL
+    data = response.get_data()
+    if body is None:
+        data = gzip.decompress(data)
+        body = SCRIPT
+    assert data == body
+
+def test_each_encoding_has_its_own_etag(client):
+    etags = {accept: client.get("/_next/static/app.js", headers={"Accept-Encoding": accept}).headers["ETag"] for accept in ("br", "gzip", "")}
+    assert len(set(etags.values())) == 3
+    for accept, etag in etags.items():
+        response = client.get("/_next/static/app.js", headers={"Accept-Encoding": accept, "If-None-Match": etag})
+        assert response.status_code == 304 and not response.get_data()
+    # The brotli ETag does not validate the gzip copy
+    assert client.get("/_next/static/app.js", headers={"Accept-Encoding": "gzip", "If-None-Match": etags["br"]}).status_code == 200
+
+def test_html_routes(client):
+    index = client.get("/")
+    assert index.get_data() == b"<html>index</html>" and index.headers["Cache-Control"] == HTML_CACHE_CONTROL
+    assert "Content-Encoding" not in index.headers and "Vary" not in index.headers
+    assert client.get("/portfolio/settings").get_data() == b"<html>index</html>"
+    missing = client.get("/api/nope")
+    assert missing.status_code == 404 and missing.get_data() == b"<html>missing</html>"
+
+def test_precompress_writes_smaller_siblings(tmp_path):
+    (tmp_path / "app.js").write_bytes(SCRIPT)
+    (tmp_path / "tiny.css").write_bytes(b"a{}")
+    (tmp_path / "logo.png").write_bytes(os.urandom(4096))
+    written = precompress(str(tmp_path))
+    assert gzip.decompress((tmp_path / "app.js.gz").read_bytes()) == SCRIPT
+    assert not (tmp_path / "tiny.css.gz").exists() and not (tmp_path / "logo.png.gz").exists()
+    brotli = pytest.importorskip("brotli")
+    assert written == 2
+    assert brotli.decompress((tmp_path / "app.js.br").read_bytes()) == SCRIPT
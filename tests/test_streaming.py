@@ -0,0 +1,38 @@
+# pylint: disable = missing-module-docstring, missing-function-docstring, missing-final-newline, trailing-whitespace, line-too-long
+import json
+import pandas as pd
+import pytest
+from app.utils.serialization import serialize_result, iter_serialized_result
+
+METADATA = {"title": "Dividend Champions, Contenders, Challengers", "as_of_date": "2024-10-04"}
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({
+        "Symbol": ["KO", "PEP", "T", None],
+        "Div Yield": [3.1, None, 6.4, 0.0],
+        "Ex-Date": pd.to_datetime(["2024-09-13", None, "2024-10-10", "2024-01-02"]),
+    })
+
+def test_streamed_json_matches_serialized(df):
+    expected = serialize_result(METADATA, df)
+    assert "".join(iter_serialized_result(METADATA, df, stream="json", batch_size=3)) == expected
+
+def test_streamed_ndjson_rows(df):
+    lines = "".join(iter_serialized_result(METADATA, df, stream="ndjson", batch_size=3)).splitlines()
+    assert json.loads(lines[0]) == {"metadata": METADATA}
+    assert [json.loads(line) for line in lines[1:]] == json.loads(serialize_result(METADATA, df))["data"]
+
+def test_streamed_upload_matches_the_buffered_one(upload):
+    buffered = upload()
+    streamed = upload("?stream=json")
+    assert streamed.status_code == 200 and streamed.mimetype == "application/json"
+    assert streamed.headers["X-Upload-Id"] == buffered.headers["X-Upload-Id"]
+    assert streamed.get_data(as_text=True) == buffered.get_data(as_text=True)
+    lines = upload("?stream=ndjson").get_data(as_text=True).splitlines()
+    assert [json.loads(line) for line in lines[1:]] == buffered.get_json()["data"]
+
+def test_unknown_stream_format_is_rejected(upload):
+    response = upload("?stream=bogus")
+    assert response.status_code == 400
+    assert "bogus" in response.get_json()["error"]
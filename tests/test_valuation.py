@@ -0,0 +1,103 @@
+# pylint: disable = missing-module-docstring, missing-function-docstring, missing-final-newline, trailing-whitespace, line-too-long
+import numpy as np
+import pandas as pd
+import pytest
+from app.utils.fmp_api_calls import ReferenceData
+from app.utils.rule_engine import compile_rule_set, evaluate_rule_sets
+from app.utils.valuation import (
+    ValuationParams, discount_rate, gordon_growth, multi_stage_dcf, sensitivity_grid, parse_steps, value_frame,
+)
+
+@pytest.fixture
+def reference():
+    return ReferenceData(tbill_rate=4.08, tbond_rate=4.38, market_risk_premium=0.046)
+
+def reference_dcf(cash_flow, growth, discount, terminal_growth, high_growth_years, fade_years):
+    # Year by year, as the model is usually written down
+    value, flow = 0.0, cash_flow
+    for year in range(1, high_growth_years + fade_years + 1):
+        if year <= high_growth_years:
+            rate = growth
+        else:
+            rate = growth + (terminal_growth - growth) * (year - high_growth_years) / (fade_years + 1)
+        flow *= 1 + rate
+        value += flow / (1 + discount) ** year
+    terminal = flow * (1 + terminal_growth) / (discount - terminal_growth)
+    return value + terminal / (1 + discount) ** (high_growth_years + fade_years)
+
+def test_discount_rate(reference):
+    assert discount_rate(reference) == pytest.approx(0.0438 + 0.046)
+    assert discount_rate(reference, beta=1.5) == pytest.approx(0.0438 + 0.069)
+
+def test_gordon_growth():
+    values = gordon_growth([2.0, 1.0, 1.0], [0.05, 0.09, 0.10], 0.09)
+    assert values[0] == pytest.approx(2.0 * 1.05 / 0.04)
+    # No value where the discount rate does not exceed growth
+    assert np.isnan(values[1]) and np.isnan(values[2])
+
+@pytest.mark.parametrize("high_growth_years, fade_years", [(5, 5), (3, 0), (0, 4), (10, 10)])
+def test_multi_stage_dcf_matches_year_by_year(high_growth_years, fade_years):
+    cash_flow, growth, discount = np.array([3.2, 1.0]), np.array([0.12, -0.03]), 0.0898
+    values = multi_stage_dcf(cash_flow, growth, discount, 0.025, high_growth_years, fade_years)
+    expected = [reference_dcf(c, g, discount, 0.025, high_growth_years, fade_years) for c, g in zip(cash_flow, growth)]
+    np.testing.assert_allclose(values, expected, rtol=1e-12)
+
+def test_single_stage_dcf_is_gordon_growth():
+    assert multi_stage_dcf(2.0, 0.2, 0.09, terminal_growth=0.03, high_growth_years=0, fade_years=0) == pytest.approx(gordon_growth(2.0, 0.03, 0.09))
+
+def test_sensitivity_grid_centre_is_the_base_value():
+    dividend, growth = np.array([2.0, 1.5, np.nan]), np.array([0.05, 0.02, 0.04])
+    grid = sensitivity_grid(gordon_growth, dividend, growth, 0.09, growth_steps=(-0.01, 0, 0.01), discount_steps=(-0.02, 0, 0.02))
+    assert grid.shape == (3, 3, 3)
+    np.testing.assert_allclose(grid[:, 1, 1], gordon_growth(dividend, growth, 0.09))
+    assert grid[0, 2, 0] == pytest.approx(gordon_growth(2.0, 0.06, 0.07))
+
+def test_parse_steps():
+    assert parse_steps("") == parse_steps(None)
+    assert parse_steps("-0.01, 0, 0.01") == (-0.01, 0.0, 0.01)
+    with pytest.raises(ValueError):
+        parse_steps("a,b")
+    with pytest.raises(ValueError):
+        parse_steps(",".join(["0"] * 22))
+
+def test_params_are_fractions():
+    with pytest.raises(ValueError):
+        ValuationParams(terminal_growth=2.5)
+
+def test_value_frame(reference):
+    df = pd.DataFrame({
+        "Symbol": ["KO", "NODIV"],
+        "Current Price": [60.0, 20.0],
+        "Annualized Dividend": [1.94, 0.0],
+        "DGR 5Y": [4.0, 8.0],
+        "CF/Share": [2.5, -1.0],
+        "5-Year EPS CAGR": [np.nan, 6.0],
+    })
+    frame, summary = value_frame(df, reference, growth_steps=(0.0,), discount_steps=(0.0,))
+    discount = discount_rate(reference)
+    assert summary["discount_rate"] == pytest.approx(discount)
+    assert frame.loc[0, "DDM Fair Value"] == pytest.approx(1.94 * 1.04 / (discount - 0.04))
+    assert frame.loc[0, "DDM Upside %"] == pytest.approx((frame.loc[0, "DDM Fair Value"] / 60 - 1) * 100)
+    # Without an EPS CAGR the cash flow grows at the dividend growth rate
+    assert frame.loc[0, "DCF Fair Value"] == pytest.approx(reference_dcf(2.5, 0.04, discount, 0.025, 5, 5))
+    assert np.isnan(frame.loc[1, "DDM Fair Value"]) and np.isnan(frame.loc[1, "DCF Fair Value"])
+    assert frame.loc[0, "DDM Grid"] == [[pytest.approx(frame.loc[0, "DDM Fair Value"])]]
+    assert frame.loc[1, "DCF Grid"] == [[None]]
+
+def test_rule_set_models_use_the_default_stages():
+    df = pd.DataFrame({"CF/Share": [2.5, 1.0], "Annualized Dividend": [1.94, 0.5]})
+    rule_set = compile_rule_set({"rules": [
+        {"column": "DCF", "expr": "dcf(`CF/Share`, 0.05, 0.09)"},
+        {"column": "DDM", "expr": "ddm(`Annualized Dividend`, 0.04, 0.09)"},
+    ]})
+    outputs, _ = evaluate_rule_sets(df, [rule_set])[0]
+    params = ValuationParams()
+    np.testing.assert_allclose(outputs["DCF"], [reference_dcf(c, 0.05, 0.09, params.terminal_growth, params.high_growth_years, params.fade_years) for c in (2.5, 1.0)])
+    np.testing.assert_allclose(outputs["DDM"], gordon_growth([1.94, 0.5], 0.04, 0.09))
+
+def test_oversized_dcf_stage_is_rejected(client, upload):
+    upload_id = upload().headers["X-Upload-Id"]
+    rule_set = {"name": "huge", "rules": [{"column": "DCF", "expr": "dcf(`CF/Share`, 0.05, 0.08, 0.02, 100000000)"}]}
+    response = client.post(f"/api/screen/{upload_id}", json=rule_set)
+    assert response.status_code == 400
+    assert "dcf() takes 3 arguments" in response.get_json()["error"]
@@ -0,0 +1,39 @@
+# pylint: disable = missing-module-docstring, missing-function-docstring, missing-final-newline, trailing-whitespace, line-too-long
+import pytest
+from app.utils.clean_file_data import normalize_sheet
+from app.utils.serialization import serialize_result
+from app.utils.workbook_reader import read_csv_sheet
+from benchmarks.workbooks import make_workbook, make_csv, TITLE, AS_OF
+
+ROWS = 120
+
+@pytest.fixture
+def exports(tmp_path):
+    xlsx, csv = str(tmp_path / "all.xlsx"), str(tmp_path / "all.csv")
+    make_workbook(ROWS, xlsx, seed=3)
+    make_csv(ROWS, csv, seed=3)
+    return xlsx, csv
+
+def test_csv_reads_like_the_workbook(exports):
+    xlsx, csv = exports
+    workbook_metadata, workbook_df = normalize_sheet(xlsx)
+    csv_metadata, csv_df = normalize_sheet(csv)
+    assert csv_metadata == workbook_metadata
+    assert list(csv_df.columns) == list(workbook_df.columns)
+    assert serialize_result(csv_metadata, csv_df) == serialize_result(workbook_metadata, workbook_df)
+
+def test_csv_title_and_as_of(exports):
+    title, as_of, df = read_csv_sheet(exports[1])
+    assert title == TITLE
+    assert as_of.date() == AS_OF.date()
+    assert len(df) == ROWS
+
+def test_csv_has_only_the_all_sheet(exports):
+    with pytest.raises(ValueError):
+        normalize_sheet(exports[1], sheet_name="Champions")
+
+def test_csv_without_header(tmp_path):
+    path = tmp_path / "empty.csv"
+    path.write_text(f"{TITLE}\n2024-10-04\n\n", encoding="utf-8")
+    with pytest.raises(ValueError):
+        read_csv_sheet(str(path))